@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.admin.decorators import register
-from api.models import ApiKey
+from api.models import ApiKey, IngestJob
 from django.contrib import messages
 
 @admin.register(ApiKey)
@@ -38,4 +38,12 @@ class ApiKeyAdmin(admin.ModelAdmin):
             return
         else:
             # Edición normal: solo permite cambiar campos como name, is_active, etc.
-            super().save_model(request, obj, form, change)
\ No newline at end of file
+            super().save_model(request, obj, form, change)
+
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ("external_id", "client", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("external_id",)
+    readonly_fields = ("document", "created_at", "finished_at", "locked_at")
@@ -0,0 +1,58 @@
+"""
+GET condicional (ETag / Last-Modified) para la API.
+
+El validador es el marcador de cambios del cliente (ClientChangeMarker, ver
+documents.change_feed): sube en la misma transacción que cada cambio de sus
+documentos, movimientos o empresas. Al estar en la base de datos lo ven
+todos los procesos; comprobarlo es una lectura por clave primaria, así que
+una respuesta sin cambios se contesta con 304 sin ejecutar la vista ni
+serializar nada.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from documents import change_feed
+
+__all__ = ["client_conditional_get", "client_etag", "client_last_modified"]
+
+
+def _client_marker(request):
+    # ETag y Last-Modified salen de la misma lectura
+    if not hasattr(request, "_client_change_marker"):
+        request._client_change_marker = change_feed.marker(request.user.client_id)
+    return request._client_change_marker
+
+
+def client_etag(request, *args, **kwargs):
+    # La ruta completa incluye los parámetros: cada filtro o página tiene su ETag
+    version, _ = _client_marker(request)
+    raw = f"{request.user.client_id}:{version}:{request.get_full_path()}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def client_last_modified(request, *args, **kwargs):
+    _, changed_at = _client_marker(request)
+    return changed_at
+
+
+def _private_revalidate(view):
+    # cache_control() exige un HttpRequest y DRF pasa su propio Request
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return inner
+
+
+# Para el método get de las vistas de DRF: se aplica después de autenticar y
+# comprobar permisos. La respuesta depende del cliente, así que no la guardan
+# cachés compartidas y se revalida en cada uso.
+client_conditional_get = method_decorator([
+    _private_revalidate,
+    condition(etag_func=client_etag, last_modified_func=client_last_modified),
+])
@@ -0,0 +1,127 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .models import IngestJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_ingest_job(*, client, data, api_key=None):
+    payload = {key: value for key, value in data.items() if key != "file"}
+    if payload.get("issue_date"):
+        payload["issue_date"] = payload["issue_date"].isoformat()
+
+    # La constraint unique_active_ingest_job_per_client rechaza un segundo job
+    # activo con el mismo external_id; quien llama gestiona el IntegrityError
+    return IngestJob.objects.create(
+        client=client,
+        api_key=api_key,
+        external_id=data["external_id"],
+        file=data["file"],
+        payload=payload,
+    )
+
+
+def requeue_stale_jobs():
+    """
+    Devuelve a la cola los jobs de un worker que murió a mitad de proceso.
+    Los que ya agotaron sus intentos se marcan como fallidos: si el job tumba
+    al worker, reencolarlo lo repetiría sin fin.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, "INGEST_JOB_LOCK_TIMEOUT", 600))
+    max_attempts = getattr(settings, "INGEST_JOB_MAX_ATTEMPTS", 5)
+    stale = IngestJob.objects.filter(status="processing", locked_at__lt=cutoff)
+
+    stale.filter(attempts__gte=max_attempts).update(
+        status="failed",
+        locked_at=None,
+        last_error="Worker lock expired after max attempts",
+        finished_at=now,
+    )
+    return stale.update(status="queued", locked_at=None)
+
+
+def claim_jobs(batch_size=20):
+    """
+    Reserva hasta `batch_size` jobs disponibles. SKIP LOCKED permite varios
+    workers en paralelo sin que dos tomen el mismo job.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        job_ids = list(
+            IngestJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status="queued", available_at__lte=now)
+            .order_by("available_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        IngestJob.objects.filter(pk__in=job_ids).update(
+            status="processing",
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+
+    return list(IngestJob.objects.select_related("client").filter(pk__in=job_ids))
+
+
+def process_job(job):
+    from .views import ingest_document
+
+    data = dict(job.payload)
+    data["file"] = job.file
+    if data.get("issue_date"):
+        data["issue_date"] = parse_date(data["issue_date"])
+
+    try:
+        with transaction.atomic():
+            document = ingest_document(client=job.client, data=data)
+    except (ValidationError, DjangoValidationError, IntegrityError) as exc:
+        # Datos inválidos o duplicados (también si otro proceso creó el mismo
+        # external_id a la vez): reintentar no cambiaría el resultado
+        return _finish(job, "failed", error=str(exc))
+    except Exception as exc:
+        logger.exception("Ingest job %s failed (attempt %s)", job.pk, job.attempts)
+        max_attempts = getattr(settings, "INGEST_JOB_MAX_ATTEMPTS", 5)
+        if job.attempts >= max_attempts:
+            return _finish(job, "failed", error=str(exc))
+        return _retry(job, error=str(exc))
+
+    return _finish(job, "done", document=document)
+
+
+def process_pending_jobs(batch_size=20):
+    requeue_stale_jobs()
+    jobs = claim_jobs(batch_size=batch_size)
+    for job in jobs:
+        process_job(job)
+    return jobs
+
+
+def _retry(job, error):
+    backoff = getattr(settings, "INGEST_JOB_BACKOFF_SECONDS", 30) * 2 ** (job.attempts - 1)
+    job.status = "queued"
+    job.locked_at = None
+    job.available_at = timezone.now() + timedelta(seconds=backoff)
+    job.last_error = error
+    job.save(update_fields=["status", "locked_at", "available_at", "last_error"])
+    return job
+
+
+def _finish(job, status, document=None, error=""):
+    job.status = status
+    job.document = document
+    job.locked_at = None
+    job.last_error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "document", "locked_at", "last_error", "finished_at"])
+    return job
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Procesa los jobs de ingesta asíncrona encolados por la API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument("--sleep", type=float, default=2.0, help="Espera en segundos cuando la cola está vacía")
+        parser.add_argument("--once", action="store_true", help="Procesa un único lote y termina")
+
+    def handle(self, *args, **options):
+        while True:
+            jobs = process_pending_jobs(batch_size=options["batch_size"])
+
+            if jobs:
+                done = sum(1 for job in jobs if job.status == "done")
+                self.stdout.write(f"Procesados {len(jobs)} jobs ({done} completados)")
+
+            if options["once"]:
+                return
+
+            if not jobs:
+                time.sleep(options["sleep"])
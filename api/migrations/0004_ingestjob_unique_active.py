@@ -0,0 +1,39 @@
+# Generated by Django 6.0.3 on 2026-10-18 14:20
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.utils import timezone
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    # La comprobación anterior (SELECT y después INSERT) pudo dejar dos jobs
+    # activos con el mismo external_id; se conserva el más antiguo
+    IngestJob = apps.get_model('api', 'IngestJob')
+    active = IngestJob.objects.using(schema_editor.connection.alias).filter(status__in=['queued', 'processing'])
+    duplicates = (
+        active.values('client_id', 'external_id')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        active.filter(client_id=row['client_id'], external_id=row['external_id']).exclude(pk=row['first_id']).update(
+            status='failed',
+            locked_at=None,
+            last_error='Document already queued',
+            finished_at=timezone.now(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_ingestjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingestjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'processing'])), fields=('client', 'external_id'), name='unique_active_ingest_job_per_client'),
+        ),
+    ]
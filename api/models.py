@@ -1,10 +1,17 @@
 from django.db import models, transaction
+from django.db.models import Q
+from datetime import timedelta
+import hashlib
+import hmac
 import secrets
 from django.conf import settings
+from django.core.cache import cache
 from clients.models import Client
 from django.contrib.auth.hashers import make_password, check_password
 from django.utils import timezone
 
+FAST_HASH_PREFIX = "sha256$"
+
 class ApiKey(models.Model):
 
     ENVIRONMENT_CHOICES = [
@@ -67,7 +74,7 @@ class ApiKey(models.Model):
                     name=name,
                     client=client,
                     prefix=prefix,
-                    key_hash=make_password(secret),
+                    key_hash=cls.hash_secret(secret),
                     environment=environment,
                     scopes=scopes,
                     expires_at=expires_at,
@@ -84,14 +91,80 @@ class ApiKey(models.Model):
         if self.expires_at and self.expires_at < timezone.now():
             return False
 
-        is_valid = check_password(secret, self.key_hash)
+        is_valid = self._verify_secret(secret)
 
         if is_valid:
-            self.last_used_at = timezone.now()
-            self.save(update_fields=["last_used_at"])
+            self.touch_last_used()
 
         return is_valid
 
+    def touch_last_used(self):
+        """
+        Registra el uso como mucho una vez por API_KEY_LAST_USED_INTERVAL
+        segundos, evitando una escritura sobre la misma fila en cada petición.
+        """
+        now = timezone.now()
+        interval = timedelta(seconds=getattr(settings, "API_KEY_LAST_USED_INTERVAL", 60))
+
+        if self.last_used_at and now - self.last_used_at < interval:
+            return False
+
+        # UPDATE condicional: si otro worker ya lo registró no se escribe de nuevo
+        updated = (
+            ApiKey.objects
+            .filter(pk=self.pk)
+            .filter(models.Q(last_used_at__isnull=True) | models.Q(last_used_at__lt=now - interval))
+            .update(last_used_at=now)
+        )
+        self.last_used_at = now
+        return bool(updated)
+
+    @staticmethod
+    def hash_secret(secret):
+        """
+        Los secretos son aleatorios de 256 bits, así que un SHA-256 basta;
+        con API_KEY_FAST_HASH = False se usa el hasher de contraseñas de Django.
+        """
+        if not getattr(settings, "API_KEY_FAST_HASH", True):
+            return make_password(secret)
+        return FAST_HASH_PREFIX + hashlib.sha256(secret.encode()).hexdigest()
+
+    @property
+    def verified_cache_key(self):
+        return f"api_key:verified:{self.prefix}"
+
+    def _secret_digest(self, secret):
+        # Incluye key_hash para que rotar el secreto invalide la caché
+        message = f"{self.key_hash}:{secret}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def _verify_secret(self, secret):
+        if self.key_hash.startswith(FAST_HASH_PREFIX):
+            expected = self.key_hash[len(FAST_HASH_PREFIX):]
+            actual = hashlib.sha256(secret.encode()).hexdigest()
+            return hmac.compare_digest(expected, actual)
+
+        # Hash lento (PBKDF2): reutilizar verificaciones recientes
+        digest = self._secret_digest(secret)
+        cached = cache.get(self.verified_cache_key)
+        if cached is not None and hmac.compare_digest(cached, digest):
+            return True
+
+        if not check_password(secret, self.key_hash):
+            return False
+
+        timeout = getattr(settings, "API_KEY_CACHE_TTL", 300)
+        if self.expires_at:
+            remaining = (self.expires_at - timezone.now()).total_seconds()
+            timeout = max(0, min(timeout, int(remaining)))
+        if timeout:
+            cache.set(self.verified_cache_key, digest, timeout)
+
+        return True
+
+    def invalidate_verified_cache(self):
+        cache.delete(self.verified_cache_key)
+
     @staticmethod
     def _generate_prefix(environment):
         random_part = secrets.token_hex(6)
@@ -103,3 +176,71 @@ class ApiKey(models.Model):
 
     def has_scope(self, scope):
         return scope in self.scopes
+
+
+class IngestJob(models.Model):
+    """
+    Ingesta diferida: el fichero y los datos validados se guardan al recibir
+    la petición y el comando `process_ingest_jobs` crea el documento.
+    """
+
+    STATUS_CHOICES = [
+        ("queued", "En cola"),
+        ("processing", "Procesando"),
+        ("done", "Completado"),
+        ("failed", "Fallido"),
+    ]
+
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name="ingest_jobs"
+    )
+    api_key = models.ForeignKey(
+        ApiKey,
+        on_delete=models.SET_NULL,
+        related_name="ingest_jobs",
+        null=True,
+        blank=True
+    )
+    external_id = models.CharField(max_length=255)
+    file = models.FileField(upload_to="documents/")
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    document = models.ForeignKey(
+        "documents.Document",
+        on_delete=models.SET_NULL,
+        related_name="ingest_jobs",
+        null=True,
+        blank=True
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+            models.Index(fields=["client", "external_id"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["client", "external_id"],
+                condition=Q(status__in=["queued", "processing"]),
+                name="unique_active_ingest_job_per_client",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.external_id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ["done", "failed"]
@@ -0,0 +1,24 @@
+from rest_framework.pagination import CursorPagination
+
+
+class DocumentCursorPagination(CursorPagination):
+    """
+    Paginación por cursor sobre (created_at, id): cada página es un WHERE +
+    LIMIT sobre el índice (client, created_at), sin OFFSET ni COUNT(*).
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        # Con ?q= la vista anota search_rank y los resultados van por relevancia
+        if request.query_params.get("q", "").strip():
+            return ("-search_rank", "-id")
+        # Sincronización incremental: de más antiguo a más reciente sobre el
+        # índice (client, updated_at). El último updated_at recibido, menos un
+        # margen, sirve como siguiente ?updated_since= (ver DocumentListAPIView)
+        if request.query_params.get("updated_since"):
+            return ("updated_at", "id")
+        return super().get_ordering(request, queryset, view)
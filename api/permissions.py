@@ -15,7 +15,11 @@ class HasApiKey(BasePermission):
             return False
 
         try:
-            api_key = ApiKey.objects.get(prefix=prefix, is_active=True)
+            api_key = (
+                ApiKey.objects
+                .select_related("client")
+                .get(prefix=prefix, is_active=True)
+            )
         except ApiKey.DoesNotExist:
             return False
 
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from documents.models import Document
+from documents.models import ChangeEvent, Document
+from .models import IngestJob
 from documents.selectors.document_selector import DocumentSelector
 
 
@@ -28,6 +29,13 @@ class DocumentIngestSerializer(serializers.ModelSerializer):
     confidence = serializers.JSONField(default=dict)
 
     def validate_external_id(self, value):
+        # En ingesta por lotes los ids existentes se resuelven con una sola consulta
+        existing_external_ids = self.context.get("existing_external_ids")
+        if existing_external_ids is not None:
+            if value in existing_external_ids:
+                raise serializers.ValidationError("Document already ingested")
+            return value
+
         client = self.context.get("client")
         qs = DocumentSelector.with_versions(client) if client else Document.all_objects.all()
         if qs.filter(external_id=value).exists():
@@ -55,14 +63,63 @@ class DocumentIngestSerializer(serializers.ModelSerializer):
 
 
 class DocumentSerializer(serializers.ModelSerializer):
+    # Respuesta de la ingesta. Lista explícita, como en DocumentDetailSerializer:
+    # las columnas internas (search_document, root_document, chain_version...)
+    # no salen por la API
     class Meta:
         model = Document
-        fields = "__all__"
+        fields = [
+            "id",
+            "external_id",
+            "original_name",
+            "file",
+            "document_type",
+            "document_number",
+            "issue_date",
+            "company",
+            "flow",
+            "status",
+            "review_level",
+            "is_auto_approved",
+            "confidence",
+            "base_amount",
+            "tax_amount",
+            "tax_percentage",
+            "total_amount",
+            "parent_document",
+            "version",
+            "is_current",
+            "is_archived",
+            "created_at",
+        ]
+
+
+class SparseFieldsMixin:
+    """
+    Deja solo los campos de context["fields"] (la selección de ?fields= y
+    ?exclude= que resuelve la vista). Sin esa clave se devuelven todos.
+    """
+
+    # Campo calculado -> columna del modelo que necesita
+    source_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get("fields")
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+    @classmethod
+    def model_columns(cls, fields):
+        return {cls.source_columns.get(name, name) for name in fields}
 
 
-class DocumentListSerializer(serializers.ModelSerializer):
+class DocumentListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     file_url = serializers.SerializerMethodField()
 
+    source_columns = {"file_url": "file"}
+
     class Meta:
         model = Document
         fields = [
@@ -73,6 +130,7 @@ class DocumentListSerializer(serializers.ModelSerializer):
             "confidence",
             "total_amount",
             "created_at",
+            "updated_at",
             "file_url",
             "document_number",
         ]
@@ -82,3 +140,46 @@ class DocumentListSerializer(serializers.ModelSerializer):
         if obj.file and request:
             return request.build_absolute_uri(obj.file.url)
         return None
+
+
+class DocumentDetailSerializer(DocumentListSerializer):
+    # Lista explícita: las columnas internas (search_document, root_document,
+    # chain_version...) no salen por la API
+    class Meta(DocumentListSerializer.Meta):
+        fields = [
+            *DocumentListSerializer.Meta.fields,
+            "company",
+            "flow",
+            "review_level",
+            "issue_date",
+            "base_amount",
+            "tax_amount",
+            "tax_percentage",
+            "parent_document",
+            "version",
+            "is_current",
+            "is_archived",
+        ]
+
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    sequence = serializers.IntegerField(source="id")
+
+    class Meta:
+        model = ChangeEvent
+        fields = ["sequence", "entity", "object_id", "action", "created_at"]
+
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestJob
+        fields = [
+            "id",
+            "external_id",
+            "status",
+            "attempts",
+            "last_error",
+            "document",
+            "created_at",
+            "finished_at",
+        ]
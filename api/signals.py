@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import ApiKey
+
+
+@receiver(post_save, sender=ApiKey)
+@receiver(post_delete, sender=ApiKey)
+def invalidate_api_key_cache(sender, instance, **kwargs):
+    # Desactivar, cambiar expiración o rotar el hash invalida la verificación cacheada
+    instance.invalidate_verified_cache()
@@ -7,10 +7,13 @@ pytestmark = pytest.mark.django_db
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
 from api.permissions import HasApiKey
 from api.serializers import DocumentIngestSerializer, DocumentListSerializer
+from documents import change_feed
+from documents.services.metrics_cache import metrics_cache
 from documents.models import Company, Document
 
 
@@ -166,8 +169,179 @@ class TestDocumentApiViews:
         response = api_client.get(reverse("api:api_documents_list"))
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.json()) == 1
-        assert response.json()[0]["id"] == document.id
+        assert len(response.json()["results"]) == 1
+        assert response.json()["results"][0]["id"] == document.id
+
+    def test_document_list_is_cursor_paginated(self, api_client, user, client_entity, company, document_file):
+        documents = [
+            Document.all_objects.create(
+                client=client_entity,
+                company=company,
+                external_id=f"page-{index}",
+                original_name=f"page-{index}.pdf",
+                file=document_file,
+                document_type="invoice",
+                confidence={"score": 0.5},
+                flow="in",
+            )
+            for index in range(5)
+        ]
+        api_client.force_authenticate(user=user)
+
+        seen = []
+        url = reverse("api:api_documents_list") + "?page_size=2"
+        while url:
+            payload = api_client.get(url).json()
+            assert len(payload["results"]) <= 2
+            seen.extend(item["id"] for item in payload["results"])
+            url = payload["next"]
+
+        assert seen == [document.id for document in reversed(documents)]
+
+    def test_document_list_searches_with_q(self, api_client, user, document, customer_company):
+        Document.all_objects.create(
+            client=document.client,
+            company=customer_company,
+            external_id="search-other",
+            original_name="otro.pdf",
+            file=SimpleUploadedFile("otro.pdf", b"x", content_type="application/pdf"),
+            document_type="invoice",
+            confidence={"score": 0.5},
+            flow="out",
+        )
+        api_client.force_authenticate(user=user)
+
+        response = api_client.get(reverse("api:api_documents_list"), {"q": "B12345678"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["id"] for item in response.json()["results"]] == [document.id]
+
+    def test_document_list_supports_sparse_fieldsets(self, api_client, user, document):
+        api_client.force_authenticate(user=user)
+        url = reverse("api:api_documents_list")
+
+        sparse = api_client.get(url, {"fields": "id,status,file_url"}).json()["results"][0]
+        without_confidence = api_client.get(url, {"exclude": "confidence"}).json()["results"][0]
+        unknown = api_client.get(url, {"fields": "id,password"})
+
+        assert set(sparse) == {"id", "status", "file_url"}
+        assert sparse["file_url"].endswith(document.file.url)
+        assert "confidence" not in without_confidence
+        assert "original_name" in without_confidence
+        assert unknown.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_document_list_returns_changes_since_updated_since(self, api_client, user, document, document_file):
+        unchanged = Document.all_objects.create(
+            client=document.client,
+            company=document.company,
+            external_id="sync-unchanged",
+            original_name="unchanged.pdf",
+            file=document_file,
+            document_type="invoice",
+            confidence={"score": 0.5},
+            flow="in",
+        )
+        api_client.force_authenticate(user=user)
+        url = reverse("api:api_documents_list")
+        watermark = unchanged.updated_at
+
+        document.approve(user=user)
+        changed = api_client.get(url, {"updated_since": watermark.isoformat()}).json()["results"]
+        invalid = api_client.get(url, {"updated_since": "ayer"})
+
+        # La fila que está justo en la marca se vuelve a enviar
+        assert [item["id"] for item in changed] == [unchanged.id, document.id]
+        assert changed[1]["status"] == "approved"
+        assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_updated_since_returns_rows_sharing_the_watermark(self, api_client, user, document, document_file):
+        sibling = Document.all_objects.create(
+            client=document.client,
+            company=document.company,
+            external_id="sync-sibling",
+            original_name="sibling.pdf",
+            file=document_file,
+            document_type="invoice",
+            confidence={"score": 0.5},
+            flow="in",
+        )
+        # Como tras una transición en bloque: el mismo updated_at para las dos
+        watermark = timezone.now()
+        Document.all_objects.filter(pk__in=[document.pk, sibling.pk]).update(updated_at=watermark)
+        api_client.force_authenticate(user=user)
+
+        response = api_client.get(
+            reverse("api:api_documents_list"), {"updated_since": watermark.isoformat(), "page_size": 1}
+        ).json()
+        second_page = api_client.get(response["next"]).json()
+
+        ids = [item["id"] for item in response["results"] + second_page["results"]]
+        assert ids == sorted([document.id, sibling.id])
+
+    def test_change_feed_returns_client_events_after_cursor(
+        self, api_client, user, document, financial_movement, other_client_entity
+    ):
+        document.approve(user=user)
+        movement_id = financial_movement.pk
+        financial_movement.delete()
+        change_feed.record(other_client_entity.id, "document", 999, "created")
+        api_client.force_authenticate(user=user)
+        url = reverse("api:api_changes")
+
+        events, cursor, has_more = [], 0, True
+        while has_more:
+            payload = api_client.get(url, {"after": cursor, "limit": 2}).json()
+            assert len(payload["results"]) <= 2
+            events.extend(payload["results"])
+            cursor, has_more = payload["cursor"], payload["has_more"]
+
+        assert [(event["entity"], event["object_id"], event["action"]) for event in events] == [
+            ("document", document.pk, "created"),
+            ("movement", movement_id, "created"),
+            ("document", document.pk, "approved"),
+            ("movement", movement_id, "deleted"),
+        ]
+        assert [event["sequence"] for event in events] == sorted(event["sequence"] for event in events)
+        assert api_client.get(url, {"after": cursor}).json() == {"results": [], "cursor": cursor, "has_more": False}
+        assert api_client.get(url, {"after": "-1"}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_document_list_and_detail_answer_304_until_client_data_changes(self, api_client, user, document):
+        api_client.force_authenticate(user=user)
+        list_url = reverse("api:api_documents_list")
+        detail_url = reverse("api:api_documents_detail", args=[document.pk])
+
+        first = api_client.get(list_url)
+        detail = api_client.get(detail_url)
+        with patch("api.views.DocumentListAPIView.get_queryset") as get_queryset:
+            unchanged = api_client.get(list_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        unchanged_detail = api_client.get(detail_url, HTTP_IF_NONE_MATCH=detail["ETag"])
+
+        # El marcador está en la base de datos: no depende de la caché de este proceso
+        metrics_cache.cache.clear()
+        document.approve(user=user)
+        changed = api_client.get(list_url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        assert detail.json()["id"] == document.pk
+        assert {"search_document", "root_document", "chain_version", "confidence_global"}.isdisjoint(detail.json())
+        assert "private" in first["Cache-Control"]
+        assert first.has_header("Last-Modified")
+        assert unchanged.status_code == status.HTTP_304_NOT_MODIFIED
+        assert unchanged_detail.status_code == status.HTTP_304_NOT_MODIFIED
+        get_queryset.assert_not_called()
+        assert changed.status_code == status.HTTP_200_OK
+        assert changed["ETag"] != first["ETag"]
+        assert changed.json()["results"][0]["status"] == "approved"
+
+    def test_metrics_dashboard_answers_304_without_computing_metrics(self, api_client, user):
+        api_client.force_authenticate(user=user)
+        url = "/api/v1/metrics/dashboard/?start=2026-03-01&end=2026-03-31"
+        first = api_client.get(url)
+
+        with patch("api.views.MetricsService.get_user_metrics") as mocked:
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        mocked.assert_not_called()
 
     def test_metrics_dashboard_returns_metrics_payload(self, api_client, user):
         api_client.force_authenticate(user=user)
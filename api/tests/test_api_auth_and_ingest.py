@@ -175,6 +175,18 @@ class TestGetOrCreateCompany:
         )
         assert result.pk == company.pk
 
+    def test_returns_existing_company_by_normalized_name(self, client_entity):
+        existing = Company.objects.create(client=client_entity, name="Distribuciones Peña", is_provider=True)
+
+        result = get_or_create_company(
+            client=client_entity,
+            name="  DISTRIBUCIONES   PENA ",
+            tax_id=None,
+            is_provider=True,
+        )
+
+        assert result.pk == existing.pk
+
     def test_companies_are_isolated_per_client(self, client_entity, other_client_entity):
         company_a = get_or_create_company(
             client=client_entity,
@@ -192,6 +204,50 @@ class TestGetOrCreateCompany:
         assert company_a.client == client_entity
         assert company_b.client == other_client_entity
 
+    def test_known_company_is_resolved_from_cache_without_locking(
+        self, client_entity, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            created = get_or_create_company(
+                client=client_entity, name="Cacheada", tax_id="B10101010", is_provider=True
+            )
+
+        with django_assert_num_queries(1) as ctx:
+            cached = get_or_create_company(
+                client=client_entity, name="Cacheada", tax_id="b-10101010", is_provider=True
+            )
+
+        assert cached.pk == created.pk
+        assert "FOR UPDATE" not in ctx.captured_queries[0]["sql"].upper()
+
+    def test_cached_company_still_gets_missing_roles(self, client_entity, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            created = get_or_create_company(
+                client=client_entity, name="Roles", tax_id="B20202020", is_provider=True
+            )
+
+        result = get_or_create_company(
+            client=client_entity, name="Roles", tax_id="B20202020", is_customer=True
+        )
+
+        created.refresh_from_db()
+        assert result.pk == created.pk
+        assert created.is_provider is True
+        assert created.is_customer is True
+
+    def test_deleted_company_is_evicted_from_cache(self, client_entity, django_capture_on_commit_callbacks):
+        from documents.services.company_cache import company_cache
+
+        with django_capture_on_commit_callbacks(execute=True):
+            created = get_or_create_company(
+                client=client_entity, name="Borrada", tax_id="B30303030", is_provider=True
+            )
+        assert company_cache.get(client_entity.pk, tax_id="B30303030") == created.pk
+
+        created.delete()
+
+        assert company_cache.get(client_entity.pk, tax_id="B30303030") is None
+
 
 # ---------------------------------------------------------------------------
 # Document ingest endpoint — real DB, no mocks
@@ -227,6 +283,12 @@ class TestDocumentIngestEndpointRealDB:
         )
 
         assert response.status_code == status.HTTP_201_CREATED
+        body = response.json()
+        assert body["external_id"] == "real-ingest-001"
+        assert body["status"] == "approved"
+        assert {
+            "search_document", "root_document", "chain_version", "updated_at", "confidence_global",
+        }.isdisjoint(body)
         doc = Document.all_objects.get(external_id="real-ingest-001")
         assert doc.status == "approved"
         assert doc.review_level == "auto"
@@ -405,3 +467,93 @@ class TestApiKeyScopes:
             scopes=[],
         )
         assert key.has_scope("documents:write") is False
+
+
+# ---------------------------------------------------------------------------
+# Batch ingest endpoint
+# ---------------------------------------------------------------------------
+
+class TestDocumentBatchIngestEndpoint:
+    url = "/api/v1/documents/ingest/batch/"
+
+    def _item(self, external_id, *, tax_id="B77777777", flow="out", **overrides):
+        item = {
+            "file": f"file-{external_id}",
+            "external_id": external_id,
+            "original_name": f"{external_id}.pdf",
+            "document_type": "invoice",
+            "provider_name": "Proveedor Lote",
+            "provider_tax_id": tax_id,
+            "document_number": f"INV-{external_id}",
+            "issue_date": "2026-03-15",
+            "base_amount": "100.00",
+            "tax_amount": "21.00",
+            "tax_percentage": "21.00",
+            "total_amount": "121.00",
+            "confidence": {"confianza_extraccion": 0.95, "fecha": 0.95, "total": 0.95},
+            "flow": flow,
+        }
+        item.update(overrides)
+        return item
+
+    def _post(self, api_client, api_key, items):
+        import json
+
+        data = {"documents": json.dumps(items)}
+        for item in items:
+            data[item["file"]] = SimpleUploadedFile(
+                f"{item['file']}.pdf", b"pdf", content_type="application/pdf"
+            )
+        return api_client.post(
+            self.url, data=data, format="multipart", HTTP_X_API_KEY=api_key.raw_key
+        )
+
+    def test_batch_creates_all_documents_and_shares_company(self, api_client, api_key):
+        response = self._post(
+            api_client, api_key, [self._item("batch-001"), self._item("batch-002")]
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["created"] == 2
+        docs = Document.all_objects.filter(external_id__in=["batch-001", "batch-002"])
+        assert docs.count() == 2
+        assert {doc.company_id for doc in docs} == {
+            Company.objects.get(client=api_key.client, tax_id="B77777777").pk
+        }
+        assert all(doc.file.name for doc in docs)
+
+    def test_batch_reports_per_item_errors(self, api_client, api_key, document):
+        response = self._post(
+            api_client,
+            api_key,
+            [
+                self._item("batch-ok"),
+                self._item(document.external_id),
+                self._item("batch-ok"),
+                self._item("batch-bad-flow", flow="sideways"),
+            ],
+        )
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == ["created", "error", "error", "error"]
+        assert "external_id" in results[1]["errors"]
+        assert "flow" in results[3]["errors"]
+        assert Document.all_objects.filter(external_id="batch-ok").count() == 1
+
+    def test_batch_rejects_invalid_payload(self, api_client, api_key):
+        response = api_client.post(
+            self.url, data={"documents": "not-json"}, format="multipart",
+            HTTP_X_API_KEY=api_key.raw_key,
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_batch_uses_constant_queries_for_duplicate_check(self, api_client, api_key, django_assert_max_num_queries):
+        items = [self._item(f"batch-q-{i}") for i in range(25)]
+
+        # Incluye crear el marcador de cambios del cliente (primer evento)
+        with django_assert_max_num_queries(25):
+            response = self._post(api_client, api_key, items)
+
+        assert response.status_code == status.HTTP_201_CREATED
@@ -0,0 +1,187 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.utils import timezone
+from rest_framework import status
+
+from api.jobs import claim_jobs, process_job, process_pending_jobs, requeue_stale_jobs
+from api.models import IngestJob
+from documents.models import Document
+
+pytestmark = pytest.mark.django_db
+
+
+def ingest_payload(external_id, **overrides):
+    payload = {
+        "file": SimpleUploadedFile(f"{external_id}.pdf", b"pdf", content_type="application/pdf"),
+        "external_id": external_id,
+        "original_name": f"{external_id}.pdf",
+        "document_type": "invoice",
+        "provider_name": "Proveedor Async",
+        "provider_tax_id": "B88888888",
+        "document_number": f"INV-{external_id}",
+        "issue_date": "2026-03-15",
+        "base_amount": "100.00",
+        "tax_amount": "21.00",
+        "tax_percentage": "21.00",
+        "total_amount": "121.00",
+        "confidence": '{"confianza_extraccion": 0.95, "fecha": 0.95, "total": 0.95}',
+        "flow": "out",
+    }
+    payload.update(overrides)
+    return payload
+
+
+def enqueue(api_client, api_key, external_id, **overrides):
+    return api_client.post(
+        "/api/v1/documents/ingest/?async=1",
+        data=ingest_payload(external_id, **overrides),
+        format="multipart",
+        HTTP_X_API_KEY=api_key.raw_key,
+    )
+
+
+class TestAsyncIngestEndpoint:
+    def test_async_ingest_returns_202_and_queues_job(self, api_client, api_key):
+        response = enqueue(api_client, api_key, "async-001")
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job = IngestJob.objects.get(pk=response.json()["id"])
+        assert job.status == "queued"
+        assert job.client == api_key.client
+        assert job.payload["issue_date"] == "2026-03-15"
+        assert response["Location"].endswith(f"/api/v1/documents/ingest/jobs/{job.pk}/")
+        assert Document.all_objects.filter(external_id="async-001").exists() is False
+
+    def test_async_ingest_rejects_external_id_already_queued(self, api_client, api_key):
+        enqueue(api_client, api_key, "async-dup")
+
+        response = enqueue(api_client, api_key, "async-dup")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert IngestJob.objects.filter(external_id="async-dup").count() == 1
+
+    def test_async_ingest_accepts_external_id_of_failed_job(self, api_client, api_key):
+        job_id = enqueue(api_client, api_key, "async-again").json()["id"]
+        IngestJob.objects.filter(pk=job_id).update(status="failed")
+
+        response = enqueue(api_client, api_key, "async-again")
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert IngestJob.objects.filter(external_id="async-again").count() == 2
+
+    def test_async_ingest_validates_flow_before_queueing(self, api_client, api_key):
+        response = enqueue(api_client, api_key, "async-flow", flow="sideways")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert IngestJob.objects.exists() is False
+
+    def test_job_status_is_scoped_to_api_key_client(self, api_client, api_key, other_client_entity):
+        job_id = enqueue(api_client, api_key, "async-status").json()["id"]
+
+        response = api_client.get(
+            f"/api/v1/documents/ingest/jobs/{job_id}/", HTTP_X_API_KEY=api_key.raw_key
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "queued"
+
+        IngestJob.objects.filter(pk=job_id).update(client=other_client_entity)
+        response = api_client.get(
+            f"/api/v1/documents/ingest/jobs/{job_id}/", HTTP_X_API_KEY=api_key.raw_key
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestIngestWorker:
+    def test_worker_creates_document_and_marks_job_done(self, api_client, api_key):
+        job_id = enqueue(api_client, api_key, "async-worker").json()["id"]
+
+        out = StringIO()
+        call_command("process_ingest_jobs", "--once", stdout=out)
+
+        job = IngestJob.objects.get(pk=job_id)
+        document = Document.all_objects.get(external_id="async-worker")
+        assert job.status == "done"
+        assert job.attempts == 1
+        assert job.document == document
+        assert document.status == "approved"
+        assert document.file.name == job.file.name
+        assert "1 completados" in out.getvalue()
+
+    def test_transient_error_is_retried_with_backoff(self, api_client, api_key, settings):
+        settings.INGEST_JOB_BACKOFF_SECONDS = 30
+        job_id = enqueue(api_client, api_key, "async-retry").json()["id"]
+
+        with patch("api.views.get_or_create_company", side_effect=RuntimeError("db down")):
+            process_pending_jobs()
+
+        job = IngestJob.objects.get(pk=job_id)
+        assert job.status == "queued"
+        assert job.last_error == "db down"
+        assert job.available_at > timezone.now() + timedelta(seconds=25)
+        assert claim_jobs() == []
+
+    def test_job_fails_after_max_attempts(self, api_client, api_key, settings):
+        settings.INGEST_JOB_MAX_ATTEMPTS = 1
+        job_id = enqueue(api_client, api_key, "async-fail").json()["id"]
+
+        with patch("api.views.get_or_create_company", side_effect=RuntimeError("boom")):
+            process_pending_jobs()
+
+        job = IngestJob.objects.get(pk=job_id)
+        assert job.status == "failed"
+        assert job.finished_at is not None
+
+    def test_duplicate_document_fails_without_retry(self, api_client, api_key, document):
+        job_id = enqueue(api_client, api_key, "async-later").json()["id"]
+        IngestJob.objects.filter(pk=job_id).update(external_id=document.external_id)
+        job = IngestJob.objects.get(pk=job_id)
+        job.payload["external_id"] = document.external_id
+        job.save(update_fields=["payload"])
+
+        process_job(claim_jobs()[0])
+
+        job.refresh_from_db()
+        assert job.status == "failed"
+        assert job.attempts == 1
+
+    def test_concurrent_duplicate_fails_without_retry(self, api_client, api_key):
+        job_id = enqueue(api_client, api_key, "async-race").json()["id"]
+
+        # Otro proceso creó el mismo external_id entre la comprobación y el INSERT
+        with patch("api.views.ingest_document", side_effect=IntegrityError("unique_external_id_per_client")):
+            process_pending_jobs()
+
+        job = IngestJob.objects.get(pk=job_id)
+        assert job.status == "failed"
+        assert job.attempts == 1
+        assert job.finished_at is not None
+
+    def test_stale_processing_jobs_are_requeued(self, api_client, api_key, settings):
+        settings.INGEST_JOB_LOCK_TIMEOUT = 60
+        job_id = enqueue(api_client, api_key, "async-stale").json()["id"]
+        IngestJob.objects.filter(pk=job_id).update(
+            status="processing", locked_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        assert requeue_stale_jobs() == 1
+        assert IngestJob.objects.get(pk=job_id).status == "queued"
+
+    def test_stale_jobs_out_of_attempts_are_failed(self, api_client, api_key, settings):
+        settings.INGEST_JOB_LOCK_TIMEOUT = 60
+        settings.INGEST_JOB_MAX_ATTEMPTS = 2
+        job_id = enqueue(api_client, api_key, "async-crash").json()["id"]
+        IngestJob.objects.filter(pk=job_id).update(
+            status="processing", attempts=2, locked_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        assert requeue_stale_jobs() == 0
+        job = IngestJob.objects.get(pk=job_id)
+        assert job.status == "failed"
+        assert job.locked_at is None
+        assert job.finished_at is not None
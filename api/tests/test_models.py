@@ -1,9 +1,11 @@
 from datetime import timedelta
+from unittest.mock import patch
 
 import pytest
 pytestmark = pytest.mark.django_db
 
-from django.contrib.auth.hashers import make_password
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
 from django.utils import timezone
 
 from api.models import ApiKey
@@ -31,6 +33,25 @@ class TestApiKeyModel:
         api_key.refresh_from_db()
         assert api_key.last_used_at is not None
 
+    def test_check_secret_coalesces_last_used_at_writes(self, api_key, django_assert_num_queries):
+        _, secret = api_key.raw_key.split(".", 1)
+        api_key.check_secret(secret)
+        first_use = api_key.last_used_at
+
+        with django_assert_num_queries(0):
+            assert api_key.check_secret(secret) is True
+
+        assert api_key.last_used_at == first_use
+
+    def test_touch_last_used_writes_again_after_interval(self, api_key, settings):
+        settings.API_KEY_LAST_USED_INTERVAL = 60
+        api_key.last_used_at = timezone.now() - timedelta(minutes=5)
+        api_key.save(update_fields=["last_used_at"])
+
+        assert api_key.touch_last_used() is True
+        api_key.refresh_from_db()
+        assert timezone.now() - api_key.last_used_at < timedelta(minutes=1)
+
     def test_check_secret_rejects_inactive_or_expired_keys(self, api_key):
         _, secret = api_key.raw_key.split(".", 1)
         api_key.expires_at = timezone.now() - timedelta(days=1)
@@ -68,3 +89,39 @@ class TestApiKeyModel:
         assert api_key.prefix == "sk_test_unique"
         assert raw_key == "sk_test_unique.secret-one"
         assert api_key.check_secret("secret-one") is True
+
+    def test_create_key_stores_fast_hash(self, client_entity):
+        api_key, raw_key = ApiKey.create_key(client=client_entity, name="Fast key")
+        _, secret = raw_key.split(".", 1)
+
+        assert api_key.key_hash.startswith("sha256$")
+        assert api_key.check_secret(secret) is True
+        assert api_key.check_secret("wrong") is False
+
+
+@pytest.mark.django_db
+class TestApiKeyVerifiedCache:
+    def test_repeat_verification_skips_password_hasher(self, api_key):
+        _, secret = api_key.raw_key.split(".", 1)
+
+        with patch("api.models.check_password", wraps=check_password) as mocked:
+            assert api_key.check_secret(secret) is True
+            assert api_key.check_secret(secret) is True
+
+        assert mocked.call_count == 1
+
+    def test_wrong_secret_is_not_served_from_cache(self, api_key):
+        _, secret = api_key.raw_key.split(".", 1)
+        assert api_key.check_secret(secret) is True
+
+        assert api_key.check_secret("wrong-secret") is False
+
+    def test_saving_key_invalidates_cache(self, api_key):
+        _, secret = api_key.raw_key.split(".", 1)
+        api_key.check_secret(secret)
+
+        api_key.is_active = False
+        api_key.save(update_fields=["is_active"])
+
+        assert cache.get(api_key.verified_cache_key) is None
+        assert api_key.check_secret(secret) is False
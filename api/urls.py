@@ -1,4 +1,11 @@
-from .views import DocumentIngestAPIView, DocumentListAPIView
+from .views import (
+    ChangeFeedAPIView,
+    DocumentBatchIngestAPIView,
+    DocumentDetailAPIView,
+    DocumentIngestAPIView,
+    DocumentListAPIView,
+    IngestJobDetailAPIView,
+)
 from django.urls import path
 from .views import MetricsDashboardView
 
@@ -6,6 +13,10 @@ app_name = "api"
 
 urlpatterns = [
     path("v1/documents/ingest/", DocumentIngestAPIView.as_view()),
+    path("v1/documents/ingest/jobs/<int:pk>/", IngestJobDetailAPIView.as_view(), name="api_ingest_job_detail"),
+    path("v1/documents/ingest/batch/", DocumentBatchIngestAPIView.as_view(), name="api_documents_ingest_batch"),
     path("v1/documents/", DocumentListAPIView.as_view(), name="api_documents_list"),
+    path("v1/documents/<int:pk>/", DocumentDetailAPIView.as_view(), name="api_documents_detail"),
+    path("v1/changes/", ChangeFeedAPIView.as_view(), name="api_changes"),
     path("v1/metrics/dashboard/", MetricsDashboardView.as_view(), name="dashboard_metrics"),
 ]
@@ -1,14 +1,34 @@
-from .serializers import DocumentIngestSerializer, DocumentSerializer, DocumentListSerializer
-from documents.models import Document, Company
+from .serializers import (
+    ChangeEventSerializer,
+    DocumentDetailSerializer,
+    DocumentIngestSerializer,
+    DocumentListSerializer,
+    DocumentSerializer,
+    IngestJobSerializer,
+)
+from .models import IngestJob
+from .jobs import enqueue_ingest_job
+from documents.models import Document, Company, normalize_company_name
 from documents.selectors.document_selector import DocumentSelector
+from documents.search import search_documents
 from rest_framework.views import APIView
-from rest_framework.generics import ListAPIView
+from rest_framework.generics import ListAPIView, RetrieveAPIView
+from django.conf import settings
+from django.urls import reverse
 from .permissions import HasApiKey
+from .pagination import DocumentCursorPagination
+from .conditional import client_conditional_get
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status as rst_status
 from documents.utils import normalize_tax, round_decimal  
 from rest_framework.exceptions import ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
+import json
+from datetime import datetime, time
+from functools import cached_property, partial
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 def get_review_level(confidence: dict, document_type):
     extraction_confidence = confidence.get("confianza_extraccion", 0.0)
@@ -44,11 +64,40 @@ def normalize_name(name: str | None) -> str:
     return name.strip()
 
 from django.db import transaction, IntegrityError
+from documents.services.company_cache import company_cache
+from documents.services.metrics_rollup import MetricsRollupService
+from documents import change_feed
+
+
+def has_company_roles(company, *, is_provider=False, is_customer=False):
+    return (not is_provider or company.is_provider) and (not is_customer or company.is_customer)
+
 
-@transaction.atomic
 def get_or_create_company(*, client, name: str, tax_id: str | None, is_provider: bool = False, is_customer: bool = False):
     tax_id = normalize_tax_id(tax_id)
     name = normalize_name(name)
+
+    # Caso habitual: proveedor ya conocido, sin bloqueos de fila
+    company = company_cache.resolve(client, tax_id=tax_id, name=name)
+    if company and has_company_roles(company, is_provider=is_provider, is_customer=is_customer):
+        return company
+
+    company = _get_or_create_company_locked(
+        client=client,
+        name=name,
+        tax_id=tax_id,
+        is_provider=is_provider,
+        is_customer=is_customer,
+    )
+
+    if company is not None:
+        transaction.on_commit(lambda: company_cache.set(company))
+
+    return company
+
+
+@transaction.atomic
+def _get_or_create_company_locked(*, client, name, tax_id, is_provider, is_customer):
     company = None
 
     # 1️⃣ Buscar por CIF
@@ -65,7 +114,7 @@ def get_or_create_company(*, client, name: str, tax_id: str | None, is_provider:
         company = (
             Company.objects
             .select_for_update()
-            .filter(client=client, name__iexact=name)
+            .filter(client=client, normalized_name=normalize_company_name(name))
             .first()
         )
 
@@ -74,7 +123,7 @@ def get_or_create_company(*, client, name: str, tax_id: str | None, is_provider:
         updated = False
 
         if is_provider and not company.is_provider:
-            company.is_supplier = True
+            company.is_provider = True
             updated = True
 
         if is_customer and not company.is_customer:
@@ -88,27 +137,159 @@ def get_or_create_company(*, client, name: str, tax_id: str | None, is_provider:
 
     # 3️⃣ Crear con protección contra race condition
     try:
-        company = Company.objects.create(
-            client=client,
-            name=name,
-            tax_id=tax_id,
-            is_provider=is_provider,
-            is_customer=is_customer
-        )
+        with transaction.atomic():
+            company = Company.objects.create(
+                client=client,
+                name=name,
+                tax_id=tax_id,
+                is_provider=is_provider,
+                is_customer=is_customer
+            )
     except IntegrityError:
         # Otro proceso la creó justo antes
         if tax_id:
             company = Company.objects.filter(client=client, tax_id=tax_id).first()
         if not company and name:
-            company = Company.objects.filter(client=client, name__iexact=name).first()
+            company = Company.objects.filter(client=client, normalized_name=normalize_company_name(name)).first()
 
     return company
 
 
+FLOW_ROLE_MAP = {
+    "in": {"is_customer": True},
+    "out": {"is_provider": True},
+}
+
+
+def get_flow_roles(flow):
+    flow = (flow or "").strip().lower()
+
+    if flow not in FLOW_ROLE_MAP:
+        raise ValidationError("Flow inválido")
+
+    return flow, FLOW_ROLE_MAP[flow]
+
+
+def build_document_fields(*, client, company, data, flow):
+    # Revisión y status
+    review_level = get_review_level(
+        confidence=data.get("confidence", {}),
+        document_type=data["document_type"]
+    )
+    status = get_status(review_level)
+
+    is_auto_approved = review_level == "auto"
+
+    # Normalización de cantidades
+    normalized_amounts = normalize_tax(
+        data["base_amount"], 
+        data["tax_amount"], 
+        data["tax_percentage"], 
+        data["total_amount"]
+    )
+
+    confidence_dict = data.get("confidence") or {}
+    confidence_global = confidence_dict.get("confianza_extraccion", 0.0)
+
+    return {
+        "client": client,
+        "company": company,
+        "external_id": data["external_id"],
+        "file": data["file"],
+        "original_name": data["original_name"],
+        "document_type": data["document_type"],
+        "document_number": data.get("document_number"),
+        "issue_date": data.get("issue_date"),
+        "base_amount": normalized_amounts.get("base") or 0,
+        "tax_amount": normalized_amounts.get("tax_amount") or 0,
+        "tax_percentage": normalized_amounts.get("tax_percentage") or 0,
+        "total_amount": normalized_amounts.get("total") or 0,
+        "confidence": data.get("confidence", {}),
+        "status": status,
+        "review_level": review_level,
+        "is_auto_approved": is_auto_approved,
+        "confidence_global": round_decimal(confidence_global, 4),
+        "flow": flow,
+    }
+
+
+def company_key(name, tax_id):
+    return normalize_tax_id(tax_id), normalize_company_name(name)
+
+
+def resolve_companies(*, client, entries):
+    """
+    Resuelve en una sola pasada las companies de un lote.
+    `entries` es una lista de (name, tax_id, roles); devuelve {company_key: Company}.
+    """
+    wanted = {}
+    for name, tax_id, roles in entries:
+        key = company_key(name, tax_id)
+        merged = wanted.setdefault(key, {"name": name, "tax_id": tax_id, "roles": {}})
+        merged["roles"].update(roles)
+
+    tax_ids = {tax_id for tax_id, _ in wanted if tax_id}
+    by_tax_id = {
+        company.tax_id: company
+        for company in Company.objects.filter(client=client, tax_id__in=tax_ids)
+    }
+
+    resolved = {}
+    for key, entry in wanted.items():
+        company = by_tax_id.get(key[0])
+        roles = entry["roles"]
+
+        if company is None or not has_company_roles(company, **roles):
+            # Crear o actualizar roles con el helper transaccional
+            company = get_or_create_company(
+                client=client,
+                name=entry["name"],
+                tax_id=entry["tax_id"],
+                **roles
+            )
+        else:
+            transaction.on_commit(partial(company_cache.set, company))
+
+        resolved[key] = company
+
+    return resolved
+
+
+def ingest_document(*, client, data):
+    #Inferir tipo de company
+    flow, roles = get_flow_roles(data.get("flow"))
+
+    company = get_or_create_company(
+        client=client,
+        name=data["provider_name"],
+        tax_id=data["provider_tax_id"],
+        **roles
+    )
+
+    return Document.objects.create(
+        **build_document_fields(
+            client=client,
+            company=company,
+            data=data,
+            flow=flow,
+        )
+    )
+
+
 class DocumentIngestAPIView(APIView):
+    """
+    Ingesta de un documento. Con `?async=1` (o API_INGEST_ASYNC) se encola
+    un IngestJob y se responde 202; el documento lo crea `process_ingest_jobs`.
+    """
     authentication_classes = []
     permission_classes = [HasApiKey]
 
+    def is_async(self, request):
+        value = request.query_params.get("async")
+        if value is not None:
+            return value.lower() in ["1", "true", "yes"]
+        return getattr(settings, "API_INGEST_ASYNC", False)
+
     def post(self, request):
         print("HEADERS:", request.headers)
         print("META:", request.META.get("HTTP_X_API_KEY"))
@@ -120,83 +301,353 @@ class DocumentIngestAPIView(APIView):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        # Revisión y status
-        review_level = get_review_level(
-            confidence=data.get("confidence", {}),
-            document_type=data["document_type"]
+        if self.is_async(request):
+            return self.enqueue(request, data)
+
+        document = ingest_document(client=request.client, data=data)
+
+        return Response(
+            DocumentSerializer(document).data,
+            status=rst_status.HTTP_201_CREATED,
         )
-        status = get_status(review_level)
 
-        is_auto_approved = review_level == "auto"
+    def enqueue(self, request, data):
+        get_flow_roles(data.get("flow"))
+
+        # Sin SELECT previo: la constraint detecta también dos peticiones simultáneas
+        try:
+            with transaction.atomic():
+                job = enqueue_ingest_job(
+                    client=request.client,
+                    api_key=getattr(request, "api_key", None),
+                    data=data,
+                )
+        except IntegrityError:
+            raise ValidationError({"external_id": ["Document already queued"]})
+        status_url = request.build_absolute_uri(
+            reverse("api:api_ingest_job_detail", kwargs={"pk": job.pk})
+        )
 
-        # Normalización de cantidades
-        normalized_amounts = normalize_tax(
-            data["base_amount"], 
-            data["tax_amount"], 
-            data["tax_percentage"], 
-            data["total_amount"]
+        return Response(
+            {**IngestJobSerializer(job).data, "status_url": status_url},
+            status=rst_status.HTTP_202_ACCEPTED,
+            headers={"Location": status_url},
         )
 
-        #Inferir tipo de company
-        FLOW_ROLE_MAP = {
-            "in": {"is_customer": True},
-            "out": {"is_provider": True},
-        }
 
-        flow = (data.get("flow") or "").strip().lower()
+class IngestJobDetailAPIView(RetrieveAPIView):
+    authentication_classes = []
+    permission_classes = [HasApiKey]
+    serializer_class = IngestJobSerializer
 
-        if flow not in FLOW_ROLE_MAP:
-            raise ValidationError("Flow inválido")
+    def get_queryset(self):
+        return IngestJob.objects.filter(client=self.request.client)
 
-        roles = FLOW_ROLE_MAP[flow]
 
-        company = get_or_create_company(
-            client=request.client,
-            name=data["provider_name"],
-            tax_id=data["provider_tax_id"],
-            **roles
-        )
+class DocumentBatchIngestAPIView(APIView):
+    """
+    Ingesta de varios documentos en una sola petición multipart.
 
-        confidence_dict = data.get("confidence") or {}
-        confidence_global = confidence_dict.get("confianza_extraccion", 0.0)
+    `documents` es una lista JSON con los mismos campos que la ingesta
+    individual; el campo `file` de cada elemento indica el nombre de la
+    parte multipart que contiene el fichero.
+    """
+    authentication_classes = []
+    permission_classes = [HasApiKey]
+    max_batch_size = 100
 
-        document = Document.objects.create(
-            client=request.client,
-            company=company,
-            external_id=data["external_id"],
-            file=data["file"],
-            original_name=data["original_name"],
-            document_type=data["document_type"],
-            document_number=data.get("document_number"),
-            issue_date=data.get("issue_date"),
-            base_amount = normalized_amounts.get("base") or 0,
-            tax_amount = normalized_amounts.get("tax_amount") or 0,
-            tax_percentage = normalized_amounts.get("tax_percentage") or 0,
-            total_amount=normalized_amounts.get("total") or 0,
-            confidence=data.get("confidence", {}),
-            status=status,
-            review_level=review_level,
-            is_auto_approved=is_auto_approved,
-            confidence_global=round_decimal(confidence_global, 4),
-            flow=flow
+    def get_items(self, request):
+        items = request.data.get("documents")
+
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except ValueError:
+                raise ValidationError({"documents": "JSON inválido"})
+
+        if not isinstance(items, list) or not items:
+            raise ValidationError({"documents": "Se requiere una lista de documentos"})
+
+        if len(items) > self.max_batch_size:
+            raise ValidationError(
+                {"documents": f"Máximo {self.max_batch_size} documentos por lote"}
+            )
+
+        return items
+
+    def post(self, request):
+        client = request.client
+        items = self.get_items(request)
+        results = [None] * len(items)
+
+        # 1️⃣ Duplicados ya ingestados: una sola consulta IN
+        external_ids = {
+            item.get("external_id")
+            for item in items
+            if isinstance(item, dict) and item.get("external_id")
+        }
+        existing_external_ids = set(
+            DocumentSelector.with_versions(client)
+            .filter(external_id__in=external_ids)
+            .values_list("external_id", flat=True)
         )
 
+        # 2️⃣ Validación por elemento
+        valid = []
+        seen_external_ids = set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = self.error(index, None, {"non_field_errors": ["Elemento inválido"]})
+                continue
+
+            payload = dict(item)
+            payload["file"] = request.FILES.get(str(item.get("file") or ""))
+
+            serializer = DocumentIngestSerializer(
+                data=payload,
+                context={"client": client, "existing_external_ids": existing_external_ids},
+            )
+            if not serializer.is_valid():
+                results[index] = self.error(index, item.get("external_id"), serializer.errors)
+                continue
+
+            data = serializer.validated_data
+
+            if data["external_id"] in seen_external_ids:
+                results[index] = self.error(
+                    index, data["external_id"], {"external_id": ["Duplicated in batch"]}
+                )
+                continue
+
+            try:
+                flow, roles = get_flow_roles(data.get("flow"))
+            except ValidationError as exc:
+                results[index] = self.error(index, data["external_id"], {"flow": exc.detail})
+                continue
+
+            seen_external_ids.add(data["external_id"])
+            valid.append((index, data, flow, roles))
+
+        with transaction.atomic():
+            # 3️⃣ Companies del lote en una pasada
+            companies = resolve_companies(
+                client=client,
+                entries=[
+                    (data["provider_name"], data["provider_tax_id"], roles)
+                    for _, data, _, roles in valid
+                ],
+            )
+
+            # 4️⃣ Construir documentos y validar en memoria
+            pending = []
+            for index, data, flow, _ in valid:
+                company = companies[company_key(data["provider_name"], data["provider_tax_id"])]
+                document = Document(
+                    **build_document_fields(client=client, company=company, data=data, flow=flow)
+                )
+                document.search_document = document.build_search_document()
+                try:
+                    # Unicidad resuelta arriba; client/company coherentes por construcción
+                    document.full_clean(
+                        exclude=["client", "company"],
+                        validate_unique=False,
+                        validate_constraints=False,
+                    )
+                except DjangoValidationError as exc:
+                    results[index] = self.error(index, data["external_id"], exc.message_dict)
+                    continue
+                pending.append((index, document))
+
+            # 5️⃣ Inserción en bloque
+            self.insert(pending, results)
+
+            # bulk_create no emite señales: registro de cambios y agregado diario a mano
+            change_feed.record_many(client.id, "document", [document.pk for _, document in pending if document.pk], "created")
+            MetricsRollupService.refresh_documents(
+                client.id,
+                {document.issue_date for _, document in pending if document.pk},
+            )
+
+        created = sum(1 for result in results if result["status"] == "created")
+        failed = len(results) - created
+
+        if not failed:
+            response_status = rst_status.HTTP_201_CREATED
+        elif created:
+            response_status = rst_status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = rst_status.HTTP_400_BAD_REQUEST
+
         return Response(
-            DocumentSerializer(document).data,
-            status=rst_status.HTTP_201_CREATED,
+            {"created": created, "failed": failed, "results": results},
+            status=response_status,
         )
 
+    def insert(self, pending, results):
+        documents = [document for _, document in pending]
+
+        try:
+            with transaction.atomic():
+                Document.all_objects.bulk_create(documents)
+        except IntegrityError:
+            # Otro proceso ingestó alguno de los ids: reintentar uno a uno
+            for index, document in pending:
+                document.pk = None
+                try:
+                    with transaction.atomic():
+                        Document.all_objects.bulk_create([document])
+                except IntegrityError:
+                    results[index] = self.error(
+                        index, document.external_id, {"external_id": ["Document already ingested"]}
+                    )
+                else:
+                    results[index] = self.created(index, document)
+            return
+
+        for index, document in pending:
+            results[index] = self.created(index, document)
+
+    @staticmethod
+    def created(index, document):
+        return {
+            "index": index,
+            "external_id": document.external_id,
+            "status": "created",
+            "id": document.pk,
+            "document_status": document.status,
+        }
+
+    @staticmethod
+    def error(index, external_id, errors):
+        return {
+            "index": index,
+            "external_id": external_id,
+            "status": "error",
+            "errors": errors,
+        }
+
 
 
 class DocumentListAPIView(ListAPIView):
+    """
+    Parámetros: ?q= (búsqueda), ?page_size= (máx. 200), ?fields=a,b y
+    ?exclude=a,b (campos de la respuesta) y ?updated_since= (ISO 8601, los
+    documentos modificados en ese instante o después).
+
+    ?updated_since= incluye el propio instante: las transiciones en bloque y
+    las rectificaciones dan el mismo updated_at a muchas filas, y con `>` se
+    perderían las que comparten el último valor recibido. El cliente recibe
+    esas filas otra vez y debe ignorar los duplicados. Aun así, updated_at se
+    fija al guardar y no al confirmar, así que una transacción lenta puede
+    aparecer con un valor anterior a la marca ya leída: quien use la marca
+    debe restarle un margen de seguridad (p. ej. unos minutos). Para una
+    sincronización sin huecos está el registro de cambios (api/v1/changes/).
+    """
+
     serializer_class = DocumentListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = DocumentCursorPagination
+
+    @client_conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        return (
-            DocumentSelector.for_client(self.request.user.client)
-            .order_by("-created_at")
-        )
+        # El orden lo fija DocumentCursorPagination: (-created_at, -id),
+        # (-search_rank, -id) si se busca con ?q= o (updated_at, id) con ?updated_since=
+        qs = DocumentSelector.for_client(self.request.user.client_id)
+        query = self.request.query_params.get("q", "").strip()
+        if query:
+            qs = search_documents(qs, query)
+
+        updated_since = self.get_updated_since()
+        if updated_since:
+            qs = qs.filter(updated_at__gte=updated_since)
+
+        # Solo las columnas que se van a devolver (y las del orden del cursor)
+        columns = self.serializer_class.model_columns(self.selected_fields)
+        return qs.only("id", "created_at", "updated_at", *columns)
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), "fields": self.selected_fields}
+
+    @cached_property
+    def selected_fields(self):
+        available = self.serializer_class.Meta.fields
+        requested = _split_param(self.request.query_params.get("fields")) or available
+        excluded = _split_param(self.request.query_params.get("exclude"))
+
+        unknown = sorted((set(requested) | set(excluded)) - set(available))
+        if unknown:
+            raise ValidationError({"fields": f"Campos desconocidos: {', '.join(unknown)}"})
+        return [name for name in available if name in requested and name not in excluded]
+
+    def get_updated_since(self):
+        value = self.request.query_params.get("updated_since")
+        if not value:
+            return None
+
+        try:
+            updated_since = parse_datetime(value)
+            day = parse_date(value) if updated_since is None else None
+        except ValueError:
+            updated_since = day = None
+        if updated_since is None:
+            if day is None:
+                raise ValidationError({"updated_since": "Fecha inválida. Formato requerido: ISO 8601"})
+            updated_since = datetime.combine(day, time.min)
+        if timezone.is_naive(updated_since):
+            updated_since = timezone.make_aware(updated_since)
+        return updated_since
+
+
+class DocumentDetailAPIView(RetrieveAPIView):
+    """Documento del cliente (cualquier versión), p. ej. tras un evento del registro de cambios."""
+
+    serializer_class = DocumentDetailSerializer
+    permission_classes = [IsAuthenticated]
+
+    @client_conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return DocumentSelector.with_versions(self.request.user.client_id)
+
+
+class ChangeFeedAPIView(APIView):
+    """
+    Registro de cambios del cliente: ?after=<sequence> devuelve los eventos
+    posteriores en orden, hasta ?limit= (máx. 500). `cursor` es el valor de
+    ?after= para la siguiente llamada; con has_more=false ya no hay más.
+    """
+
+    permission_classes = [IsAuthenticated]
+    default_limit = 100
+    max_limit = 500
+
+    def get(self, request):
+        after = self.get_int_param("after", 0)
+        limit = min(self.get_int_param("limit", self.default_limit), self.max_limit) or self.default_limit
+
+        events, has_more = change_feed.events_after(request.user.client_id, after, limit)
+        return Response({
+            "results": ChangeEventSerializer(events, many=True).data,
+            "cursor": events[-1].id if events else after,
+            "has_more": has_more,
+        })
+
+    def get_int_param(self, name, default):
+        value = self.request.query_params.get(name)
+        if value is None or value == "":
+            return default
+        if not value.isdigit():
+            raise ValidationError({name: "Debe ser un entero no negativo"})
+        return int(value)
+
+
+def _split_param(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
 
 from rest_framework.views import APIView
 from documents.services import MetricsService
@@ -204,6 +655,7 @@ from django.utils.dateparse import parse_date
 
 class MetricsDashboardView(APIView):
 
+    @client_conditional_get
     def get(self, request):
         start = parse_date(request.GET.get("start"))
         end = parse_date(request.GET.get("end"))
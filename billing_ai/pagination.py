@@ -0,0 +1,103 @@
+import base64
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+__all__ = ["Keyset", "KeysetPage"]
+
+
+class Keyset:
+    """
+    Paginación por clave en orden descendente sobre `fields` (el último debe
+    ser único, normalmente "id"): cada página es un WHERE + LIMIT sobre el
+    índice, sin OFFSET ni COUNT(*).
+    """
+
+    def __init__(self, model, *fields):
+        self.model = model
+        self.fields = fields
+
+    @property
+    def ordering(self):
+        return tuple(f"-{field}" for field in self.fields)
+
+    def encode(self, obj):
+        values = (getattr(obj, field) for field in self.fields)
+        raw = "|".join(value.isoformat() if hasattr(value, "isoformat") else str(value) for value in values)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode(self, value):
+        """Devuelve los valores del cursor o None si no es válido."""
+        if not value:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+            parts = raw.split("|")
+            if len(parts) != len(self.fields):
+                return None
+            return tuple(
+                self.model._meta.get_field(field).to_python(part)
+                for field, part in zip(self.fields, parts)
+            )
+        except (ValueError, UnicodeDecodeError, ValidationError):
+            return None
+
+    def _beyond(self, values, lookup):
+        # (a, b, c) < (x, y, z) ⇔ a < x OR (a = x AND b < y) OR ...
+        return reduce(or_, (
+            Q(**dict(zip(self.fields[:index], values[:index])), **{f"{self.fields[index]}__{lookup}": values[index]})
+            for index in range(len(self.fields))
+        ))
+
+    def paginate(self, queryset, page_size, *, after=None, before=None):
+        """
+        `after` pide la página siguiente al cursor y `before` la anterior; sin
+        ninguno (o con cursores no válidos) devuelve la primera página.
+        """
+        queryset = queryset.order_by(*self.ordering)
+        after = self.decode(after)
+        before = self.decode(before)
+
+        if before:
+            rows = list(
+                queryset
+                .filter(self._beyond(before, "gt"))
+                .order_by(*self.fields)[:page_size + 1]
+            )
+            has_previous = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            return KeysetPage(self, rows, has_next=True, has_previous=has_previous)
+
+        if after:
+            queryset = queryset.filter(self._beyond(after, "lt"))
+
+        rows = list(queryset[:page_size + 1])
+        return KeysetPage(self, rows[:page_size], has_next=len(rows) > page_size, has_previous=after is not None)
+
+
+class KeysetPage:
+    def __init__(self, keyset, object_list, *, has_next, has_previous):
+        self.keyset = keyset
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.object_list:
+            return None
+        return self.keyset.encode(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous or not self.object_list:
+            return None
+        return self.keyset.encode(self.object_list[0])
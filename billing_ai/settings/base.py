@@ -140,4 +140,34 @@ AUTH_USER_MODEL = "clients.CustomUser"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-X_FRAME_OPTIONS = "SAMEORIGIN"
\ No newline at end of file
+X_FRAME_OPTIONS = "SAMEORIGIN"
+
+# API keys
+API_KEY_FAST_HASH = True  # Nuevas claves con SHA-256 en lugar de PBKDF2
+API_KEY_CACHE_TTL = 300  # Segundos que se reutiliza una verificación PBKDF2
+API_KEY_LAST_USED_INTERVAL = 60  # Resolución en segundos de last_used_at
+
+# Ingesta asíncrona (manage.py process_ingest_jobs)
+API_INGEST_ASYNC = False  # Por defecto solo con ?async=1
+INGEST_JOB_MAX_ATTEMPTS = 5
+INGEST_JOB_BACKOFF_SECONDS = 30  # Se duplica en cada reintento
+INGEST_JOB_LOCK_TIMEOUT = 600  # Jobs "processing" más antiguos vuelven a la cola
+
+# Exportación PDF (manage.py process_pdf_exports)
+PDF_EXPORT_TEMPLATE_VERSION = "1"  # Subir al cambiar invoice_list_pdf.html para invalidar la caché
+PDF_EXPORT_SYNC_MAX_DOCUMENTS = 25  # Selecciones mayores se renderizan en segundo plano
+PDF_EXPORT_LOCK_TIMEOUT = 600  # Jobs "processing" más antiguos vuelven a la cola
+
+# Caché de MetricsService (se invalida por cliente al cambiar documentos o movimientos)
+METRICS_CACHE_ALIAS = "default"
+METRICS_CACHE_TTL = 600  # Segundos
+
+# Listado de documentos
+DOCUMENT_LIST_PAGINATION = "offset"  # "keyset" para paginar por cursor (created_at, id)
+DOCUMENT_COUNT_CACHE_TTL = 300  # Segundos que se reutiliza el total del listado
+
+# Búsqueda de documentos (configuración de texto de PostgreSQL)
+DOCUMENT_SEARCH_CONFIG = "spanish"
+
+# Filtros por subcadena (ruta a la clase; None = pg_trgm en PostgreSQL, icontains en el resto)
+SUBSTRING_SEARCH_BACKEND = None
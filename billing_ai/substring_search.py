@@ -0,0 +1,100 @@
+"""
+Búsqueda por subcadena ("contiene") para los filtros de texto libre: números
+de factura parciales, fragmentos de conceptos...
+
+El backend se elige con SUBSTRING_SEARCH_BACKEND (ruta a la clase). Sin él
+se usa pg_trgm en PostgreSQL y icontains en el resto de motores.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import CharField, Q, TextField
+from django.db.models.lookups import IContains
+from django.utils.module_loading import import_string
+
+__all__ = [
+    "IContainsSubstringBackend",
+    "TrigramSubstringBackend",
+    "create_trigram_indexes",
+    "drop_trigram_indexes",
+    "get_substring_backend",
+    "substring_condition",
+]
+
+
+@CharField.register_lookup
+@TextField.register_lookup
+class TrigramIContains(IContains):
+    """
+    `columna ILIKE '%texto%'` en PostgreSQL, que resuelven los índices GIN
+    gin_trgm_ops sobre la columna (icontains usa UPPER() y no los aprovecha).
+    En otros motores equivale a icontains.
+    """
+
+    lookup_name = "trgm_icontains"
+
+    def as_sql(self, compiler, connection):
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs_sql} ILIKE {rhs_sql}", (*lhs_params, *rhs_params)
+
+
+class IContainsSubstringBackend:
+    lookup = "icontains"
+
+    def condition(self, fields, query):
+        """Q que se cumple si algún campo contiene `query`."""
+        query = (query or "").strip()
+        if not query:
+            return Q()
+
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__{self.lookup}": query})
+        return condition
+
+
+class TrigramSubstringBackend(IContainsSubstringBackend):
+    # Requiere la extensión pg_trgm (se crea en las migraciones de documents y finance)
+    lookup = "trgm_icontains"
+
+
+def get_substring_backend(using=DEFAULT_DB_ALIAS):
+    path = getattr(settings, "SUBSTRING_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connections[using].vendor == "postgresql":
+        return TrigramSubstringBackend()
+    return IContainsSubstringBackend()
+
+
+def substring_condition(fields, query, using=DEFAULT_DB_ALIAS):
+    return get_substring_backend(using).condition(fields, query)
+
+
+def _trigram_index_name(table, column):
+    return f"{table}_{column}_trgm"
+
+
+def create_trigram_indexes(schema_editor, columns):
+    """
+    Crea pg_trgm y un índice GIN gin_trgm_ops por cada (tabla, columna). Solo
+    en PostgreSQL: en el resto de motores no hace nada. Pensado para RunPython.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column in columns:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{_trigram_index_name(table, column)}" '
+            f'ON "{table}" USING gin ("{column}" gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(schema_editor, columns):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, column in columns:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{_trigram_index_name(table, column)}"')
@@ -17,6 +17,7 @@ from django.test.utils import override_settings
 from django.utils import timezone
 from rest_framework.test import APIClient
 from django.apps import apps
+from django.core.cache import cache
 from django.db.models.signals import post_save
 
 django.setup()
@@ -30,6 +31,10 @@ def _test_settings():
         from finance.signals import create_default_categories
 
         post_save.disconnect(create_default_categories, sender=client_model)
+        cache.clear()
+        from documents.services.company_cache import company_cache
+
+        company_cache.clear()
         yield
 
 
@@ -38,6 +43,12 @@ def client():
     return DjangoClient()
 
 
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
 @pytest.fixture
 def rf():
     return RequestFactory()
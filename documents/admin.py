@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.admin.decorators import register
-from documents.models import Document, Company
+from documents.models import ChangeEvent, Document, Company, DocumentTransition, PdfExportJob
 
 # Register your models here.
 @register(Document)
@@ -22,4 +22,44 @@ class DocumentAdmin(admin.ModelAdmin):
 class CompanyAdmin(admin.ModelAdmin):
     list_display = ['name', 'client', 'is_provider', 'is_customer', 'tax_id']
     list_filter = ['client', 'is_provider', 'is_customer']
-    search_fields = ['name', 'tax_id', 'client__name']
\ No newline at end of file
+    search_fields = ['name', 'tax_id', 'client__name']
+
+@register(PdfExportJob)
+class PdfExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'client', 'status', 'filename', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['cache_key', 'client__name']
+
+
+@register(DocumentTransition)
+class DocumentTransitionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'document', 'action', 'from_status', 'to_status', 'user', 'created_at']
+    list_filter = ['action', 'to_status']
+    search_fields = ['document__original_name', 'client__name']
+
+    # Registro de solo inserción
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@register(ChangeEvent)
+class ChangeEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'client', 'entity', 'object_id', 'action', 'created_at']
+    list_filter = ['entity', 'action']
+    search_fields = ['client__name']
+
+    # Registro de solo inserción
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,73 @@
+"""
+Registro de cambios para las integraciones (api/v1/changes/).
+
+Cada alta, cambio de estado, rectificación o borrado de un documento y cada
+alta, modificación o borrado de un movimiento añade un ChangeEvent en la
+misma transacción que el cambio. Quien sincroniza lee los eventos con id
+mayor que el último recibido y solo descarga los objetos que cambiaron.
+
+Antes de insertar se toma el marcador del cliente (ClientChangeMarker), que
+queda bloqueado hasta el commit. Así los eventos de un cliente reciben su id
+y se confirman en el mismo orden, y leer `id > cursor` no se salta ninguno
+que se confirme más tarde con un id menor.
+
+Las altas y cambios que pasan por save()/delete() se registran desde
+documents.signals; las operaciones en bloque (transiciones, ingesta por
+lotes) llaman aquí directamente.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from documents.models import ChangeEvent, ClientChangeMarker
+
+__all__ = ["record", "record_many", "events_after", "touch", "marker"]
+
+
+def touch(client_id):
+    """
+    Sube el marcador del cliente. Dentro de una transacción la fila queda
+    bloqueada hasta el commit, lo que ordena los cambios de ese cliente.
+    """
+    markers = ClientChangeMarker.objects.filter(client_id=client_id)
+    values = {"version": F("version") + 1, "changed_at": timezone.now()}
+    if not markers.update(**values):
+        # Primer cambio del cliente; si otro proceso crea la fila a la vez se ignora
+        ClientChangeMarker.objects.bulk_create([ClientChangeMarker(client_id=client_id)], ignore_conflicts=True)
+        markers.update(**values)
+
+
+def marker(client_id):
+    """(versión, hora del último cambio) del cliente; (0, None) si no hay cambios."""
+    return (
+        ClientChangeMarker.objects
+        .filter(client_id=client_id)
+        .values_list("version", "changed_at")
+        .first()
+    ) or (0, None)
+
+
+def record(client_id, entity, object_id, action):
+    with transaction.atomic(savepoint=False):
+        touch(client_id)
+        return ChangeEvent.objects.create(client_id=client_id, entity=entity, object_id=object_id, action=action)
+
+
+def record_many(client_id, entity, object_ids, action):
+    if not object_ids:
+        return []
+    with transaction.atomic(savepoint=False):
+        touch(client_id)
+        return ChangeEvent.objects.bulk_create([
+            ChangeEvent(client_id=client_id, entity=entity, object_id=object_id, action=action)
+            for object_id in object_ids
+        ])
+
+
+def events_after(client_id, cursor, limit):
+    """
+    Hasta `limit` eventos del cliente posteriores a `cursor`, en orden.
+    Devuelve (eventos, hay_más) con una sola consulta sobre (client, id).
+    """
+    events = list(ChangeEvent.objects.filter(client_id=client_id, id__gt=cursor).order_by("id")[:limit + 1])
+    return events[:limit], len(events) > limit
@@ -0,0 +1,50 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from documents.pdf_worker import init_worker
+from documents.services.pdf_export_service import PdfExportService
+
+
+class Command(BaseCommand):
+    help = "Renderiza en un pool de procesos las exportaciones PDF en cola."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Procesos de renderizado (0 = en este proceso)")
+        parser.add_argument("--batch-size", type=int, default=5)
+        parser.add_argument("--sleep", type=float, default=2.0, help="Espera en segundos cuando la cola está vacía")
+        parser.add_argument("--once", action="store_true", help="Procesa un único lote y termina")
+
+    def handle(self, *args, **options):
+        executor = None
+        if options["workers"] > 0:
+            # Los hijos abren sus propias conexiones; no se comparte la del proceso padre
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                max_workers=options["workers"],
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+
+        try:
+            while True:
+                results = PdfExportService.process_pending(
+                    batch_size=options["batch_size"],
+                    executor=executor,
+                )
+
+                if results:
+                    done = sum(1 for status in results if status == "done")
+                    self.stdout.write(f"Procesadas {len(results)} exportaciones ({done} completadas)")
+
+                if options["once"]:
+                    return
+
+                if not results:
+                    time.sleep(options["sleep"])
+        finally:
+            if executor is not None:
+                executor.shutdown()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from documents.services.metrics_rollup import MetricsRollupService
+
+
+class Command(BaseCommand):
+    help = "Regenera el agregado diario de métricas (DailyClientMetrics) desde documentos y movimientos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--client", type=int, action="append", dest="client_ids", help="Solo este cliente (repetible)")
+
+    def handle(self, *args, **options):
+        rows = MetricsRollupService.rebuild(client_ids=options["client_ids"])
+        self.stdout.write(f"Agregado regenerado: {rows} filas")
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.3 on 2026-10-18 00:52
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_company_name(name):
+    # Copia de documents.models.normalize_company_name al crear la migración:
+    # si la función cambia, la migración debe seguir rellenando los mismos valores
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return re.sub(r"[\W_]+", " ", name.casefold()).strip()
+
+
+def populate_normalized_name(apps, schema_editor):
+    Company = apps.get_model("documents", "Company")
+    companies = list(Company.objects.only("id", "name"))
+    for company in companies:
+        company.normalized_name = normalize_company_name(company.name)
+    Company.objects.bulk_update(companies, ["normalized_name"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_client_logo_client_primary_color'),
+        ('documents', '0010_document_unique_current_version_per_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='normalized_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_normalized_name, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['client', 'normalized_name'], name='documents_c_client__9687af_idx'),
+        ),
+    ]
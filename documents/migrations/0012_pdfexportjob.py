@@ -0,0 +1,39 @@
+# Generated by Django 6.0.3 on 2026-10-18 02:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_client_logo_client_primary_color'),
+        ('documents', '0011_company_normalized_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64)),
+                ('document_ids', models.JSONField(default=list)),
+                ('base_url', models.CharField(blank=True, default='', max_length=255)),
+                ('filename', models.CharField(default='facturas.pdf', max_length=255)),
+                ('file', models.FileField(blank=True, upload_to='exports/pdf/')),
+                ('status', models.CharField(choices=[('queued', 'En cola'), ('processing', 'Procesando'), ('done', 'Completado'), ('failed', 'Fallido')], default='queued', max_length=20)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_export_jobs', to='clients.client')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pdf_export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['client', 'cache_key'], name='documents_p_client__f4229b_idx'), models.Index(fields=['status', 'created_at'], name='documents_p_status_ef0713_idx')],
+            },
+        ),
+    ]
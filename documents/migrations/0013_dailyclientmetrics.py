@@ -0,0 +1,55 @@
+# Generated by Django 6.0.3 on 2026-10-18 03:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_client_logo_client_primary_color'),
+        ('documents', '0012_pdfexportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClientMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('flow', models.CharField(blank=True, default='', max_length=20)),
+                ('document_type', models.CharField(blank=True, default='', max_length=20)),
+                ('status', models.CharField(blank=True, default='', max_length=20)),
+                ('document_count', models.PositiveIntegerField(default=0)),
+                ('auto_approved_count', models.PositiveIntegerField(default=0)),
+                ('manual_approved_count', models.PositiveIntegerField(default=0)),
+                ('confidence_sum', models.DecimalField(decimal_places=4, default=0, max_digits=14)),
+                ('confidence_count', models.PositiveIntegerField(default=0)),
+                ('base_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('movement_count', models.PositiveIntegerField(default=0)),
+                ('movement_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('movement_expense', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['client', 'issue_date'], name='documents_d_client__092e04_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailyclientmetrics',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metrics', to='clients.client'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyclientmetrics',
+            constraint=models.UniqueConstraint(fields=('client', 'day', 'flow', 'document_type', 'status'), name='unique_daily_metrics_row'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.3 on 2026-10-18 04:10
+
+from django.db import migrations, models
+
+from documents.search import build_search_document, ensure_search_index
+
+
+def populate_search_document(apps, schema_editor):
+    Document = apps.get_model("documents", "Document")
+    documents = Document.objects.using(schema_editor.connection.alias).select_related("company")
+
+    batch = []
+    for document in documents.iterator(chunk_size=1000):
+        company = document.company
+        document.search_document = build_search_document(
+            document.original_name,
+            document.document_number,
+            company.name if company else "",
+            company.tax_id if company else "",
+        )
+        batch.append(document)
+        if len(batch) >= 1000:
+            Document.objects.using(schema_editor.connection.alias).bulk_update(batch, ["search_document"])
+            batch = []
+    if batch:
+        Document.objects.using(schema_editor.connection.alias).bulk_update(batch, ["search_document"])
+
+    ensure_search_index(schema_editor.connection, rebuild=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0013_dailyclientmetrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_document, migrations.RunPython.noop),
+    ]
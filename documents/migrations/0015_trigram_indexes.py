@@ -0,0 +1,30 @@
+# Generated by Django 6.0.3 on 2026-10-18 05:20
+
+from django.db import migrations
+
+from billing_ai.substring_search import create_trigram_indexes, drop_trigram_indexes
+
+TRIGRAM_COLUMNS = [
+    ("documents_document", "original_name"),
+    ("documents_document", "document_number"),
+    ("documents_company", "name"),
+]
+
+
+def forwards(apps, schema_editor):
+    create_trigram_indexes(schema_editor, TRIGRAM_COLUMNS)
+
+
+def backwards(apps, schema_editor):
+    drop_trigram_indexes(schema_editor, TRIGRAM_COLUMNS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0014_document_search_document'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
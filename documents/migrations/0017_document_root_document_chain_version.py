@@ -0,0 +1,47 @@
+# Generated by Django 6.0.3 on 2026-10-18 08:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_chain(apps, schema_editor):
+    Document = apps.get_model("documents", "Document")
+    documents = Document.objects.using(schema_editor.connection.alias)
+
+    # La raíz es el padre o, si el padre es a su vez una versión, el padre de este
+    parents = documents.filter(pk=OuterRef("parent_document_id"))
+    documents.filter(parent_document__isnull=False).update(
+        root_document_id=Coalesce(Subquery(parents.values("parent_document_id")[:1]), F("parent_document_id"))
+    )
+
+    latest = (
+        documents.filter(root_document_id=OuterRef("pk"))
+        .values("root_document_id")
+        .annotate(latest=Max("version"))
+        .values("latest")
+    )
+    roots = documents.filter(root_document__isnull=False).values("root_document_id")
+    documents.filter(pk__in=roots).update(chain_version=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0016_documenttransition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='chain_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='root_document',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='chain_documents', to='documents.document'),
+        ),
+        migrations.RunPython(populate_chain, migrations.RunPython.noop),
+    ]
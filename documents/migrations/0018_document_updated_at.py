@@ -0,0 +1,37 @@
+# Generated by Django 6.0.3 on 2026-10-18 09:15
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce, Greatest
+
+
+def populate_updated_at(apps, schema_editor):
+    # Último cambio conocido de cada fila
+    Document = apps.get_model("documents", "Document")
+    Document.objects.using(schema_editor.connection.alias).update(updated_at=Greatest(
+        F("created_at"),
+        *(Coalesce(field, F("created_at")) for field in ("edited_at", "approved_at", "rejected_at", "archived_at", "rectified_at")),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_client_logo_client_primary_color'),
+        ('documents', '0017_document_root_document_chain_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(populate_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['client', 'updated_at'], name='documents_d_client__21e3ab_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.3 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_client_logo_client_primary_color'),
+        ('documents', '0018_document_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('document', 'Documento'), ('movement', 'Movimiento')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Creado'), ('updated', 'Modificado'), ('approved', 'Aprobado'), ('rejected', 'Rechazado'), ('archived', 'Archivado'), ('unarchived', 'Desarchivado'), ('rectified', 'Rectificado'), ('deleted', 'Eliminado')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='change_events', to='clients.client')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['client', 'id'], name='documents_c_client__607c56_idx')],
+            },
+        ),
+    ]
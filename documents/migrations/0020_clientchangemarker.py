@@ -0,0 +1,24 @@
+# Generated by Django 6.0.3 on 2026-10-18 11:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_client_logo_client_primary_color'),
+        ('documents', '0019_changeevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientChangeMarker',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='change_marker', serialize=False, to='clients.client')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
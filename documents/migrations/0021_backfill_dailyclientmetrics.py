@@ -0,0 +1,103 @@
+# Generated by Django 6.0.3 on 2026-10-18 11:45
+
+from django.db import migrations
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, When
+
+# Copia del agregado de MetricsRollupService tal como era al crear la
+# migración: el servicio puede cambiar y la migración debe dar siempre el
+# mismo resultado con los modelos históricos
+DOCUMENT_DIMENSIONS = ("flow", "document_type", "status")
+DOCUMENT_METRICS = (
+    "document_count",
+    "auto_approved_count",
+    "manual_approved_count",
+    "confidence_sum",
+    "confidence_count",
+    "base_amount",
+    "tax_amount",
+    "total_amount",
+)
+MOVEMENT_METRICS = ("movement_count", "movement_income", "movement_expense")
+
+
+def signed_amount(field):
+    return Case(
+        # Rectificativa de ingreso → resta
+        When(document_type="corrected_invoice", flow="in", then=-F(field)),
+        # Rectificativa de gasto → suma (anula gasto previo)
+        When(document_type="corrected_invoice", flow="out", then=F(field)),
+        default=F(field),
+        output_field=DecimalField(),
+    )
+
+
+def document_rows(documents):
+    grouped = (
+        documents
+        .filter(is_current=True, issue_date__isnull=False)
+        .order_by()
+        .values("client_id", "issue_date", *DOCUMENT_DIMENSIONS)
+        .annotate(
+            rollup_document_count=Count("id"),
+            rollup_auto_approved_count=Count("id", filter=Q(review_level="auto", is_auto_approved=True)),
+            rollup_manual_approved_count=Count("id", filter=Q(review_level="manual")),
+            rollup_confidence_sum=Sum("confidence_global"),
+            rollup_confidence_count=Count("confidence_global"),
+            rollup_base_amount=Sum(signed_amount("base_amount")),
+            rollup_tax_amount=Sum(signed_amount("tax_amount")),
+            rollup_total_amount=Sum(signed_amount("total_amount")),
+        )
+    )
+    for row in grouped:
+        yield {
+            "client_id": row["client_id"],
+            "day": row["issue_date"],
+            **{key: row[key] or "" for key in DOCUMENT_DIMENSIONS},
+            **{key: row[f"rollup_{key}"] or 0 for key in DOCUMENT_METRICS},
+        }
+
+
+def movement_rows(movements):
+    grouped = (
+        movements
+        .filter(is_active=True)
+        .order_by()
+        .values("client_id", "date")
+        .annotate(
+            rollup_movement_count=Count("id"),
+            rollup_movement_income=Sum("amount", filter=Q(movement_type="income")),
+            rollup_movement_expense=Sum("amount", filter=Q(movement_type="expense")),
+        )
+    )
+    for row in grouped:
+        yield {
+            "client_id": row["client_id"],
+            "day": row["date"],
+            **{key: row[f"rollup_{key}"] or 0 for key in MOVEMENT_METRICS},
+        }
+
+
+def backfill_daily_metrics(apps, schema_editor):
+    # El agregado se creó vacío (0013): sin esto el dashboard no ve los datos existentes
+    db_alias = schema_editor.connection.alias
+    DailyClientMetrics = apps.get_model('documents', 'DailyClientMetrics')
+    Document = apps.get_model('documents', 'Document')
+    FinancialMovement = apps.get_model('finance', 'FinancialMovement')
+
+    rows = [DailyClientMetrics(**row) for row in document_rows(Document._base_manager.using(db_alias))]
+    rows += [DailyClientMetrics(**row) for row in movement_rows(FinancialMovement._base_manager.using(db_alias))]
+
+    DailyClientMetrics._base_manager.using(db_alias).all().delete()
+    DailyClientMetrics._base_manager.using(db_alias).bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0020_clientchangemarker'),
+        ('finance', '0009_financialmovement_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.3 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0021_backfill_dailyclientmetrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfexportjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pdfexportjob',
+            name='max_attempts',
+            field=models.PositiveIntegerField(default=3),
+        ),
+    ]
@@ -3,18 +3,36 @@ from django.db.models import Q
 from django.db import models, transaction
 from clients.models import Client
 import os
+import re
+import unicodedata
+from functools import partial
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from .search import build_search_document
 
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
+
+def normalize_company_name(name):
+    """
+    Forma canónica para comparar nombres: sin acentos, casefold y con
+    espacios/puntuación colapsados ("  Acmé, S.L. " -> "acme s l").
+    """
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return re.sub(r"[\W_]+", " ", name.casefold()).strip()
+
+
 class Company(models.Model):
     client = models.ForeignKey(
         Client, on_delete=models.CASCADE, 
         related_name="companies"
     )
     name = models.CharField(max_length=255)
+    normalized_name = models.CharField(max_length=255, blank=True, default="", editable=False)
     tax_id = models.CharField(max_length=50, null=True, blank=True)
     is_provider = models.BooleanField(default=False, db_index=True)
     is_customer = models.BooleanField(default=False, db_index=True)
@@ -33,6 +51,7 @@ class Company(models.Model):
         indexes = [
             models.Index(fields=["client", "tax_id"]),
             models.Index(fields=["client", "name"]),
+            models.Index(fields=["client", "normalized_name"]),
         ]
     
     def save(self, *args, **kwargs):
@@ -44,6 +63,11 @@ class Company(models.Model):
             )
         if self.name: 
             self.name = self.name.strip()
+        self.normalized_name = normalize_company_name(self.name)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_name"}
         super().save(*args, **kwargs)
 
     def get_type(self):
@@ -143,7 +167,7 @@ class Document(models.Model):
     
     @property
     def has_rectifications(self):
-        return self.parent_document 
+        return self.root_document_id is not None
 
     @property
     def status_message(self):
@@ -213,6 +237,8 @@ class Document(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     total_source = models.CharField(max_length=10, choices=TOTAL_SOURCE_CHOICES, default="unknown")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Cualquier cambio de la fila; los update() en bloque lo fijan a mano
+    updated_at = models.DateTimeField(auto_now=True)
     edited_at = models.DateTimeField(blank=True, null=True)
     approved_at = models.DateTimeField(blank=True, null=True)
     approved_by = models.ForeignKey(
@@ -273,6 +299,20 @@ class Document(models.Model):
     )
     version = models.PositiveIntegerField(default=1, db_index=True)
     is_current = models.BooleanField(default=True, db_index=True)
+    # Raíz de la cadena de rectificaciones (vacío en la propia raíz) y, solo en
+    # la raíz, la última versión creada de la cadena
+    root_document = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.PROTECT,
+        related_name="chain_documents"
+    )
+    chain_version = models.PositiveIntegerField(default=1, editable=False)
+
+    # Texto indexado para la búsqueda (ver documents.search)
+    search_document = models.TextField(blank=True, default="", editable=False)
 
     orc_snapshot = models.JSONField(default=dict, blank=True)
     amount_snapshot = models.JSONField(default=dict, blank=True)
@@ -287,6 +327,8 @@ class Document(models.Model):
             models.Index(fields=["client", "review_level"]),
             models.Index(fields=["client", "created_at"]),
             models.Index(fields=["client", "company"]),
+            models.Index(fields=["client", "issue_date"]),
+            models.Index(fields=["client", "updated_at"]),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -303,11 +345,78 @@ class Document(models.Model):
     def __str__(self):
         return f"{self.document_number or self.original_name} ({self.flow})"
     
-    def save(self, *args, **kwargs):
-        if self.company and self.company.client != self.client:
-            raise ValueError("Company must belong to the same client.")
-        
-        self.full_clean()
+    def build_search_document(self):
+        company = self.company if self.company_id else None
+        return build_search_document(
+            self.original_name,
+            self.document_number,
+            company.name if company else "",
+            company.tax_id if company else "",
+        )
+
+    @property
+    def chain_root_id(self):
+        return self.root_document_id or self.pk
+
+    def clean_for_save(self, update_fields=None, validate_integrity=True):
+        """
+        Equivale a full_clean() salvo en que las relaciones ya asignadas como
+        instancia no se vuelven a consultar y, con update_fields (aprobar,
+        rechazar, archivar...), solo se validan esas columnas.
+
+        Con validate_integrity=False se omite lo que ya garantiza la base de
+        datos (existencia de las relaciones y restricciones únicas), que son
+        las comprobaciones que cuestan consultas.
+        """
+        exclude = set()
+        if update_fields is not None:
+            exclude = {field.name for field in self._meta.concrete_fields if field.name not in update_fields}
+        skip_relations = {
+            field.name for field in self._meta.concrete_fields
+            if field.is_relation and (field.is_cached(self) or not validate_integrity)
+        }
+
+        errors = {}
+        steps = [partial(self.clean_fields, exclude=exclude | skip_relations), self.clean]
+        if validate_integrity:
+            steps += [partial(self.validate_unique, exclude=exclude), partial(self.validate_constraints, exclude=exclude)]
+        for step in steps:
+            try:
+                step()
+            except ValidationError as exc:
+                errors = exc.update_error_dict(errors)
+        if errors:
+            raise ValidationError(errors)
+
+    def save(self, *args, validate_integrity=True, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = {self._meta.get_field(name).name for name in update_fields}
+
+        # Comparación por ids: no carga el cliente de la empresa
+        if update_fields is None or {"client", "company"} & update_fields:
+            if self.company_id and self.company.client_id != self.client_id:
+                raise ValueError("Company must belong to the same client.")
+
+        self.clean_for_save(update_fields, validate_integrity=validate_integrity)
+
+        # Versiones creadas a mano (admin, importaciones): se hereda la raíz del padre
+        if self._state.adding and self.parent_document_id and not self.root_document_id:
+            self.root_document_id = (
+                Document.all_objects.filter(pk=self.parent_document_id)
+                .values_list("root_document_id", flat=True).get()
+                or self.parent_document_id
+            )
+
+        if update_fields is None or {"original_name", "document_number", "company"} & update_fields:
+            self.search_document = self.build_search_document()
+            if update_fields is not None:
+                update_fields.add("search_document")
+
+        if update_fields is not None:
+            # auto_now solo se guarda si la columna va en update_fields
+            kwargs["update_fields"] = {*update_fields, "updated_at"}
+
         super().save(*args, **kwargs)
 
     def can_be_approved(self): 
@@ -322,75 +431,48 @@ class Document(models.Model):
         self.reviewed_by = user
         self.edited_at = timezone.now()
     
+    # Los cambios de estado son compare-and-set en base de datos (documents.transitions):
+    # si otro revisor se ha adelantado, la transición se pierde y se lanza el error.
     def approve(self, user=None, auto=False):
-        if not self.can_be_approved():
+        from documents.transitions import apply_transition
+
+        if not apply_transition(self, "auto_approve" if auto else "approve", user=user):
             raise ValueError("Document cannot be approved.")
-        
-        self.status = "approved"
-        self.approved_at = None if auto else timezone.now()
-        self.approved_by = None if auto else user
-        self.is_auto_approved = auto
-        self.save(
-            update_fields=[
-                "status", "approved_at", "approved_by", "is_auto_approved"
-            ]
-        )
 
     def reject(self, user=None, reason=None):
-        if self.status != "pending":
-            raise ValidationError("Document cannot be rejected.")
+        from documents.transitions import apply_transition
 
-        self.status = "rejected"
-        self.rejected_at = timezone.now()
-        self.rejected_by = user
-        self.rejection_reason = reason
-
-        self.save(
-            update_fields=[
-                "status", "rejected_at", "rejected_by", "rejection_reason"
-            ]
-        )
+        if not apply_transition(self, "reject", user=user, reason=reason):
+            raise ValidationError("Document cannot be rejected.")
 
     def archive(self, user=None):
-        if self.status not in ["approved", "rejected"]:
-            raise ValidationError("Document cannot be archived.")
+        from documents.transitions import apply_transition
 
-        self.is_archived = True
-        self.archived_at = timezone.now()
-        self.archived_by = user
-        self.save(
-            update_fields=[
-                "is_archived", "archived_at", "archived_by"
-            ]
-        )
+        if not apply_transition(self, "archive", user=user):
+            raise ValidationError("Document cannot be archived.")
 
     def unarchive(self, user=None):
-        if not self.is_archived:
-            raise ValidationError("Document is not archived.")
+        from documents.transitions import apply_transition
 
-        self.is_archived = False
-        self.archived_at = None
-        self.archived_by = None
-        self.save(
-            update_fields=[
-                "is_archived", "archived_at", "archived_by"
-            ]
-        )
+        if not apply_transition(self, "unarchive", user=user):
+            raise ValidationError("Document is not archived.")
 
     def create_rectification(self, user, reason=None, **kwargs):
-        parent = self.parent_document or self
-
-        if parent.parent_document_id is not None:
-            parent = parent.parent_document
+        root_id = self.chain_root_id
 
         with transaction.atomic():
-            Document.all_objects.filter(
-                models.Q(pk=parent.pk) | models.Q(parent_document=parent)
-            ).update(is_current=False)
-
-            if self.parent_document_id is None and self.pk != parent.pk:
-                self.parent_document = parent
-                self.save(update_fields=["parent_document"])
+            # Un solo UPDATE: la cadena deja de estar vigente y la raíz sube su contador
+            Document.all_objects.filter(Q(pk=root_id) | Q(root_document_id=root_id)).update(
+                is_current=False,
+                updated_at=timezone.now(),
+                chain_version=models.Case(
+                    models.When(pk=root_id, then=models.F("chain_version") + 1),
+                    default=models.F("chain_version"),
+                    output_field=models.PositiveIntegerField(),
+                ),
+            )
+            # La fila de la raíz queda bloqueada por el UPDATE hasta el commit
+            version = Document.all_objects.filter(pk=root_id).values_list("chain_version", flat=True).get()
 
             amount_snapshot = {
                 "company_id": self.company_id,
@@ -398,16 +480,10 @@ class Document(models.Model):
                 "tax_amount": float(self.tax_amount or 0),
                 "total_amount": float(self.total_amount or 0),
             }
-            latest_version = (
-                Document.all_objects.filter(
-                    models.Q(pk=parent.pk) | models.Q(parent_document=parent)
-                ).aggregate(max_version=models.Max("version"))["max_version"]
-                or parent.version
-            )
-            new_external_id = f"{self.external_id}-rect-{latest_version + 1}" if self.external_id else None
+            new_external_id = f"{self.external_id}-rect-{version}" if self.external_id else None
 
-            new_doc = Document.objects.create(
-                client=self.client,
+            new_doc = Document(
+                client_id=self.client_id,
                 company=kwargs.get("company", self.company),
                 external_id=new_external_id,
                 original_name=self.original_name,
@@ -427,13 +503,237 @@ class Document(models.Model):
                 flow=kwargs.get("flow", self.flow),
                 flow_source=self.flow_source,
                 is_auto_approved=False,
-                parent_document=parent,
-                version=latest_version + 1,
+                parent_document_id=root_id,
+                root_document_id=root_id,
+                version=version,
                 is_current=True,
                 rectified_by=user,
                 rectified_at=timezone.now(),
                 rectification_reason=reason,
                 amount_snapshot=amount_snapshot,
             )
+            # Relaciones copiadas de la cadena y vigencia resuelta por el UPDATE de
+            # arriba: la integridad la sigue garantizando la base de datos
+            new_doc.save(force_insert=True, validate_integrity=False)
 
         return new_doc
+
+
+class PdfExportJob(models.Model):
+    """
+    Exportación PDF diferida. El PDF se guarda en MEDIA_ROOT con `cache_key`
+    en el nombre, así que una misma selección sin cambios no se vuelve a renderizar.
+    """
+
+    STATUS_CHOICES = [
+        ("queued", "En cola"),
+        ("processing", "Procesando"),
+        ("done", "Completado"),
+        ("failed", "Fallido"),
+    ]
+
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name="pdf_export_jobs"
+    )
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name="pdf_export_jobs",
+        null=True,
+        blank=True
+    )
+    cache_key = models.CharField(max_length=64)
+    document_ids = models.JSONField(default=list)
+    base_url = models.CharField(max_length=255, blank=True, default="")
+    filename = models.CharField(max_length=255, default="facturas.pdf")
+    file = models.FileField(upload_to="exports/pdf/", blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["client", "cache_key"]),
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"PDF export {self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ("done", "failed")
+
+
+class DocumentTransition(models.Model):
+    """
+    Registro de solo inserción de los cambios de estado de cada documento.
+    Lo escribe documents.transitions en la misma transacción que el UPDATE.
+    """
+
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name="document_transitions"
+    )
+    document = models.ForeignKey(
+        "Document",
+        on_delete=models.CASCADE,
+        related_name="transitions"
+    )
+    action = models.CharField(max_length=20)
+    from_status = models.CharField(max_length=20)
+    to_status = models.CharField(max_length=20)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name="document_transitions",
+        null=True,
+        blank=True
+    )
+    reason = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["client", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id}: {self.action} ({self.from_status} -> {self.to_status})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("DocumentTransition is append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("DocumentTransition is append-only.")
+
+
+class ChangeEvent(models.Model):
+    """
+    Registro de cambios de documentos y movimientos para las integraciones
+    (ver documents.change_feed). El id es la secuencia: se lee en orden con
+    `id > cursor`. No guarda los datos, solo qué objeto cambió y cómo.
+    """
+
+    ENTITY_CHOICES = [
+        ("document", "Documento"),
+        ("movement", "Movimiento"),
+    ]
+
+    ACTION_CHOICES = [
+        ("created", "Creado"),
+        ("updated", "Modificado"),
+        ("approved", "Aprobado"),
+        ("rejected", "Rechazado"),
+        ("archived", "Archivado"),
+        ("unarchived", "Desarchivado"),
+        ("rectified", "Rectificado"),
+        ("deleted", "Eliminado"),
+    ]
+
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name="change_events"
+    )
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["client", "id"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.entity} {self.object_id}: {self.action}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("ChangeEvent is append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("ChangeEvent is append-only.")
+
+
+class ClientChangeMarker(models.Model):
+    """
+    Marcador de cambios por cliente. `version` sube en la misma transacción
+    que cada cambio (documents.change_feed.touch) y la fila queda bloqueada
+    hasta el commit: los cambios de un mismo cliente se confirman de uno en
+    uno, en el orden en que toman el marcador.
+    """
+
+    client = models.OneToOneField(
+        Client,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="change_marker"
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.client_id}: v{self.version}"
+
+
+class DailyClientMetrics(models.Model):
+    """
+    Agregado diario por cliente que alimenta MetricsService. Las filas de
+    documentos se agrupan por flujo, tipo y estado (importes ya con el signo
+    de las rectificativas); los movimientos van en la fila con las tres
+    dimensiones vacías.
+    """
+
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name="daily_metrics"
+    )
+    day = models.DateField()
+    flow = models.CharField(max_length=20, blank=True, default="")
+    document_type = models.CharField(max_length=20, blank=True, default="")
+    status = models.CharField(max_length=20, blank=True, default="")
+
+    document_count = models.PositiveIntegerField(default=0)
+    auto_approved_count = models.PositiveIntegerField(default=0)
+    manual_approved_count = models.PositiveIntegerField(default=0)
+    confidence_sum = models.DecimalField(max_digits=14, decimal_places=4, default=0)
+    confidence_count = models.PositiveIntegerField(default=0)
+    base_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    movement_count = models.PositiveIntegerField(default=0)
+    movement_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    movement_expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["client", "day", "flow", "document_type", "status"],
+                name="unique_daily_metrics_row",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.client_id} {self.day} {self.flow}/{self.document_type}/{self.status}"
@@ -0,0 +1,38 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from billing_ai.pagination import Keyset
+from documents.models import Document
+from documents.services.metrics_cache import metrics_cache
+
+# Listado de documentos: (created_at, id) descendente sobre el índice (client, created_at)
+DOCUMENT_KEYSET = Keyset(Document, "created_at", "id")
+KEYSET_ORDERING = DOCUMENT_KEYSET.ordering
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator cuyo total se guarda en caché por consulta. La clave incluye la
+    generación del cliente (la misma que invalida las métricas), así que el
+    número se recalcula cuando cambia algún documento suyo.
+    """
+
+    def __init__(self, object_list, per_page, *, client_id=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.client_id = client_id
+
+    @cached_property
+    def count(self):
+        sql, params = self.object_list.query.sql_with_params()
+        digest = hashlib.sha256(repr((sql, params)).encode()).hexdigest()
+        key = f"documents:count:{self.client_id}:{metrics_cache.generation(self.client_id)}:{digest}"
+
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, timeout=getattr(settings, "DOCUMENT_COUNT_CACHE_TTL", 300))
+        return count
@@ -0,0 +1,17 @@
+"""
+Funciones que ejecutan los procesos del pool de `process_pdf_exports`.
+No importan modelos a nivel de módulo: en procesos lanzados con "spawn"
+Django todavía no está inicializado cuando se carga este fichero.
+"""
+
+
+def init_worker():
+    import django
+
+    django.setup()
+
+
+def render_export_job(job_id):
+    from documents.services.pdf_export_service import PdfExportService
+
+    return PdfExportService.render_by_id(job_id)
@@ -0,0 +1,187 @@
+"""
+Búsqueda de texto completo sobre Document.search_document.
+
+- PostgreSQL: columna `search_vector` (tsvector) con índice GIN, mantenida
+  por un trigger a partir de `search_document`.
+- SQLite: tabla virtual FTS5 de contenido externo mantenida por triggers.
+- Otros motores: icontains sobre `search_document` (sin ranking).
+
+Además de las palabras, `search_documents` acepta fragmentos (p. ej. parte de
+un número de factura) mediante billing_ai.substring_search; esas filas
+entran con relevancia 0.
+
+Las columnas, índices y triggers no son campos del modelo: se crean con
+`ensure_search_index` desde la migración y tras cada `migrate`.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from billing_ai.substring_search import substring_condition
+
+DOCUMENT_TABLE = "documents_document"
+FTS_TABLE = "documents_document_fts"
+SUBSTRING_FIELDS = ("original_name", "document_number", "company__name")
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TOKENS = 10
+
+
+def build_search_document(original_name, document_number, company_name, company_tax_id):
+    # Mismo formato que la actualización en bloque de documents.signals
+    return f"{original_name or ''} {document_number or ''} {company_name or ''} {company_tax_id or ''}"
+
+
+def search_tokens(query):
+    return TOKEN_RE.findall(query or "")[:MAX_TOKENS]
+
+
+def get_search_config():
+    return getattr(settings, "DOCUMENT_SEARCH_CONFIG", "spanish")
+
+
+def search_documents(qs, query):
+    """
+    Filtra `qs` por `query` (todas las palabras como prefijo, o la consulta
+    entera como fragmento de nombre, número o empresa) y anota `search_rank`:
+    cuanto mayor, más relevante.
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return qs.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    fragment = substring_condition(SUBSTRING_FIELDS, query, using=qs.db)
+    vendor = connections[qs.db].vendor
+
+    if vendor == "postgresql":
+        tsquery = " & ".join(f"{token}:*" for token in tokens)
+        params = (get_search_config(), tsquery)
+        return (
+            qs.filter(Q(RawSQL(
+                f'"{DOCUMENT_TABLE}"."search_vector" @@ to_tsquery(%s::regconfig, %s)',
+                params,
+                output_field=BooleanField(),
+            )) | fragment)
+            .annotate(search_rank=Coalesce(
+                RawSQL(
+                    f'ts_rank("{DOCUMENT_TABLE}"."search_vector", to_tsquery(%s::regconfig, %s))',
+                    params,
+                    output_field=FloatField(),
+                ),
+                Value(0.0),
+            ))
+        )
+
+    if vendor == "sqlite":
+        match = " ".join(f'"{token}"*' for token in tokens)
+        return (
+            qs.filter(Q(id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                (match,),
+            )) | fragment)
+            .annotate(search_rank=Coalesce(
+                RawSQL(
+                    # bm25 es menor cuanto más relevante: se invierte el signo
+                    f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+                    f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{DOCUMENT_TABLE}"."id"',
+                    (match,),
+                    output_field=FloatField(),
+                ),
+                Value(0.0),
+            ))
+        )
+
+    condition = Q()
+    for token in tokens:
+        condition &= Q(search_document__icontains=token)
+    return qs.filter(condition | fragment).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def ensure_search_index(connection, rebuild=False):
+    """
+    Crea (si faltan) la estructura de búsqueda del motor. En SQLite los
+    triggers se pierden cuando una migración reconstruye la tabla, así que
+    se comprueban tras cada `migrate` y se reindexa si hubo que recrearlos.
+    """
+    with connection.cursor() as cursor:
+        if DOCUMENT_TABLE not in connection.introspection.table_names(cursor):
+            return
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, DOCUMENT_TABLE)}
+    if "search_document" not in columns:
+        return
+
+    if connection.vendor == "postgresql":
+        _ensure_postgresql(connection, rebuild)
+    elif connection.vendor == "sqlite":
+        _ensure_sqlite(connection, rebuild)
+
+
+def _ensure_postgresql(connection, rebuild):
+    config = get_search_config()
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{DOCUMENT_TABLE}" ADD COLUMN IF NOT EXISTS "search_vector" tsvector')
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{DOCUMENT_TABLE}_search_vector_gin" '
+            f'ON "{DOCUMENT_TABLE}" USING gin ("search_vector")'
+        )
+        cursor.execute(f'DROP TRIGGER IF EXISTS "{DOCUMENT_TABLE}_search_vector_update" ON "{DOCUMENT_TABLE}"')
+        cursor.execute(
+            f'CREATE TRIGGER "{DOCUMENT_TABLE}_search_vector_update" '
+            f'BEFORE INSERT OR UPDATE OF "search_document" ON "{DOCUMENT_TABLE}" '
+            f'FOR EACH ROW EXECUTE PROCEDURE '
+            f'tsvector_update_trigger("search_vector", \'pg_catalog.{config}\', "search_document")'
+        )
+        if rebuild:
+            cursor.execute(
+                f'UPDATE "{DOCUMENT_TABLE}" SET "search_vector" = to_tsvector(%s::regconfig, "search_document")',
+                [config],
+            )
+
+
+SQLITE_TRIGGERS = {
+    f"{FTS_TABLE}_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END
+    """,
+    f"{FTS_TABLE}_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document);
+        END
+    """,
+    f"{FTS_TABLE}_au": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_document ON {DOCUMENT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document);
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END
+    """,
+}
+
+
+def _ensure_sqlite(connection, rebuild):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            [f"{FTS_TABLE}%"],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+
+        if FTS_TABLE not in existing:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"search_document, content='{DOCUMENT_TABLE}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+            rebuild = True
+
+        for name, sql in SQLITE_TRIGGERS.items():
+            if name not in existing:
+                cursor.execute(sql)
+                rebuild = True
+
+        if rebuild:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
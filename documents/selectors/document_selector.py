@@ -1,4 +1,5 @@
-from ..models import Document
+from ..models import Document, normalize_company_name
+from ..search import search_documents
 from django.db.models import Q
 
 
@@ -37,13 +38,14 @@ class DocumentSelector:
             qs = qs.filter(is_archived=False)
 
         if filters.get("query"):
-            qs = qs.filter(
-                Q(original_name__icontains=filters["query"])
-                | Q(company__name__icontains=filters["query"])
-            )
+            # Anota search_rank (mayor = más relevante)
+            qs = search_documents(qs, filters["query"])
 
         if filters.get("company"):
-            qs = qs.filter(company__name=filters["company"])
+            qs = qs.filter(
+                company__client=client,
+                company__normalized_name=normalize_company_name(filters["company"]),
+            )
 
         if filters.get("status"):
             qs = qs.filter(status=filters["status"])
@@ -67,6 +69,7 @@ class DocumentSelector:
 
     @staticmethod
     def detail_queryset(client):
+        # Todas las relaciones que muestran la ficha y status_message
         return (
             DocumentSelector.with_versions(client)
             .select_related(
@@ -75,14 +78,29 @@ class DocumentSelector:
                 "rejected_by",
                 "reviewed_by",
                 "archived_by",
+                "rectified_by",
             )
         )
 
     @staticmethod
     def version_history(document):
-        root = document.parent_document or document
+        root_id = document.chain_root_id
         return (
-            DocumentSelector.with_versions(document.client)
-            .filter(Q(parent_document=root) | Q(pk=root.pk))
+            DocumentSelector.with_versions(document.client_id)
+            .filter(Q(pk=root_id) | Q(root_document_id=root_id))
             .order_by("version")
         )
+
+    @staticmethod
+    def version_partitions(document):
+        """
+        Cadena de versiones de `document` en una sola consulta, repartida en
+        la raíz, las anteriores (de más reciente a más antigua) y las siguientes.
+        """
+        versions = list(DocumentSelector.version_history(document).only("id", "version", "created_at"))
+        root_id = document.chain_root_id
+        return {
+            "root": next((version for version in versions if version.pk == root_id), document),
+            "previous": [version for version in reversed(versions) if version.version < document.version],
+            "next": [version for version in versions if version.version > document.version],
+        }
@@ -1,2 +1,7 @@
 from .metrics_service import *
-from .documents_service import *
\ No newline at end of file
+from .documents_service import *
+from .company_cache import *
+from .pdf_export_service import *
+from .metrics_rollup import *
+from .metrics_cache import *
+from .dashboard_service import *
@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from documents.models import Company, normalize_company_name
+
+__all__ = ["CompanyCache", "company_cache"]
+
+
+class CompanyCache:
+    """
+    Caché LRU en memoria (por proceso) de resolución de companies.
+
+    Guarda (client_id, tipo, clave) -> company_id, donde tipo es "tax_id" o
+    "name" (nombre normalizado). Se invalida al guardar o borrar una Company.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._keys_by_company = {}
+        self._lock = threading.Lock()
+
+    def get_maxsize(self):
+        if self.maxsize is not None:
+            return self.maxsize
+        return getattr(settings, "COMPANY_CACHE_MAXSIZE", 10000)
+
+    @staticmethod
+    def _keys(client_id, tax_id=None, name=None):
+        keys = []
+        if tax_id:
+            keys.append((client_id, "tax_id", tax_id))
+        if name:
+            keys.append((client_id, "name", normalize_company_name(name)))
+        return keys
+
+    def get(self, client_id, tax_id=None, name=None):
+        # Igual que la búsqueda en BD: el CIF manda y el nombre solo se usa sin CIF
+        keys = self._keys(client_id, tax_id=tax_id) if tax_id else self._keys(client_id, name=name)
+
+        with self._lock:
+            for key in keys:
+                company_id = self._entries.get(key)
+                if company_id is not None:
+                    self._entries.move_to_end(key)
+                    return company_id
+        return None
+
+    def set(self, company):
+        keys = self._keys(company.client_id, company.tax_id, company.name)
+        maxsize = self.get_maxsize()
+
+        with self._lock:
+            for key in keys:
+                self._entries[key] = company.pk
+                self._entries.move_to_end(key)
+                self._keys_by_company.setdefault(company.pk, set()).add(key)
+
+            while len(self._entries) > maxsize:
+                key, company_id = self._entries.popitem(last=False)
+                company_keys = self._keys_by_company.get(company_id)
+                if company_keys is not None:
+                    company_keys.discard(key)
+                    if not company_keys:
+                        del self._keys_by_company[company_id]
+
+    def invalidate(self, company_id):
+        with self._lock:
+            for key in self._keys_by_company.pop(company_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_company.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def resolve(self, client, tax_id=None, name=None):
+        """
+        Devuelve la Company cacheada con una lectura por PK, sin bloqueos. La
+        lectura comprueba también la clave buscada: la invalidación es por
+        proceso y otro puede haber cambiado el CIF o el nombre.
+        """
+        company_id = self.get(client.pk, tax_id=tax_id, name=name)
+        if company_id is None:
+            return None
+
+        key = {"tax_id": tax_id} if tax_id else {"normalized_name": normalize_company_name(name)}
+        company = Company.objects.filter(pk=company_id, client=client, **key).first()
+        if company is None:
+            # Borrada o ya no coincide: fuera todas sus entradas
+            self.invalidate(company_id)
+            return None
+
+        # Evita la carga perezosa de company.client en Document.save
+        company.client = client
+        return company
+
+
+company_cache = CompanyCache()
@@ -0,0 +1,73 @@
+from django.db.models import Count, DecimalField, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from documents.selectors.document_selector import DocumentSelector
+from finance.models import FinancialMovement
+
+__all__ = ["DashboardService"]
+
+
+class DashboardService:
+    """
+    Datos de la página de inicio: un aggregate condicional para los
+    contadores de documentos y otro para los totales de movimientos del mes.
+    """
+
+    PENDING_DOCUMENTS_LIMIT = 10
+    RECENT_MOVEMENTS_LIMIT = 5
+    TOP_CATEGORIES_LIMIT = 3
+
+    @staticmethod
+    def get_dashboard(client, today=None):
+        today = today or timezone.now().date()
+        month_start = today.replace(day=1)
+
+        pending_qs = DocumentSelector.pending(client)
+        movement_qs = FinancialMovement.objects.filter(
+            client=client,
+            date__gte=month_start,
+            date__lte=today,
+            is_active=True,
+        )
+
+        document_counts = pending_qs.aggregate(
+            pending=Count("id"),
+            required=Count("id", filter=Q(review_level="required")),
+            recommended=Count("id", filter=Q(review_level="recommended")),
+        )
+
+        amount_field = DecimalField(max_digits=12, decimal_places=2)
+        movement_totals = movement_qs.aggregate(
+            income=Coalesce(Sum("amount", filter=Q(movement_type="income")), 0, output_field=amount_field),
+            expense=Coalesce(Sum("amount", filter=Q(movement_type="expense")), 0, output_field=amount_field),
+            unreconciled=Count("id", filter=Q(is_reconciled=False)),
+        )
+
+        top_expense_categories = list(
+            movement_qs.filter(movement_type="expense")
+            .values("category__name", "category__icon")
+            .annotate(total=Sum("amount"))
+            .order_by("-total")[:DashboardService.TOP_CATEGORIES_LIMIT]
+        )
+        recent_movements = list(
+            movement_qs.select_related("category")[:DashboardService.RECENT_MOVEMENTS_LIMIT]
+        )
+        pending_documents = list(
+            pending_qs.select_related("company")
+            .order_by("-created_at")[:DashboardService.PENDING_DOCUMENTS_LIMIT]
+        )
+
+        return {
+            "pending_documents": pending_documents,
+            "pending_count": document_counts["pending"],
+            "required_review_count": document_counts["required"],
+            "recommended_review_count": document_counts["recommended"],
+            "finance_period_label": f"{month_start.strftime('%d/%m/%Y')} - {today.strftime('%d/%m/%Y')}",
+            "finance_income_total": movement_totals["income"],
+            "finance_expense_total": movement_totals["expense"],
+            "finance_balance": movement_totals["income"] - movement_totals["expense"],
+            "unreconciled_movements_count": movement_totals["unreconciled"],
+            "recent_movements": recent_movements,
+            "top_expense_categories": top_expense_categories,
+        }
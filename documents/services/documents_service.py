@@ -3,6 +3,8 @@ from documents.models import Document
 from documents.utils import parse_decimal
 from decimal import InvalidOperation
 
+__all__ = ["DocumentService"]
+
 class DocumentService:
 
     @staticmethod
@@ -71,4 +73,23 @@ class DocumentService:
 
         document.mark_as_manually_reviewed(user)
 
-        document.save()
\ No newline at end of file
+        document.save()
+
+    # Acciones en bloque (ver documents.transitions)
+    @staticmethod
+    def bulk_approve(client, ids, user=None):
+        from documents.transitions import apply_bulk_transition
+
+        return apply_bulk_transition(client, ids, "approve", user=user)
+
+    @staticmethod
+    def bulk_reject(client, ids, user=None, reason=None):
+        from documents.transitions import apply_bulk_transition
+
+        return apply_bulk_transition(client, ids, "reject", user=user, reason=reason)
+
+    @staticmethod
+    def bulk_archive(client, ids, user=None):
+        from documents.transitions import apply_bulk_transition
+
+        return apply_bulk_transition(client, ids, "archive", user=user)
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from documents import change_feed
+
+__all__ = ["MetricsCache", "metrics_cache"]
+
+
+class MetricsCache:
+    """
+    Caché de resultados de MetricsService sobre el framework de caché de
+    Django (locmem, fichero, Redis...).
+
+    La clave de cada entrada incluye la versión del marcador de cambios del
+    cliente (ClientChangeMarker, ver documents.change_feed), que sube en la
+    misma transacción que cada cambio de sus documentos o movimientos. Al
+    leerse de la base de datos, un cambio hecho en cualquier proceso (otro
+    worker de gunicorn, el de trabajos) deja de servir las entradas antiguas
+    en todos; esas entradas caducan solas.
+    """
+
+    def __init__(self, prefix="metrics"):
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "METRICS_CACHE_ALIAS", "default")]
+
+    def get_timeout(self):
+        return getattr(settings, "METRICS_CACHE_TTL", 600)
+
+    def generation(self, client_id):
+        return change_feed.marker(client_id)[0]
+
+    def key(self, client_id, name, *parts):
+        suffix = ":".join(str(part) for part in parts)
+        return f"{self.prefix}:{client_id}:{self.generation(client_id)}:{name}:{suffix}"
+
+    def get_or_compute(self, client_id, name, parts, compute):
+        key = self.key(client_id, name, *parts)
+        result = self.cache.get(key)
+        if result is None:
+            result = compute()
+            self.cache.set(key, result, timeout=self.get_timeout())
+        return result
+
+
+metrics_cache = MetricsCache()
@@ -0,0 +1,210 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, When
+
+from documents import change_feed
+from documents.models import DailyClientMetrics, Document
+from finance.models import FinancialMovement
+
+__all__ = ["MetricsRollupService", "signed_amount"]
+
+DOCUMENT_DIMENSIONS = ("flow", "document_type", "status")
+DOCUMENT_METRICS = (
+    "document_count",
+    "auto_approved_count",
+    "manual_approved_count",
+    "confidence_sum",
+    "confidence_count",
+    "base_amount",
+    "tax_amount",
+    "total_amount",
+)
+MOVEMENT_METRICS = ("movement_count", "movement_income", "movement_expense")
+
+# Campos cuyo cambio altera el agregado; el resto de guardados no lo toca
+DOCUMENT_TRACKED_FIELDS = {
+    "client", "issue_date", "flow", "document_type", "status", "review_level",
+    "is_auto_approved", "confidence_global", "base_amount", "tax_amount",
+    "total_amount", "is_current",
+}
+MOVEMENT_TRACKED_FIELDS = {"client", "date", "movement_type", "category", "amount", "is_active"}
+
+
+def signed_amount(field):
+    return Case(
+        # Rectificativa de ingreso → resta
+        When(
+            document_type="corrected_invoice",
+            flow="in",
+            then=-F(field)
+        ),
+        # Rectificativa de gasto → suma (anula gasto previo)
+        When(
+            document_type="corrected_invoice",
+            flow="out",
+            then=F(field)
+        ),
+        default=F(field),
+        output_field=DecimalField()
+    )
+
+
+class MetricsRollupService:
+    """
+    Mantiene DailyClientMetrics. Cada refresco recalcula solo los días
+    afectados de un cliente, así que su coste no depende del histórico.
+    """
+
+    @staticmethod
+    def refresh_documents(client_id, days):
+        days = {day for day in days if day is not None}
+        if not days:
+            return
+
+        qs = Document.all_objects.filter(client_id=client_id, is_current=True, issue_date__in=days)
+
+        with transaction.atomic(savepoint=False):
+            MetricsRollupService._lock_client(client_id)
+            rows = [
+                DailyClientMetrics(client_id=client_id, **row)
+                for row in MetricsRollupService._document_rows(qs)
+            ]
+            MetricsRollupService._upsert(rows, DOCUMENT_METRICS)
+            stale = DailyClientMetrics.objects.filter(client_id=client_id, day__in=days).exclude(status="")
+            if rows:
+                stale = stale.exclude(reduce(or_, (
+                    Q(day=row.day, flow=row.flow, document_type=row.document_type, status=row.status)
+                    for row in rows
+                )))
+            stale.delete()
+
+    @staticmethod
+    def refresh_movements(client_id, days):
+        days = {day for day in days if day is not None}
+        if not days:
+            return
+
+        qs = FinancialMovement.objects.filter(client_id=client_id, date__in=days)
+
+        with transaction.atomic(savepoint=False):
+            MetricsRollupService._lock_client(client_id)
+            rows = [
+                DailyClientMetrics(client_id=client_id, **row)
+                for row in MetricsRollupService._movement_rows(qs)
+            ]
+            MetricsRollupService._upsert(rows, MOVEMENT_METRICS)
+            (
+                DailyClientMetrics.objects
+                .filter(client_id=client_id, day__in=days - {row.day for row in rows}, status="")
+                .delete()
+            )
+
+    @staticmethod
+    def refresh_document_chain(document):
+        """
+        Una rectificativa marca como no vigentes al original y sus versiones
+        con un update(); se recalculan los días de toda la cadena.
+        """
+        root_id = document.chain_root_id
+        days = (
+            Document.all_objects
+            .filter(Q(pk=root_id) | Q(root_document_id=root_id))
+            .order_by()
+            .values_list("issue_date", flat=True)
+            .distinct()
+        )
+        MetricsRollupService.refresh_documents(document.client_id, days)
+
+    @staticmethod
+    def rebuild(client_ids=None):
+        """Regenera el agregado completo (de todos los clientes o de los indicados)."""
+        documents = Document.all_objects.filter(is_current=True, issue_date__isnull=False)
+        movements = FinancialMovement.objects.all()
+        existing = DailyClientMetrics.objects.all()
+        if client_ids is not None:
+            documents = documents.filter(client_id__in=client_ids)
+            movements = movements.filter(client_id__in=client_ids)
+            existing = existing.filter(client_id__in=client_ids)
+
+        rows = [
+            DailyClientMetrics(**row)
+            for row in MetricsRollupService._document_rows(documents, by_client=True)
+        ]
+        rows += [
+            DailyClientMetrics(**row)
+            for row in MetricsRollupService._movement_rows(movements, by_client=True)
+        ]
+
+        with transaction.atomic():
+            existing.delete()
+            DailyClientMetrics.objects.bulk_create(rows, batch_size=1000)
+
+        return len(rows)
+
+    @staticmethod
+    def _document_rows(qs, by_client=False):
+        group_by = ("client_id",) if by_client else ()
+        grouped = (
+            qs.order_by()
+            .values(*group_by, "issue_date", *DOCUMENT_DIMENSIONS)
+            .annotate(
+                rollup_document_count=Count("id"),
+                rollup_auto_approved_count=Count("id", filter=Q(review_level="auto", is_auto_approved=True)),
+                rollup_manual_approved_count=Count("id", filter=Q(review_level="manual")),
+                rollup_confidence_sum=Sum("confidence_global"),
+                rollup_confidence_count=Count("confidence_global"),
+                rollup_base_amount=Sum(signed_amount("base_amount")),
+                rollup_tax_amount=Sum(signed_amount("tax_amount")),
+                rollup_total_amount=Sum(signed_amount("total_amount")),
+            )
+        )
+
+        for row in grouped:
+            yield {
+                **{key: row[key] for key in group_by},
+                "day": row["issue_date"],
+                **{key: row[key] or "" for key in DOCUMENT_DIMENSIONS},
+                **{key: row[f"rollup_{key}"] or 0 for key in DOCUMENT_METRICS},
+            }
+
+    @staticmethod
+    def _movement_rows(qs, by_client=False):
+        group_by = ("client_id",) if by_client else ()
+        grouped = (
+            qs.filter(is_active=True)
+            .order_by()
+            .values(*group_by, "date")
+            .annotate(
+                rollup_movement_count=Count("id"),
+                rollup_movement_income=Sum("amount", filter=Q(movement_type="income")),
+                rollup_movement_expense=Sum("amount", filter=Q(movement_type="expense")),
+            )
+        )
+
+        for row in grouped:
+            yield {
+                **{key: row[key] for key in group_by},
+                "day": row["date"],
+                **{key: row[f"rollup_{key}"] or 0 for key in MOVEMENT_METRICS},
+            }
+
+    @staticmethod
+    def _lock_client(client_id):
+        # Dos escritores del mismo cliente no pueden recalcular a la vez: el
+        # segundo espera al commit del primero y su agregado ya incluye esas
+        # filas (si no, su upsert pisaría el del primero con totales viejos).
+        # El bloqueo es la fila del marcador de cambios, que además queda subido.
+        change_feed.touch(client_id)
+
+    @staticmethod
+    def _upsert(rows, fields):
+        if not rows:
+            return
+        DailyClientMetrics.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["client", "day", *DOCUMENT_DIMENSIONS],
+            update_fields=[*fields, "updated_at"],
+        )
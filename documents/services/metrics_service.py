@@ -1,15 +1,15 @@
-from django.db.models import Sum, Count, Q, Avg, Case, When, DecimalField, F
+from django.db.models import Sum, Count, Q, Min
 from django.db.models.functions import TruncMonth, TruncDay
 from django.utils import timezone
 from django.utils.formats import date_format
-from documents.models import Document
+from documents.models import DailyClientMetrics, Document
 from collections import defaultdict
 from django.utils.dateformat import DateFormat
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from documents.selectors.document_selector import DocumentSelector
 from babel.dates import format_date
-from finance.models import FinancialMovement
+from .metrics_cache import metrics_cache
 
 User = get_user_model()
 
@@ -17,47 +17,61 @@ class MetricsService:
 
     @staticmethod
     def get_user_metrics(user, start=None, end=None):
-        queryset = DocumentSelector.for_client(user.client)
-        movement_queryset = FinancialMovement.objects.filter(
-            client=user.client,
-            is_active=True,
+        return metrics_cache.get_or_compute(
+            user.client_id,
+            "user",
+            (start, end),
+            lambda: MetricsService.compute_user_metrics(user, start, end),
         )
 
-        if start and end:
-            queryset = queryset.filter(issue_date__range=[start, end])
-            movement_queryset = movement_queryset.filter(date__range=[start, end])
-
-
-        # 1. Metricas de documentos
-        totals = queryset.aggregate(
-            total_documents=Count("id"),
-            approved_documents=Count("id", filter=Q(status="approved")),
-            rejected_documents=Count("id", filter=Q(status="rejected")),
-            pending_documents=Count("id", filter=Q(status="pending")),
-            auto_approved_count=Count(
-                "id",
-                filter=Q(status="approved", review_level="auto", is_auto_approved=True)
-            ),
-            manual_approved_count=Count(
-                "id",
-                filter=Q(status="approved", review_level="manual")
-            ),
-            confidence_average=Avg(
-                "confidence_global",
-                filter=Q(status="approved")
-            ),
+    @staticmethod
+    def get_historical_metrics(user):
+        return metrics_cache.get_or_compute(
+            user.client_id,
+            "historical",
+            (),
+            lambda: MetricsService.compute_historical_metrics(user),
         )
 
-        # 2. Métricas de movimientos financieros
-        movement_totals = movement_queryset.aggregate(
-            total_movements=Count("id"),
-            income=Sum("amount", filter=Q(movement_type="income")),
-            expense=Sum("amount", filter=Q(movement_type="expense")),
+    @staticmethod
+    def compute_user_metrics(user, start=None, end=None):
+        # Se lee del agregado diario (DailyClientMetrics): el coste depende de
+        # los días del rango, no del número de documentos del cliente
+        rollup = DailyClientMetrics.objects.filter(client=user.client)
+
+        if start and end:
+            rollup = rollup.filter(day__range=[start, end])
+
+        billing_filter = Q(
+            status="approved",
+            document_type__in=["invoice", "corrected_invoice"],
+        )
+        income_filter = billing_filter & Q(flow="in")
+        expense_filter = billing_filter & Q(flow="out")
+        approved_filter = Q(status="approved")
+
+        # 1. Documentos y movimientos en una sola consulta
+        totals = rollup.aggregate(
+            total_documents=Sum("document_count"),
+            approved_documents=Sum("document_count", filter=approved_filter),
+            rejected_documents=Sum("document_count", filter=Q(status="rejected")),
+            pending_documents=Sum("document_count", filter=Q(status="pending")),
+            auto_approved_count=Sum("auto_approved_count", filter=approved_filter),
+            manual_approved_count=Sum("manual_approved_count", filter=approved_filter),
+            confidence_sum=Sum("confidence_sum", filter=approved_filter),
+            confidence_count=Sum("confidence_count", filter=approved_filter),
+            income_base=Sum("base_amount", filter=income_filter),
+            income_tax=Sum("tax_amount", filter=income_filter),
+            expense_base=Sum("base_amount", filter=expense_filter),
+            expense_tax=Sum("tax_amount", filter=expense_filter),
+            total_movements=Sum("movement_count"),
+            movement_income=Sum("movement_income"),
+            movement_expense=Sum("movement_expense"),
         )
 
-        movement_count = movement_totals["total_movements"] or 0
-        movement_income = movement_totals["income"] or 0
-        movement_expense = movement_totals["expense"] or 0
+        movement_count = totals["total_movements"] or 0
+        movement_income = totals["movement_income"] or 0
+        movement_expense = totals["movement_expense"] or 0
         movement_profit = movement_income - movement_expense
         movement_profit_margin = (movement_profit / movement_income * 100) if movement_income else 0
 
@@ -70,59 +84,28 @@ class MetricsService:
         auto_rate = (auto_approved / total_documents * 100) if total_documents else 0
         manual_rate = (manual_approved / total_documents * 100) if total_documents else 0
 
-        confidence_avg = (totals["confidence_average"] or 0) * 100
+        confidence_average = (
+            totals["confidence_sum"] / totals["confidence_count"]
+            if totals["confidence_count"]
+            else 0
+        )
+        confidence_avg = confidence_average * 100
 
 
         # Financial metrics
-        billing_queryset = queryset.filter(
-            status="approved",
-            document_type__in=["invoice", "corrected_invoice"],
-        )
+        billing_queryset = rollup.filter(billing_filter)
 
-        income_queryset = billing_queryset.filter(flow="in")
-        expense_queryset = billing_queryset.filter(flow="out")
-
-        def signed(field):
-            return Case(
-                # Rectificativa de ingreso → resta
-                When(
-                    document_type="corrected_invoice",
-                    flow="in",
-                    then=-F(field)
-                ),
-                # Rectificativa de gasto → suma (anula gasto previo)
-                When(
-                    document_type="corrected_invoice",
-                    flow="out",
-                    then=F(field)
-                ),
-                default=F(field),
-                output_field=DecimalField()
-            )
-        
         def get_granularity(start, end):
             delta = (end - start).days
             if delta <= 31:
                 return TruncDay, "%d %b"  # etiquetas tipo 1 Feb
             return TruncMonth, "%b %Y"  # etiquetas tipo Feb 2026
 
-        income_totals = income_queryset.aggregate(
-            total_amount=Sum(signed("total_amount")),
-            total_tax=Sum(signed("tax_amount")),
-            total_base=Sum(signed("base_amount")),
-        )
-
-        expense_totals = expense_queryset.aggregate(
-            total_amount=Sum(signed("total_amount")),
-            total_tax=Sum(signed("tax_amount")),
-            total_base=Sum(signed("base_amount")),
-        )
-
-        base_income = income_totals["total_base"] or 0
-        base_expense = expense_totals["total_base"] or 0
+        base_income = totals["income_base"] or 0
+        base_expense = totals["expense_base"] or 0
 
-        tax_income = income_totals["total_tax"] or 0
-        tax_expense = expense_totals["total_tax"] or 0
+        tax_income = totals["income_tax"] or 0
+        tax_expense = totals["expense_tax"] or 0
         profit = base_income - base_expense
         profit_margin = (profit / base_income * 100) if base_income > 0 else 0    
 
@@ -138,10 +121,10 @@ class MetricsService:
 
         monthly_data = (
             billing_queryset
-            .filter(issue_date__range=(start, end))
-            .annotate(period=trunc_func("issue_date"))
+            .filter(day__range=(start, end))
+            .annotate(period=trunc_func("day"))
             .values("period", "flow")
-            .annotate(total=Sum(signed("base_amount")))
+            .annotate(total=Sum("base_amount"))
             .order_by("period")
         )
 
@@ -219,7 +202,7 @@ class MetricsService:
         }
     
     @staticmethod
-    def get_historical_metrics(user):
+    def compute_historical_metrics(user):
         qs = DocumentSelector.for_client(user.client)
 
         totals = qs.aggregate(
@@ -227,16 +210,13 @@ class MetricsService:
             approved=Count("id", filter=Q(status="approved")),
             rejected=Count("id", filter=Q(status="rejected")),
             pending=Count("id", filter=Q(status="pending")),
+            first_document_date=Min("issue_date"),
         )
 
         total = totals["total"] or 0
         approved = totals["approved"] or 0
         approval_rate = (approved / total * 100) if total else 0
-
-        if qs.count() > 0:
-            first_document_date = qs.order_by("issue_date").first().issue_date
-        else:
-            first_document_date = None
+        first_document_date = totals["first_document_date"]
 
         return {
             "total": total,
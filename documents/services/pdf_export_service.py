@@ -0,0 +1,197 @@
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.http import FileResponse, Http404
+from django.utils import timezone
+
+from documents.models import Document, PdfExportJob
+from documents.utils import build_client_pdf_context, pdf_export_filename, render_invoices_pdf
+
+__all__ = ["PdfExportService"]
+
+logger = logging.getLogger(__name__)
+
+PDF_EXPORT_DIR = "exports/pdf"
+
+
+class PdfExportService:
+    """
+    Exportaciones PDF cacheadas en MEDIA_ROOT. La clave depende del cliente,
+    de los documentos seleccionados (en orden) y de sus fechas de edición y
+    aprobación, además de la versión de la plantilla.
+    """
+
+    @staticmethod
+    def build_cache_key(client, rows):
+        template_version = getattr(settings, "PDF_EXPORT_TEMPLATE_VERSION", "1")
+        digest = hashlib.sha256()
+        digest.update(
+            f"{template_version}|{client.pk}|{client.primary_color}|{client.logo.name if client.logo else ''}".encode()
+        )
+        for doc_id, edited_at, approved_at, _ in rows:
+            digest.update(
+                f"|{doc_id}:{edited_at.isoformat() if edited_at else ''}:{approved_at.isoformat() if approved_at else ''}".encode()
+            )
+        return digest.hexdigest()
+
+    @staticmethod
+    def cache_path(client, cache_key):
+        return f"{PDF_EXPORT_DIR}/{client.pk}/{cache_key}.pdf"
+
+    @staticmethod
+    def request_export(*, client, user, qs, base_url=""):
+        """
+        Devuelve el job de la selección: uno ya existente (en cola, en curso o
+        terminado con su fichero) o uno nuevo en cola.
+        """
+        rows = list(qs.values_list("id", "edited_at", "approved_at", "document_number"))
+        cache_key = PdfExportService.build_cache_key(client, rows)
+
+        job = (
+            PdfExportJob.objects
+            .filter(client=client, cache_key=cache_key)
+            .exclude(status="failed")
+            .order_by("-id")
+            .first()
+        )
+        if job and (job.status != "done" or default_storage.exists(job.file.name)):
+            return job
+
+        path = PdfExportService.cache_path(client, cache_key)
+        cached = default_storage.exists(path)
+
+        return PdfExportJob.objects.create(
+            client=client,
+            requested_by=user,
+            cache_key=cache_key,
+            document_ids=[row[0] for row in rows],
+            base_url=base_url,
+            filename=pdf_export_filename([row[3] for row in rows]),
+            file=path if cached else "",
+            status="done" if cached else "queued",
+            finished_at=timezone.now() if cached else None,
+        )
+
+    @staticmethod
+    def claim(job):
+        """Marca un job concreto como en curso si nadie lo ha tomado antes."""
+        claimed = PdfExportJob.objects.filter(pk=job.pk, status="queued").update(
+            status="processing",
+            locked_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            job.status = "processing"
+        return bool(claimed)
+
+    @staticmethod
+    def claim_jobs(batch_size=5):
+        now = timezone.now()
+
+        with transaction.atomic():
+            job_ids = list(
+                PdfExportJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(status="queued")
+                .order_by("created_at", "id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            PdfExportJob.objects.filter(pk__in=job_ids).update(
+                status="processing",
+                locked_at=now,
+                attempts=F("attempts") + 1,
+            )
+
+        return job_ids
+
+    @staticmethod
+    def requeue_stale_jobs():
+        """
+        Devuelve a la cola los jobs de un worker que murió a mitad de proceso.
+        Los que ya agotaron sus intentos se marcan como fallidos: un PDF que
+        tumba al worker (selección enorme, falta de memoria) se repetiría sin fin.
+        """
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=getattr(settings, "PDF_EXPORT_LOCK_TIMEOUT", 600))
+        stale = PdfExportJob.objects.filter(status="processing", locked_at__lt=cutoff)
+
+        stale.filter(attempts__gte=F("max_attempts")).update(
+            status="failed",
+            locked_at=None,
+            last_error="Worker lock expired after max attempts",
+            finished_at=now,
+        )
+        return stale.update(status="queued", locked_at=None)
+
+    @staticmethod
+    def render(job):
+        """Renderiza un job ya reservado y guarda el PDF en MEDIA_ROOT."""
+        client = job.client
+        path = PdfExportService.cache_path(client, job.cache_key)
+
+        try:
+            if not default_storage.exists(path):
+                qs = (
+                    Document.all_objects
+                    .filter(client=client, id__in=job.document_ids)
+                    .select_related("company")
+                )
+                position = {doc_id: index for index, doc_id in enumerate(job.document_ids)}
+                context = build_client_pdf_context(qs, client)
+                context["invoices"] = sorted(qs, key=lambda invoice: position[invoice.id])
+
+                pdf_bytes = render_invoices_pdf(base_url=job.base_url or None, **context)
+                path = default_storage.save(path, ContentFile(pdf_bytes))
+        except Exception as exc:
+            logger.exception("PDF export job %s failed", job.pk)
+            return PdfExportService._finish(job, "failed", error=str(exc))
+
+        job.file.name = path
+        return PdfExportService._finish(job, "done")
+
+    @staticmethod
+    def render_by_id(job_id):
+        job = PdfExportJob.objects.select_related("client").get(pk=job_id)
+        return PdfExportService.render(job).status
+
+    @staticmethod
+    def process_pending(batch_size=5, executor=None):
+        """
+        Procesa los jobs en cola. Con `executor` (p. ej. un ProcessPoolExecutor)
+        el renderizado se reparte entre procesos; sin él se hace en línea.
+        """
+        PdfExportService.requeue_stale_jobs()
+        job_ids = PdfExportService.claim_jobs(batch_size=batch_size)
+        if executor is None:
+            return [PdfExportService.render_by_id(job_id) for job_id in job_ids]
+
+        from documents.pdf_worker import render_export_job
+
+        return list(executor.map(render_export_job, job_ids))
+
+    @staticmethod
+    def file_response(job):
+        if job.status != "done" or not default_storage.exists(job.file.name):
+            raise Http404("La exportación no está disponible")
+
+        return FileResponse(
+            default_storage.open(job.file.name, "rb"),
+            as_attachment=True,
+            filename=job.filename,
+            content_type="application/pdf",
+        )
+
+    @staticmethod
+    def _finish(job, status, error=""):
+        job.status = status
+        job.locked_at = None
+        job.last_error = error
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "file", "locked_at", "last_error", "finished_at"])
+        return job
@@ -0,0 +1,146 @@
+from django.db import connections, transaction
+from django.db.models import F, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+from clients.models import Client
+from finance.models import FinancialMovement
+from . import change_feed
+from .models import Company, Document
+from .search import ensure_search_index
+from .services.company_cache import company_cache
+from .services.metrics_rollup import (
+    DOCUMENT_TRACKED_FIELDS,
+    MOVEMENT_TRACKED_FIELDS,
+    MetricsRollupService,
+)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_cache(sender, instance, **kwargs):
+    company_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Company)
+def refresh_company_search_documents(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # El nombre y el NIF de la empresa forman parte del texto indexado de sus documentos
+    if raw or created:
+        return
+    if update_fields is not None and not {"name", "tax_id"} & set(update_fields):
+        return
+    with transaction.atomic(savepoint=False):
+        Document.all_objects.filter(company=instance).update(
+            search_document=Concat(
+                F("original_name"),
+                Value(" "),
+                Coalesce(F("document_number"), Value("")),
+                Value(f" {instance.name or ''} {instance.tax_id or ''}"),
+                output_field=TextField(),
+            )
+        )
+        # Cambian los resultados de búsqueda: invalida las respuestas con ETag
+        change_feed.touch(instance.client_id)
+
+
+@receiver(post_migrate)
+def ensure_document_search_index(sender, app_config=None, using="default", **kwargs):
+    # En SQLite los triggers de FTS5 desaparecen si una migración reconstruye la tabla
+    if app_config is not None and app_config.label == "documents":
+        ensure_search_index(connections[using])
+
+
+def _affects_rollup(update_fields, tracked):
+    return update_fields is None or bool(tracked & set(update_fields))
+
+
+def _previous_day(instance, date_field, update_fields):
+    """(client_id, fecha) antes del guardado, para recalcular también el día de origen."""
+    if instance._state.adding or instance.pk is None:
+        return None
+    if update_fields is not None and not {"client", date_field} & set(update_fields):
+        return instance.client_id, getattr(instance, date_field)
+    return (
+        type(instance)._base_manager
+        .filter(pk=instance.pk)
+        .values_list("client_id", date_field)
+        .first()
+    )
+
+
+def _refresh(refresh, instance, date_field, previous):
+    days = {getattr(instance, date_field)}
+    if previous and previous[0] == instance.client_id:
+        days.add(previous[1])
+    elif previous:
+        refresh(previous[0], {previous[1]})
+    refresh(instance.client_id, days)
+
+
+@receiver(pre_save, sender=Document)
+def remember_document_day(sender, instance, update_fields=None, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if not raw and _affects_rollup(update_fields, DOCUMENT_TRACKED_FIELDS):
+        instance._rollup_previous = _previous_day(instance, "issue_date", update_fields)
+
+
+@receiver(post_save, sender=Document)
+def update_document_rollup(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or not _affects_rollup(update_fields, DOCUMENT_TRACKED_FIELDS):
+        return
+    if created and instance.root_document_id:
+        MetricsRollupService.refresh_document_chain(instance)
+        return
+    _refresh(MetricsRollupService.refresh_documents, instance, "issue_date", getattr(instance, "_rollup_previous", None))
+
+
+@receiver(post_delete, sender=Document)
+def remove_document_from_rollup(sender, instance, **kwargs):
+    MetricsRollupService.refresh_documents(instance.client_id, {instance.issue_date})
+
+
+@receiver(pre_save, sender=FinancialMovement)
+def remember_movement_day(sender, instance, update_fields=None, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if not raw and _affects_rollup(update_fields, MOVEMENT_TRACKED_FIELDS):
+        instance._rollup_previous = _previous_day(instance, "date", update_fields)
+
+
+@receiver(post_save, sender=FinancialMovement)
+def update_movement_rollup(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or not _affects_rollup(update_fields, MOVEMENT_TRACKED_FIELDS):
+        return
+    _refresh(MetricsRollupService.refresh_movements, instance, "date", getattr(instance, "_rollup_previous", None))
+
+
+@receiver(post_delete, sender=FinancialMovement)
+def remove_movement_from_rollup(sender, instance, **kwargs):
+    MetricsRollupService.refresh_movements(instance.client_id, {instance.date})
+
+
+@receiver(post_save, sender=Document)
+def record_document_change(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        action = "rectified" if instance.root_document_id else "created"
+    else:
+        action = "updated"
+    change_feed.record(instance.client_id, "document", instance.pk, action)
+
+
+@receiver(post_save, sender=FinancialMovement)
+def record_movement_change(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        change_feed.record(instance.client_id, "movement", instance.pk, "created" if created else "updated")
+
+
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=FinancialMovement)
+def record_deletion(sender, instance, origin=None, **kwargs):
+    # Al borrar el cliente se borra también su registro de cambios
+    if getattr(origin, "model", type(origin)) is Client:
+        return
+    entity = "document" if sender is Document else "movement"
+    change_feed.record(instance.client_id, entity, instance.pk, "deleted")
+
@@ -5,7 +5,7 @@ import pytest
 from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from documents.models import Company, Document
+from documents.models import Company, Document, normalize_company_name
 
 
 @pytest.mark.django_db
@@ -22,6 +22,20 @@ class TestCompanyModel:
         assert company.tax_id == "B12345678"
         assert company.get_type() == "Proveedor"
 
+    def test_normalize_company_name_strips_accents_case_and_punctuation(self):
+        assert normalize_company_name("  Construcciónes  GÓMEZ,  S.L. ") == "construcciones gomez s l"
+        assert normalize_company_name(None) == ""
+
+    def test_company_keeps_normalized_name_in_sync(self, client_entity):
+        company = Company.objects.create(client=client_entity, name="Café Núñez")
+        assert company.normalized_name == "cafe nunez"
+
+        company.name = "Café Núñez S.A."
+        company.save(update_fields=["name"])
+        company.refresh_from_db()
+
+        assert company.normalized_name == "cafe nunez s a"
+
     def test_company_string_representation_uses_type_label(self, customer_company):
         assert str(customer_company) == "Cliente Uno (Cliente)"
 
@@ -94,6 +108,26 @@ class TestDocumentModel:
                 flow="in",
             )
 
+    def test_state_transitions_are_an_update_plus_audit_insert(self, approved_document, user, django_assert_num_queries):
+        document = Document.all_objects.get(pk=approved_document.pk)
+
+        # UPDATE del estado, auditoría y registro de cambios (marcador + evento)
+        with django_assert_num_queries(6) as captured:
+            document.archive(user=user)
+
+        statements = [query["sql"].split(" ", 1)[0] for query in captured.captured_queries]
+        assert statements == ["SAVEPOINT", "UPDATE", "INSERT", "UPDATE", "INSERT", "RELEASE"]
+
+    def test_scoped_save_still_validates_updated_fields(self, document, other_client_entity):
+        document.flow = "sideways"
+        with pytest.raises(ValidationError):
+            document.save(update_fields=["flow"])
+
+        document.refresh_from_db()
+        document.company = Company.objects.create(client=other_client_entity, name="Foreign", is_provider=True)
+        with pytest.raises(ValueError, match="Company must belong to the same client"):
+            document.save(update_fields=["company_id"])
+
     def test_create_rectification_creates_new_current_version(self, approved_document, user):
         new_doc = approved_document.create_rectification(
             user=user,
@@ -109,3 +143,25 @@ class TestDocumentModel:
         assert new_doc.is_current is True
         assert new_doc.base_amount == Decimal("150.00")
         assert new_doc.amount_snapshot["base_amount"] == 100.0
+        assert new_doc.root_document_id == approved_document.id
+        assert approved_document.chain_version == 2
+
+    def test_rectification_cost_does_not_grow_with_the_chain(self, approved_document, user, django_assert_num_queries):
+        def rectify(document):
+            # Instancia recién leída: company y client sin cargar
+            document = Document.all_objects.select_related("company").get(pk=document.pk)
+            # UPDATE, SELECT e INSERT entre SAVEPOINT/RELEASE, el registro de cambios
+            # y el refresco del agregado diario
+            with django_assert_num_queries(12) as captured:
+                new_doc = document.create_rectification(user=user, reason="Corrección")
+            return new_doc, captured
+
+        second, _ = rectify(approved_document)
+        third, _ = rectify(second)
+        fourth, captured = rectify(third)
+
+        statements = [query["sql"].split(" ", 1)[0] for query in captured.captured_queries]
+        assert statements[:4] == ["SAVEPOINT", "UPDATE", "SELECT", "INSERT"]
+        assert (third.version, fourth.version) == (3, 4)
+        assert fourth.root_document_id == third.root_document_id == approved_document.id
+        assert list(Document.all_objects.filter(is_current=True, root_document=approved_document)) == [fourth]
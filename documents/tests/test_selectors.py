@@ -98,3 +98,76 @@ class TestDocumentSelector:
 
         assert history == [approved_document, rectified]
         assert exportable == [rectified]
+
+    def test_version_partitions_splits_the_chain_in_one_query(self, approved_document, django_assert_num_queries):
+        user = approved_document.approved_by
+        second = approved_document.create_rectification(user=user, reason="Fix")
+        third = second.create_rectification(user=user, reason="Fix again")
+
+        with django_assert_num_queries(1):
+            versions = DocumentSelector.version_partitions(second)
+
+        assert versions["root"] == approved_document
+        assert versions["previous"] == [approved_document]
+        assert versions["next"] == [third]
+
+    def test_filtered_company_matches_normalized_name(self, client_entity, approved_document):
+        filters = {"company": "  proveedor UNO ", "doc_status": "all"}
+
+        assert list(DocumentSelector.filtered(client_entity, filters)) == [approved_document]
+
+
+@pytest.mark.django_db
+class TestDocumentSearch:
+    def _create(self, client_entity, company, name, number=None):
+        return Document.all_objects.create(
+            client=client_entity,
+            company=company,
+            external_id=name,
+            original_name=name,
+            file=SimpleUploadedFile(name, b"x", content_type="application/pdf"),
+            document_type="invoice",
+            document_number=number,
+            confidence={"score": 0.5},
+            flow="in",
+        )
+
+    def _search(self, client_entity, query):
+        return list(DocumentSelector.filtered(client_entity, {"query": query, "doc_status": "all"}))
+
+    def test_matches_number_tax_id_and_company_name_without_accents(self, client_entity, company, customer_company):
+        company.name = "Construcción Pérez"
+        company.save()
+        by_provider = self._create(client_entity, company, "ticket.pdf", number="FAC-2026-17")
+        by_customer = self._create(client_entity, customer_company, "recibo.pdf")
+
+        assert self._search(client_entity, "construccion perez") == [by_provider]
+        assert self._search(client_entity, "fac-2026") == [by_provider]
+        assert self._search(client_entity, "C87654321") == [by_customer]
+        assert self._search(client_entity, "recib") == [by_customer]
+
+    def test_results_carry_relevance_rank(self, client_entity, company):
+        weak = self._create(client_entity, company, "factura-mensual-alquiler-oficina-centro-madrid.pdf")
+        strong = self._create(client_entity, company, "alquiler-alquiler.pdf")
+
+        results = sorted(self._search(client_entity, "alquiler"), key=lambda doc: -doc.search_rank)
+
+        assert results == [strong, weak]
+
+    def test_index_follows_document_and_company_renames(self, client_entity, company, document):
+        document.original_name = "suministros.pdf"
+        document.save(update_fields=["original_name"])
+        company.name = "Eléctrica Norte"
+        company.save(update_fields=["name"])
+
+        assert self._search(client_entity, "invoice") == []
+        assert self._search(client_entity, "suministros electrica") == [document]
+        assert self._search(client_entity, "proveedor") == []
+
+    def test_matches_fragments_inside_words(self, client_entity, company):
+        document = self._create(client_entity, company, "ticket.pdf", number="FAC-2026-17")
+
+        results = self._search(client_entity, "26-1")
+
+        assert results == [document]
+        assert results[0].search_rank == 0
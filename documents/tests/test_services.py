@@ -1,11 +1,20 @@
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
 
 import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.utils import timezone
 
-from documents.models import Document
+from documents.models import DailyClientMetrics, Document, DocumentTransition, PdfExportJob
+from documents.services.dashboard_service import DashboardService
 from documents.services.documents_service import DocumentService
+from documents.services.metrics_cache import metrics_cache
+from documents.services.metrics_rollup import MetricsRollupService
 from documents.services.metrics_service import MetricsService
+from documents.services.pdf_export_service import PdfExportService
 
 
 @pytest.mark.django_db
@@ -70,6 +79,119 @@ class TestDocumentService:
         assert rectified.version == 2
         assert rectified.rectification_reason == "Ajuste IVA"
 
+    def _pending_copy(self, document, external_id, **fields):
+        return Document.all_objects.create(**{
+            "client": document.client,
+            "company": document.company,
+            "external_id": external_id,
+            "original_name": f"{external_id}.pdf",
+            "file": document.file.name,
+            "document_type": "invoice",
+            "confidence": {"score": 0.5},
+            "status": "pending",
+            "issue_date": document.issue_date,
+            "base_amount": Decimal("10.00"),
+            "total_amount": Decimal("12.10"),
+            "flow": "in",
+            **fields,
+        })
+
+    def test_bulk_approve_updates_eligible_and_reports_skipped(
+        self, client_entity, document, approved_document, user, other_user, django_assert_max_num_queries
+    ):
+        eligible = self._pending_copy(document, "bulk-ok")
+        no_total = self._pending_copy(document, "bulk-no-total", total_amount=None)
+        foreign = self._pending_copy(document, "bulk-foreign")
+        Document.all_objects.filter(pk=foreign.pk).update(client=other_user.client)
+
+        # Selección + UPDATE + auditoría + registro de cambios (2) + refresco del agregado con su bloqueo (4) + savepoint (2)
+        with django_assert_max_num_queries(11):
+            result = DocumentService.bulk_approve(
+                client_entity, [eligible.pk, approved_document.pk, no_total.pk, foreign.pk], user=user
+            )
+
+        assert result == {
+            "updated": [eligible.pk],
+            "skipped": [
+                {"id": approved_document.pk, "reason": "not_pending"},
+                {"id": no_total.pk, "reason": "missing_total"},
+                {"id": foreign.pk, "reason": "not_found"},
+            ],
+        }
+        eligible.refresh_from_db()
+        assert (eligible.status, eligible.approved_by, eligible.is_auto_approved) == ("approved", user, False)
+        assert DailyClientMetrics.objects.get(
+            client=client_entity, day=document.issue_date, status="approved"
+        ).document_count == 2
+
+    def test_bulk_reject_and_archive(self, client_entity, document, user):
+        pending = self._pending_copy(document, "bulk-pending")
+
+        result = DocumentService.bulk_reject(client_entity, [document.pk, pending.pk], user=user, reason="Duplicado")
+        assert result["updated"] == [document.pk, pending.pk]
+
+        result = DocumentService.bulk_archive(client_entity, [document.pk, pending.pk], user=user)
+        assert result["updated"] == [document.pk, pending.pk]
+
+        result = DocumentService.bulk_archive(client_entity, [document.pk], user=user)
+        assert result["skipped"] == [{"id": document.pk, "reason": "already_archived"}]
+
+        document.refresh_from_db()
+        assert (document.status, document.rejection_reason, document.is_archived) == ("rejected", "Duplicado", True)
+
+        assert list(
+            DocumentTransition.objects.filter(document=document).values_list("action", "from_status", "to_status")
+        ) == [("reject", "pending", "rejected"), ("archive", "rejected", "rejected")]
+
+
+@pytest.mark.django_db
+class TestDocumentTransitions:
+    def test_stale_instance_loses_the_race(self, document, user, other_user):
+        first = Document.all_objects.get(pk=document.pk)
+        second = Document.all_objects.get(pk=document.pk)
+
+        first.approve(user=user)
+        with pytest.raises(ValidationError, match="cannot be rejected"):
+            second.reject(user=other_user, reason="Duplicado")
+
+        document.refresh_from_db()
+        assert (document.status, document.approved_by, document.rejection_reason) == ("approved", user, None)
+        assert list(DocumentTransition.objects.values_list("action", "from_status", "to_status", "user")) == [
+            ("approve", "pending", "approved", user.pk),
+        ]
+
+    def test_apply_transition_updates_instance_and_reports_result(self, approved_document, user):
+        from documents.transitions import apply_transition
+
+        assert apply_transition(approved_document, "unarchive", user=user) is False
+        assert apply_transition(approved_document, "archive", user=user) is True
+        assert approved_document.is_archived is True
+        assert approved_document.archived_by == user
+
+        with pytest.raises(ValueError, match="append-only"):
+            DocumentTransition.objects.get().delete()
+
+
+@pytest.mark.django_db
+class TestChangeFeed:
+    def test_events_take_the_client_marker_before_their_id(self, client_entity, other_client_entity, django_assert_num_queries):
+        from documents import change_feed
+
+        assert change_feed.marker(client_entity.id) == (0, None)
+
+        # Primer evento: crea el marcador; después basta con subirlo
+        first = change_feed.record(client_entity.id, "document", 1, "created")
+        with django_assert_num_queries(2) as captured:
+            second = change_feed.record(client_entity.id, "document", 1, "approved")
+        change_feed.record_many(other_client_entity.id, "movement", [5, 6], "created")
+
+        statements = [query["sql"].split(" ", 1)[0] for query in captured.captured_queries]
+        assert statements == ["UPDATE", "INSERT"]
+        assert change_feed.marker(client_entity.id)[0] == 2
+        assert change_feed.marker(other_client_entity.id)[0] == 1
+        events, has_more = change_feed.events_after(client_entity.id, first.id, 10)
+        assert (events, has_more) == ([second], False)
+
 
 @pytest.mark.django_db
 class TestMetricsService:
@@ -135,6 +257,67 @@ class TestMetricsService:
         assert metrics["financials"]["movements"]["expense"] == 100.0
         assert metrics["status_distribution"]["auto_approved"] == 1
 
+    def test_get_user_metrics_signs_corrected_invoices_from_rollup(
+        self,
+        user,
+        approved_document,
+        client_entity,
+        company,
+        document_file,
+        django_assert_num_queries,
+    ):
+        approved_document.flow = "in"
+        approved_document.save()
+
+        def create(external_id, document_type, flow, base, tax):
+            Document.all_objects.create(
+                client=client_entity,
+                company=company,
+                external_id=external_id,
+                original_name=f"{external_id}.pdf",
+                file=document_file,
+                document_type=document_type,
+                document_number=external_id.upper(),
+                confidence={"confianza_extraccion": 0.90},
+                status="approved",
+                review_level="manual",
+                issue_date=date(2026, 3, 20),
+                base_amount=Decimal(base),
+                tax_amount=Decimal(tax),
+                tax_percentage=Decimal("21.00"),
+                total_amount=Decimal(base) + Decimal(tax),
+                flow=flow,
+                is_current=True,
+            )
+
+        create("rect-in", "corrected_invoice", "in", "10.00", "2.10")
+        create("exp-1", "invoice", "out", "40.00", "8.40")
+        create("rect-out", "corrected_invoice", "out", "5.00", "1.05")
+
+        # Marcador de cambios (clave de la caché), agregado diario y gráfico
+        with django_assert_num_queries(3):
+            metrics = MetricsService.get_user_metrics(user=user, start=date(2026, 3, 1), end=date(2026, 3, 31))
+
+        documents = metrics["financials"]["documents"]
+        assert documents["income"] == 90.0
+        assert documents["expense"] == 45.0
+        assert documents["profit"] == 45.0
+        assert documents["vat"] == {"collected": 18.9, "paid": 9.45, "balance": 9.45}
+        assert metrics["documents"]["approved"] == 4
+        assert metrics["charts"]["income_expense_monthly"] == [
+            {"period": "10 Mar", "income": 100.0, "expense": 0, "profit": 100.0},
+            {"period": "20 Mar", "income": -10.0, "expense": 45.0, "profit": -55.0},
+        ]
+
+    def test_get_historical_metrics_uses_single_query(self, user, approved_document, django_assert_num_queries):
+        # Marcador de cambios (clave de la caché) y la agregación
+        with django_assert_num_queries(2):
+            metrics = MetricsService.get_historical_metrics(user)
+
+        assert metrics["total"] == 1
+        assert metrics["approved"] == 1
+        assert metrics["first_document_date"] == approved_document.issue_date
+
     def test_get_historical_metrics_handles_empty_dataset(self, user):
         metrics = MetricsService.get_historical_metrics(user)
 
@@ -146,3 +329,284 @@ class TestMetricsService:
             "approval_rate": 0,
             "first_document_date": None,
         }
+
+
+@pytest.mark.django_db
+class TestDashboardService:
+    def test_counts_and_totals_within_query_budget(
+        self, user, client_entity, company, document, financial_movement, expense_category, django_assert_num_queries
+    ):
+        from finance.models import FinancialMovement
+
+        Document.all_objects.filter(pk=document.pk).update(review_level="recommended")
+        FinancialMovement.objects.create(
+            client=client_entity,
+            movement_type="expense",
+            created_by=user,
+            category=expense_category,
+            description="Compra",
+            amount=Decimal("120.00"),
+            is_reconciled=True,
+            date=date(2026, 3, 15),
+        )
+
+        # 2 aggregates + categorías + movimientos recientes + documentos pendientes
+        with django_assert_num_queries(5):
+            dashboard = DashboardService.get_dashboard(client_entity, today=date(2026, 3, 20))
+            assert dashboard["pending_documents"][0].company.name == company.name
+
+        assert dashboard["pending_count"] == 1
+        assert dashboard["recommended_review_count"] == 1
+        assert dashboard["required_review_count"] == 0
+        assert dashboard["finance_income_total"] == Decimal("500.00")
+        assert dashboard["finance_expense_total"] == Decimal("120.00")
+        assert dashboard["finance_balance"] == Decimal("380.00")
+        assert dashboard["unreconciled_movements_count"] == 1
+        assert dashboard["top_expense_categories"][0]["total"] == Decimal("120.00")
+        assert dashboard["finance_period_label"] == "01/03/2026 - 20/03/2026"
+
+
+@pytest.mark.django_db
+class TestMetricsCache:
+    def test_repeated_calls_are_served_from_cache(self, user, approved_document, django_assert_num_queries):
+        start, end = date(2026, 3, 1), date(2026, 3, 31)
+        first = MetricsService.get_user_metrics(user=user, start=start, end=end)
+
+        # Solo la lectura del marcador de cambios del cliente
+        with django_assert_num_queries(1):
+            assert MetricsService.get_user_metrics(user=user, start=start, end=end) == first
+
+        # Otro rango es otra entrada
+        with django_assert_num_queries(3):
+            MetricsService.get_user_metrics(user=user, start=start, end=date(2026, 4, 30))
+
+    def test_document_change_bumps_client_generation(self, user, approved_document, other_user):
+        assert MetricsService.get_historical_metrics(user)["approved"] == 1
+        other_generation = metrics_cache.generation(other_user.client_id)
+
+        approved_document.status = "rejected"
+        approved_document.save()
+
+        historical = MetricsService.get_historical_metrics(user)
+        assert historical["approved"] == 0
+        assert historical["rejected"] == 1
+        assert metrics_cache.generation(other_user.client_id) == other_generation
+
+    def test_movement_change_invalidates_user_metrics(self, user, financial_movement):
+        start, end = date(2026, 3, 1), date(2026, 3, 31)
+        assert MetricsService.get_user_metrics(user=user, start=start, end=end)["financials"]["movements"]["income"] == 500.0
+
+        financial_movement.delete()
+
+        assert MetricsService.get_user_metrics(user=user, start=start, end=end)["financials"]["movements"]["income"] == 0.0
+
+    def test_generation_is_shared_through_the_database(self, user, approved_document):
+        from documents import change_feed
+
+        generation = metrics_cache.generation(user.client_id)
+        # Un cambio confirmado por otro proceso solo deja rastro en la base de datos
+        change_feed.touch(user.client_id)
+
+        assert metrics_cache.generation(user.client_id) == generation + 1
+
+
+@pytest.mark.django_db
+class TestMetricsRollupService:
+    @staticmethod
+    def snapshot(client):
+        return sorted(
+            DailyClientMetrics.objects.filter(client=client).values_list(
+                "day", "flow", "document_type", "status",
+                "document_count", "auto_approved_count", "manual_approved_count",
+                "base_amount", "tax_amount", "movement_count", "movement_income", "movement_expense",
+            )
+        )
+
+    def test_document_changes_update_rollup_incrementally(self, client_entity, document, user):
+        row = DailyClientMetrics.objects.get(client=client_entity, day=document.issue_date)
+        assert (row.status, row.document_count) == ("pending", 1)
+
+        document.approve(user=user, auto=False)
+        row = DailyClientMetrics.objects.get(client=client_entity, day=document.issue_date)
+        assert (row.status, row.document_count, row.base_amount) == ("approved", 1, Decimal("100.00"))
+
+        old_day = document.issue_date
+        document.issue_date = date(2026, 4, 2)
+        document.save()
+
+        assert not DailyClientMetrics.objects.filter(client=client_entity, day=old_day).exists()
+        assert DailyClientMetrics.objects.get(client=client_entity, day=date(2026, 4, 2)).document_count == 1
+
+        document.delete()
+        assert not DailyClientMetrics.objects.filter(client=client_entity).exists()
+
+    def test_refresh_locks_the_client_before_aggregating(self, client_entity, document, django_assert_num_queries):
+        from documents import change_feed
+
+        version = change_feed.marker(client_entity.id)[0]
+        with django_assert_num_queries(4) as captured:
+            MetricsRollupService.refresh_documents(client_entity.id, {document.issue_date})
+
+        # El UPDATE del marcador (bloqueo hasta el commit) va antes de leer los documentos
+        statements = [query["sql"].split(" ", 1)[0] for query in captured.captured_queries]
+        assert statements[:2] == ["UPDATE", "SELECT"]
+        assert change_feed.marker(client_entity.id)[0] == version + 1
+
+    def test_rectification_moves_chain_to_new_version(self, client_entity, approved_document, user):
+        approved_document.create_rectification(
+            user=user,
+            reason="Datos corregidos",
+            base_amount=Decimal("150.00"),
+        )
+
+        row = DailyClientMetrics.objects.get(client=client_entity, day=approved_document.issue_date)
+        assert (row.status, row.document_count, row.base_amount) == ("pending", 1, Decimal("150.00"))
+
+    def test_movement_save_and_delete_update_rollup(self, client_entity, financial_movement):
+        row = DailyClientMetrics.objects.get(client=client_entity, day=financial_movement.date, status="")
+        assert (row.movement_count, row.movement_income) == (1, financial_movement.amount)
+
+        financial_movement.is_active = False
+        financial_movement.save()
+
+        assert not DailyClientMetrics.objects.filter(client=client_entity, status="").exists()
+
+    def test_rebuild_command_matches_incremental_rollup(self, client_entity, approved_document, financial_movement):
+        incremental = self.snapshot(client_entity)
+        DailyClientMetrics.objects.all().delete()
+
+        call_command("rebuild_daily_metrics", "--client", str(client_entity.pk), stdout=StringIO())
+
+        assert self.snapshot(client_entity) == incremental
+        assert len(incremental) == 2
+
+
+class TestCompanyCache:
+    def test_evicts_least_recently_used_entries(self):
+        from documents.models import Company
+        from documents.services.company_cache import CompanyCache
+
+        cache = CompanyCache(maxsize=2)
+        first = Company(pk=1, client_id=1, name="Uno", tax_id="A1")
+        second = Company(pk=2, client_id=1, name="Dos", tax_id=None)
+
+        cache.set(first)  # claves por CIF y por nombre
+        assert cache.get(1, name="Dos") is None
+        cache.get(1, tax_id="A1")
+        cache.set(second)
+
+        assert len(cache) == 2
+        assert cache.get(1, tax_id="A1") == 1
+        assert cache.get(1, name="uno") is None
+        assert cache.get(1, name="DOS") == 2
+
+    def test_tax_id_lookup_does_not_fall_back_to_name(self):
+        from documents.models import Company
+        from documents.services.company_cache import CompanyCache
+
+        cache = CompanyCache()
+        cache.set(Company(pk=1, client_id=1, name="Uno", tax_id="A1"))
+
+        assert cache.get(1, tax_id="B2", name="Uno") is None
+        assert cache.get(2, tax_id="A1") is None
+
+    @pytest.mark.django_db
+    def test_resolve_evicts_entry_changed_by_another_process(self, client_entity):
+        from documents.models import Company
+        from documents.services.company_cache import CompanyCache
+
+        cache = CompanyCache()
+        company = Company.objects.create(client=client_entity, name="Uno", tax_id="A1", is_provider=True)
+        cache.set(company)
+        assert cache.resolve(client_entity, tax_id="A1") == company
+
+        # Cambio hecho en otro proceso: no pasa por la invalidación de esta caché
+        Company.objects.filter(pk=company.pk).update(tax_id="B2", name="Otra", normalized_name="otra")
+
+        assert cache.resolve(client_entity, tax_id="A1") is None
+        assert cache.resolve(client_entity, name="Uno") is None
+        assert len(cache) == 0
+
+
+@pytest.mark.django_db
+class TestPdfExportService:
+    def test_cache_key_changes_when_document_is_edited(self, client_entity, approved_document):
+        qs = Document.objects.filter(pk=approved_document.pk)
+        rows = list(qs.values_list("id", "edited_at", "approved_at", "document_number"))
+        key = PdfExportService.build_cache_key(client_entity, rows)
+
+        assert PdfExportService.build_cache_key(client_entity, rows) == key
+
+        approved_document.edited_at = timezone.now()
+        approved_document.save(update_fields=["edited_at"])
+        rows = list(qs.values_list("id", "edited_at", "approved_at", "document_number"))
+
+        assert PdfExportService.build_cache_key(client_entity, rows) != key
+
+    @patch("documents.utils.render_pdf_from_html", return_value=b"%PDF-1.4 test")
+    def test_request_export_reuses_job_and_cached_file(self, render_pdf_mock, client_entity, user, approved_document, media_root):
+        qs = Document.objects.filter(pk=approved_document.pk)
+
+        job = PdfExportService.request_export(client=client_entity, user=user, qs=qs)
+        assert job.status == "queued"
+        assert PdfExportService.request_export(client=client_entity, user=user, qs=qs) == job
+
+        assert PdfExportService.process_pending() == ["done"]
+        job.refresh_from_db()
+        assert (media_root / job.file.name).read_bytes() == b"%PDF-1.4 test"
+
+        # Aunque se borre el job, el fichero en MEDIA_ROOT sigue sirviendo de caché
+        job.delete()
+        cached = PdfExportService.request_export(client=client_entity, user=user, qs=qs)
+
+        assert cached.status == "done"
+        assert cached.file.name == job.file.name
+        render_pdf_mock.assert_called_once()
+
+    @patch("documents.utils.render_pdf_from_html", side_effect=RuntimeError("boom"))
+    def test_render_failure_marks_job_failed_and_is_retried_on_next_request(self, render_pdf_mock, client_entity, user, approved_document, media_root):
+        qs = Document.objects.filter(pk=approved_document.pk)
+        job = PdfExportService.request_export(client=client_entity, user=user, qs=qs)
+
+        PdfExportService.process_pending()
+        job.refresh_from_db()
+
+        assert job.status == "failed"
+        assert job.last_error == "boom"
+        assert PdfExportService.request_export(client=client_entity, user=user, qs=qs).pk != job.pk
+
+    def test_requeue_stale_jobs(self, client_entity):
+        job = PdfExportJob.objects.create(
+            client=client_entity,
+            cache_key="x" * 64,
+            status="processing",
+            locked_at=timezone.now() - timedelta(hours=1),
+        )
+
+        assert PdfExportService.requeue_stale_jobs() == 1
+        job.refresh_from_db()
+        assert job.status == "queued"
+
+    def test_stale_jobs_out_of_attempts_are_failed(self, client_entity):
+        job = PdfExportJob.objects.create(
+            client=client_entity,
+            cache_key="x" * 64,
+            status="processing",
+            attempts=3,
+            max_attempts=3,
+            locked_at=timezone.now() - timedelta(hours=1),
+        )
+
+        assert PdfExportService.requeue_stale_jobs() == 0
+        job.refresh_from_db()
+        assert job.status == "failed"
+        assert job.locked_at is None
+        assert job.finished_at is not None
+
+    def test_claim_counts_attempts(self, client_entity):
+        job = PdfExportJob.objects.create(client=client_entity, cache_key="x" * 64)
+
+        assert PdfExportService.claim(job) is True
+        assert PdfExportService.claim(job) is False
+        job.refresh_from_db()
+        assert job.attempts == 1
@@ -5,6 +5,7 @@ Tests for documents/utils.py — pure utility functions that have no existing co
 - normalize_tax
 - build_pdf_context (light check)
 - export_to_csv / export_to_excel response headers
+- stream_csv_export
 """
 from decimal import Decimal, InvalidOperation
 
@@ -18,6 +19,7 @@ from documents.utils import (
     build_pdf_context,
     export_to_csv,
     export_to_excel,
+    stream_csv_export,
 )
 
 pytestmark = pytest.mark.django_db
@@ -142,6 +144,41 @@ class TestExportToCsv:
         assert str(approved_document.total_amount) in content
 
 
+# ---------------------------------------------------------------------------
+# stream_csv_export
+# ---------------------------------------------------------------------------
+
+class TestStreamCsvExport:
+    def _content(self, response):
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_streams_rows_and_running_totals(self, approved_document):
+        from documents.models import Document
+        qs = Document.all_objects.filter(pk=approved_document.pk)
+        response = stream_csv_export(qs)
+
+        lines = self._content(response).strip().splitlines()
+
+        assert response["Content-Type"] == "text/csv"
+        assert "documentos.csv" in response["Content-Disposition"]
+        assert lines[0].startswith("Fecha,")
+        assert "INV-001,Proveedor Uno,100.00" in lines[1]
+        assert lines[-1] == "Totales,,,100.00,,21.00,121.00"
+
+    def test_empty_queryset_yields_zero_totals(self, db):
+        from documents.models import Document
+        response = stream_csv_export(Document.all_objects.none())
+
+        assert self._content(response).strip().splitlines()[-1] == "Totales,,,0.00,,0.00,0.00"
+
+    def test_uses_single_query_regardless_of_rows(self, approved_document, django_assert_num_queries):
+        from documents.models import Document
+        qs = Document.all_objects.filter(client=approved_document.client)
+
+        with django_assert_num_queries(1):
+            self._content(stream_csv_export(qs))
+
+
 # ---------------------------------------------------------------------------
 # export_to_excel
 # ---------------------------------------------------------------------------
@@ -159,7 +196,32 @@ class TestExportToExcel:
         from documents.models import Document
         qs = Document.all_objects.filter(pk=approved_document.pk)
         response = export_to_excel(qs)
-        assert len(response.content) > 0
+        assert len(b"".join(response.streaming_content)) > 0
+
+    def test_excel_rows_use_column_formats_and_totals(self, approved_document):
+        from io import BytesIO
+        from openpyxl import load_workbook
+        from documents.models import Document
+        qs = Document.all_objects.filter(pk=approved_document.pk)
+        response = export_to_excel(qs)
+
+        ws = load_workbook(BytesIO(b"".join(response.streaming_content)))["Documentos"]
+        rows = list(ws.iter_rows(values_only=True))
+
+        assert rows[0][0] == "Fecha"
+        assert rows[1][1] == "INV-001"
+        assert rows[1][2] == "Proveedor Uno"
+        assert ws["A2"].number_format == "DD/MM/YYYY"
+        assert ws["D2"].number_format == "#,##0.00"
+        assert rows[-1][0] == "Totales"
+        assert rows[-1][6] == 121
+
+    def test_excel_export_uses_single_query(self, approved_document, django_assert_num_queries):
+        from documents.models import Document
+        qs = Document.all_objects.filter(client=approved_document.client)
+
+        with django_assert_num_queries(1):
+            export_to_excel(qs)
 
 
 # ---------------------------------------------------------------------------
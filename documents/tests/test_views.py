@@ -5,7 +5,8 @@ import pytest
 from django.contrib.messages import get_messages
 from django.urls import reverse
 
-from documents.models import Document
+from documents.models import Document, PdfExportJob
+from documents.services.pdf_export_service import PdfExportService
 
 
 @pytest.mark.django_db
@@ -46,7 +47,8 @@ class TestDocumentViews:
 
         assert response.status_code == 200
         assert response["Content-Type"] == "text/csv"
-        assert "Número documento" in response.content.decode("utf-8")
+        assert response.streaming is True
+        assert "Número documento" in b"".join(response.streaming_content).decode("utf-8")
 
     def test_document_export_preview_builds_summary(self, auth_client, approved_document):
         response = auth_client.get(reverse("documents:export_preview"))
@@ -66,7 +68,7 @@ class TestDocumentViews:
         assert approved_document in list(response.context["pdf_context"]["invoices"])
 
     @patch("documents.utils.render_pdf_from_html", return_value=b"%PDF-1.4 test")
-    def test_document_export_returns_pdf_for_selected_invoice(self, render_pdf_mock, auth_client, approved_document):
+    def test_document_export_returns_pdf_for_selected_invoice(self, render_pdf_mock, auth_client, approved_document, media_root):
         response = auth_client.post(reverse("documents:export"), data={"format": "pdf", "ids": [approved_document.id]})
 
         assert response.status_code == 200
@@ -74,9 +76,65 @@ class TestDocumentViews:
         # Single document: filename uses document_number; multiple: "facturas.pdf"
         expected_filename = f'attachment; filename="factura_{approved_document.document_number}.pdf"'
         assert response["Content-Disposition"] == expected_filename
-        assert response.content.startswith(b"%PDF-1.4")
+        assert b"".join(response.streaming_content).startswith(b"%PDF-1.4")
         render_pdf_mock.assert_called_once()
 
+    @patch("documents.utils.render_pdf_from_html", return_value=b"%PDF-1.4 test")
+    def test_document_export_pdf_serves_cached_file_on_repeat(self, render_pdf_mock, auth_client, approved_document, media_root):
+        data = {"format": "pdf", "ids": [approved_document.id]}
+        auth_client.post(reverse("documents:export"), data=data)
+        response = auth_client.post(reverse("documents:export"), data=data)
+
+        assert response.status_code == 200
+        assert b"".join(response.streaming_content) == b"%PDF-1.4 test"
+        render_pdf_mock.assert_called_once()
+
+    @patch("documents.utils.render_pdf_from_html", return_value=b"%PDF-1.4 test")
+    def test_document_export_pdf_queues_large_selection(self, render_pdf_mock, auth_client, approved_document, media_root, settings):
+        settings.PDF_EXPORT_SYNC_MAX_DOCUMENTS = 0
+
+        response = auth_client.post(reverse("documents:export"), data={"format": "pdf", "ids": [approved_document.id]})
+
+        job = PdfExportJob.objects.get()
+        assert response.status_code == 302
+        assert response.url == reverse("documents:pdf_export_job", args=[job.pk])
+        assert job.status == "queued"
+        render_pdf_mock.assert_not_called()
+
+        status = auth_client.get(reverse("documents:pdf_export_status", args=[job.pk])).json()
+        assert status["status"] == "queued"
+        assert status["download_url"] is None
+
+        PdfExportService.process_pending()
+
+        status = auth_client.get(reverse("documents:pdf_export_status", args=[job.pk])).json()
+        assert status["status"] == "done"
+        download = auth_client.get(status["download_url"])
+        assert download.status_code == 200
+        assert b"".join(download.streaming_content) == b"%PDF-1.4 test"
+
+    def test_pdf_export_job_is_scoped_to_client(self, auth_client, other_client_entity):
+        job = PdfExportJob.objects.create(client=other_client_entity, cache_key="x" * 64)
+
+        assert auth_client.get(reverse("documents:pdf_export_job", args=[job.pk])).status_code == 404
+        assert auth_client.get(reverse("documents:pdf_export_status", args=[job.pk])).status_code == 404
+
+    def test_document_bulk_action_returns_updated_and_skipped(self, auth_client, document, approved_document):
+        response = auth_client.post(
+            reverse("documents:bulk_action"),
+            {"action": "archive", "ids": [str(approved_document.pk), "abc"]},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "action": "archive",
+            "updated": [approved_document.pk],
+            "skipped": [{"id": "abc", "reason": "not_found", "message": "No existe o no es la versión vigente"}],
+        }
+
+        response = auth_client.post(reverse("documents:bulk_action"), {"action": "delete", "ids": [str(document.pk)]})
+        assert response.status_code == 400
+
     def test_document_rectify_view_redirects_non_rectifiable_document(self, auth_client, document):
         response = auth_client.get(reverse("documents:rectify", kwargs={"pk": document.pk}), follow=True)
 
@@ -105,6 +163,117 @@ class TestDocumentViews:
         assert new_doc.version == 2
         assert new_doc.rectification_reason == "Importe corregido"
 
+    def _create_documents(self, client_entity, company, document_file, count):
+        return [
+            Document.all_objects.create(
+                client=client_entity,
+                company=company,
+                external_id=f"list-{index}",
+                original_name=f"list-{index}.pdf",
+                file=document_file,
+                document_type="invoice",
+                confidence={"score": 0.5},
+                flow="in",
+            )
+            for index in range(count)
+        ]
+
+    def test_document_list_keyset_mode_walks_pages(
+        self, auth_client, client_entity, company, document_file, monkeypatch
+    ):
+        from documents.views import DocumentListView
+
+        monkeypatch.setattr(DocumentListView, "paginate_by", 2)
+        documents = self._create_documents(client_entity, company, document_file, 5)
+        expected = [document.id for document in reversed(documents)]
+
+        response = auth_client.get(reverse("documents:list"), {"pagination": "keyset"})
+        seen = [document.id for document in response.context["documents"]]
+        page = response.context["page_obj"]
+        assert page.has_previous is False
+
+        while page.has_next:
+            response = auth_client.get(reverse("documents:list"), {"pagination": "keyset", "after": page.next_cursor})
+            page = response.context["page_obj"]
+            seen.extend(document.id for document in response.context["documents"])
+
+        assert seen == expected
+
+        response = auth_client.get(reverse("documents:list"), {"pagination": "keyset", "before": page.previous_cursor})
+        assert [document.id for document in response.context["documents"]] == expected[2:4]
+        assert response.context["paginator"].count == 5
+
+    def test_document_list_search_orders_by_relevance(self, auth_client, client_entity, company, document_file):
+        documents = self._create_documents(client_entity, company, document_file, 3)
+        Document.all_objects.filter(pk=documents[0].pk).update(search_document="gasoil gasoil")
+        Document.all_objects.filter(pk=documents[2].pk).update(
+            search_document="gasoil repostaje flota furgonetas reparto norte"
+        )
+
+        response = auth_client.get(reverse("documents:list"), {"q": "gasoil", "pagination": "keyset"})
+
+        assert response.context["keyset_mode"] is False
+        assert list(response.context["documents"]) == [documents[0], documents[2]]
+
+    def test_document_list_total_count_is_cached_per_client_generation(
+        self, auth_client, client_entity, company, document_file, django_capture_on_commit_callbacks
+    ):
+        self._create_documents(client_entity, company, document_file, 2)
+
+        assert auth_client.get(reverse("documents:list")).context["paginator"].count == 2
+
+        # update() no invalida: el total sigue saliendo de la caché
+        Document.all_objects.filter(external_id="list-0").update(is_archived=True)
+        assert auth_client.get(reverse("documents:list")).context["paginator"].count == 2
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Document.all_objects.get(external_id="list-1").delete()
+
+        assert auth_client.get(reverse("documents:list")).context["paginator"].count == 0
+
+    def test_dashboard_query_count_does_not_grow_with_pending_documents(
+        self, auth_client, client_entity, document, document_file, django_assert_num_queries
+    ):
+        from documents.models import Company
+
+        for index in range(3):
+            Document.all_objects.create(
+                client=client_entity,
+                company=Company.objects.create(client=client_entity, name=f"Proveedor {index}", is_provider=True),
+                external_id=f"dashboard-{index}",
+                original_name=f"dashboard-{index}.pdf",
+                file=document_file,
+                document_type="invoice",
+                confidence={"score": 0.5},
+                review_level="required",
+                flow="in",
+            )
+
+        # Sesión + usuario + cliente y las 5 consultas del DashboardService
+        with django_assert_num_queries(8):
+            response = auth_client.get(reverse("dashboard"))
+
+        assert response.status_code == 200
+        assert response.context["pending_count"] == 4
+
+    def test_document_detail_loads_relations_and_timeline_in_fixed_queries(
+        self, auth_client, approved_document, user, django_assert_num_queries
+    ):
+        second = approved_document.create_rectification(user=user, reason="Corrección")
+        Document.all_objects.filter(pk=second.pk).update(
+            status="rejected", rejected_by=user, reviewed_by=user, is_archived=True, archived_by=user
+        )
+        third = second.create_rectification(user=user, reason="Otra corrección")
+
+        # Sesión + usuario + cliente, el documento con sus relaciones y la cadena de versiones
+        with django_assert_num_queries(5):
+            response = auth_client.get(reverse("documents:detail", args=[second.pk]))
+
+        assert response.status_code == 200
+        assert [version.pk for version in response.context["previous_versions"]] == [approved_document.pk]
+        assert [version.pk for version in response.context["next_versions"]] == [third.pk]
+        assert response.context["root_document"].pk == approved_document.pk
+
     def test_metrics_dashboard_view_uses_service_outputs(self, auth_client):
         fake_metrics = {
             "period": {"start": "2026-03-01", "end": "2026-03-31", "start_formatted": "1 marzo 2026", "end_formatted": "31 marzo 2026", "is_current_month": False},
@@ -0,0 +1,201 @@
+"""
+Cambios de estado de Document como compare-and-set.
+
+Cada transición es un único `UPDATE ... WHERE id = %s AND status = %s` con
+sus condiciones (las de can_be_approved, archivar...) y, si el UPDATE afecta
+a la fila, un INSERT en DocumentTransition dentro de la misma transacción.
+Si otro revisor se adelanta, el UPDATE no toca ninguna fila y la transición
+se pierde: no hace falta select_for_update.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, CharField, Q, Value, When
+from django.utils import timezone
+
+from documents import change_feed
+from documents.models import Document, DocumentTransition
+from documents.services.metrics_rollup import DOCUMENT_TRACKED_FIELDS, MetricsRollupService
+
+__all__ = ["TRANSITIONS", "SKIP_REASONS", "apply_transition", "apply_bulk_transition"]
+
+SKIP_REASONS = {
+    "not_found": "No existe o no es la versión vigente",
+    "not_pending": "No está pendiente de revisión",
+    "missing_total": "Falta el importe total",
+    "missing_issue_date": "Falta la fecha de emisión",
+    "already_archived": "Ya está archivado",
+    "not_reviewed": "Solo se archivan documentos aprobados o rechazados",
+    "not_archived": "No está archivado",
+}
+
+
+class Transition:
+    """
+    `checks`: condiciones que impiden la transición, en orden, con su motivo.
+    `values`: función (user, **params) -> columnas que cambia.
+    """
+
+    def __init__(self, name, checks, values):
+        self.name = name
+        self.checks = checks
+        self.values = values
+
+    @property
+    def blocked(self):
+        return reduce(or_, (condition for condition, _ in self.checks))
+
+    def changes(self, user, **params):
+        # update() no aplica auto_now: updated_at se fija aquí
+        return {**self.values(user, **params), "updated_at": timezone.now()}
+
+    def skip_reason(self):
+        return Case(
+            *(When(condition, then=Value(reason)) for condition, reason in self.checks),
+            default=Value(""),
+            output_field=CharField(),
+        )
+
+
+# Acción con la que cada transición aparece en el registro de cambios
+CHANGE_ACTIONS = {
+    "approve": "approved",
+    "auto_approve": "approved",
+    "reject": "rejected",
+    "archive": "archived",
+    "unarchive": "unarchived",
+}
+
+APPROVE_CHECKS = (
+    (~Q(status="pending"), "not_pending"),
+    (Q(total_amount__isnull=True), "missing_total"),
+    (Q(issue_date__isnull=True), "missing_issue_date"),
+)
+
+TRANSITIONS = {transition.name: transition for transition in (
+    Transition("approve", APPROVE_CHECKS, lambda user, **params: {
+        "status": "approved",
+        "approved_at": timezone.now(),
+        "approved_by": user,
+        "is_auto_approved": False,
+    }),
+    Transition("auto_approve", APPROVE_CHECKS, lambda user, **params: {
+        "status": "approved",
+        "approved_at": None,
+        "approved_by": None,
+        "is_auto_approved": True,
+    }),
+    Transition("reject", ((~Q(status="pending"), "not_pending"),), lambda user, reason=None, **params: {
+        "status": "rejected",
+        "rejected_at": timezone.now(),
+        "rejected_by": user,
+        "rejection_reason": reason,
+    }),
+    Transition("archive", (
+        (Q(is_archived=True), "already_archived"),
+        (~Q(status__in=["approved", "rejected"]), "not_reviewed"),
+    ), lambda user, **params: {
+        "is_archived": True,
+        "archived_at": timezone.now(),
+        "archived_by": user,
+    }),
+    Transition("unarchive", ((Q(is_archived=False), "not_archived"),), lambda user, **params: {
+        "is_archived": False,
+        "archived_at": None,
+        "archived_by": None,
+    }),
+)}
+
+
+def apply_transition(document, name, user=None, **params):
+    """
+    Aplica la transición si `document` sigue en el estado leído y cumple sus
+    condiciones. Devuelve True si se aplicó; en ese caso actualiza la instancia.
+    """
+    transition = TRANSITIONS[name]
+    values = transition.changes(user, **params)
+
+    with transaction.atomic():
+        won = (
+            Document.all_objects
+            .filter(pk=document.pk, status=document.status)
+            .exclude(transition.blocked)
+            .update(**values)
+        )
+        if not won:
+            return False
+
+        DocumentTransition.objects.create(
+            client_id=document.client_id,
+            document_id=document.pk,
+            action=name,
+            from_status=document.status,
+            to_status=values.get("status", document.status),
+            user=user,
+            reason=params.get("reason") or "",
+        )
+        change_feed.record(document.client_id, "document", document.pk, CHANGE_ACTIONS[name])
+        _after_update(document.client_id, {document.issue_date}, values)
+
+    for field, value in values.items():
+        setattr(document, field, value)
+    return True
+
+
+def apply_bulk_transition(client, ids, name, user=None, **params):
+    """
+    Versión en bloque: una consulta decide qué documentos admiten la
+    transición (y el motivo de los que no) y un único UPDATE la aplica.
+    Devuelve {"updated": [ids], "skipped": [{"id": ..., "reason": ...}]}.
+    """
+    transition = TRANSITIONS[name]
+    values = transition.changes(user, **params)
+    ids = list(dict.fromkeys(ids))
+    qs = Document.all_objects.filter(client=client, is_current=True)
+
+    with transaction.atomic():
+        rows = {
+            doc_id: (status, issue_date, reason)
+            for doc_id, status, issue_date, reason in (
+                qs.select_for_update()
+                .filter(id__in=ids)
+                .annotate(transition_skip_reason=transition.skip_reason())
+                .values_list("id", "status", "issue_date", "transition_skip_reason")
+            )
+        }
+
+        updated, skipped = [], []
+        for doc_id in ids:
+            _, _, reason = rows.get(doc_id, (None, None, "not_found"))
+            if reason:
+                skipped.append({"id": doc_id, "reason": reason})
+            else:
+                updated.append(doc_id)
+
+        if updated:
+            # Las condiciones se repiten en el UPDATE por si algo cambió entre medias
+            qs.filter(id__in=updated).exclude(transition.blocked).update(**values)
+            DocumentTransition.objects.bulk_create([
+                DocumentTransition(
+                    client=client,
+                    document_id=doc_id,
+                    action=name,
+                    from_status=rows[doc_id][0],
+                    to_status=values.get("status", rows[doc_id][0]),
+                    user=user,
+                    reason=params.get("reason") or "",
+                )
+                for doc_id in updated
+            ])
+            change_feed.record_many(client.id, "document", updated, CHANGE_ACTIONS[name])
+            _after_update(client.id, {rows[doc_id][1] for doc_id in updated}, values)
+
+    return {"updated": updated, "skipped": skipped}
+
+
+def _after_update(client_id, days, values):
+    # update() no emite señales: el agregado diario se actualiza a mano (la
+    # caché de métricas la invalida el marcador que sube el registro de cambios)
+    if DOCUMENT_TRACKED_FIELDS & set(values):
+        MetricsRollupService.refresh_documents(client_id, days)
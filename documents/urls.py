@@ -1,8 +1,9 @@
 from django.urls import path 
 from documents.views import (
-    DocumentListView, DocumentDetailView, approve_document, 
+    DocumentListView, DocumentDetailView, DocumentBulkActionView, approve_document, 
     reject_document, DocumentExportView, DocumentExportPreviewView,
-    DocumentRectifyView, DocumentPDFPreviewView
+    DocumentRectifyView, DocumentPDFPreviewView, PdfExportJobView,
+    PdfExportJobStatusView, PdfExportJobDownloadView
 )
 from .utils import render_pdf_preview
 
@@ -10,11 +11,15 @@ app_name = "documents"
 
 urlpatterns = [
     path("", DocumentListView.as_view(), name="list"),
+    path("bulk/", DocumentBulkActionView.as_view(), name="bulk_action"),
     path("<int:pk>/", DocumentDetailView.as_view(), name="detail"),
     path("<int:pk>/approve/", approve_document, name="approve"),
     path("<int:pk>/reject/", reject_document, name="reject"),
     path("<int:pk>/rectify", DocumentRectifyView.as_view(), name="rectify"),
     path("export/", DocumentExportView.as_view(), name="export"),
     path("export/preview/", DocumentExportPreviewView.as_view(), name="export_preview"),
+    path("export/pdf/<int:pk>/", PdfExportJobView.as_view(), name="pdf_export_job"),
+    path("export/pdf/<int:pk>/status/", PdfExportJobStatusView.as_view(), name="pdf_export_status"),
+    path("export/pdf/<int:pk>/download/", PdfExportJobDownloadView.as_view(), name="pdf_export_download"),
     path("pdf_preview/", DocumentPDFPreviewView.as_view(), name="pdf_preview"),
 ]
@@ -1,105 +1,152 @@
 import csv
+from copy import copy
 from decimal import Decimal, ROUND_HALF_UP
+import itertools
 import re
+import tempfile
 
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
 
 from openpyxl import Workbook
-
-
-def export_to_csv(qs):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="documentos.csv"'
-    writer = csv.writer(response)
-    writer.writerow([
-        "Fecha",
-        "Número documento",
-        "Proveedor",
-        "Base imponible",
-        "IVA %",
-        "Importe IVA",
-        "Total",
-    ])
-
-    for doc in qs:
-        writer.writerow([
-            doc.issue_date,
-            doc.document_number,
-            doc.company.name,
-            doc.base_amount,
-            doc.tax_percentage,
-            doc.tax_amount,
-            doc.total_amount,
-        ])
-
-    total_base_amount = round(float(qs.aggregate(Sum('base_amount'))['base_amount__sum']), 2)
-    total_tax_amount = round(float(qs.aggregate(Sum('tax_amount'))['tax_amount__sum']), 2)
-    total_total_amount = round(float(qs.aggregate(Sum('total_amount'))['total_amount__sum']), 2)
-
-    writer.writerow([
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+
+EXPORT_HEADERS = [
+    "Fecha",
+    "Número documento",
+    "Proveedor",
+    "Base imponible",
+    "IVA %",
+    "Importe IVA",
+    "Total",
+]
+
+EXPORT_FIELDS = (
+    "issue_date",
+    "document_number",
+    "company__name",
+    "base_amount",
+    "tax_percentage",
+    "tax_amount",
+    "total_amount",
+)
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def iter_export_rows(qs, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Recorre el queryset por bloques con la company ya unida y acumula los
+    totales en Decimal; la última fila es la de totales (sin consultas extra).
+    """
+    total_base_amount = Decimal("0")
+    total_tax_amount = Decimal("0")
+    total_total_amount = Decimal("0")
+
+    for row in qs.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        total_base_amount += row[3] or 0
+        total_tax_amount += row[5] or 0
+        total_total_amount += row[6] or 0
+        yield row
+
+    yield (
         "Totales",
         "",
         "",
-        total_base_amount,
+        round_decimal(total_base_amount, 2),
         "",
-        total_tax_amount,
-        total_total_amount
-    ])
-    return response
+        round_decimal(total_tax_amount, 2),
+        round_decimal(total_total_amount, 2),
+    )
 
 
-def export_to_excel(qs):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Documentos"
-
-    headers = [
-        "Fecha",
-        "Número documento",
-        "Proveedor",
-        "Base imponible",
-        "IVA %",
-        "Importe IVA",
-        "Total",
-    ]
-
-    ws.append(headers)
-
-    for doc in qs:
-        ws.append([
-            doc.issue_date.strftime("%d/%m/%Y"),
-            doc.document_number,
-            doc.company.name,
-            doc.base_amount,
-            doc.tax_percentage,
-            doc.tax_amount,
-            doc.total_amount,
-        ])
-
-    total_base_amount = round(float(qs.aggregate(Sum('base_amount'))['base_amount__sum']), 2)
-    total_tax_amount = round(float(qs.aggregate(Sum('tax_amount'))['tax_amount__sum']), 2)
-    total_total_amount = round(float(qs.aggregate(Sum('total_amount'))['total_amount__sum']), 2)
-
-    ws.append([
-        "Totales",
-        "",
-        "",
-        total_base_amount,
-        "",
-        total_tax_amount,
-        total_total_amount
-    ])
+class Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def stream_csv_export(qs, filename="documentos.csv"):
+    writer = csv.writer(Echo())
+    lines = (
+        writer.writerow(row)
+        for row in itertools.chain([EXPORT_HEADERS], iter_export_rows(qs))
     )
-    response["Content-Disposition"] = 'attachment; filename="documentos.xlsx"'
 
-    wb.save(response)
+    response = StreamingHttpResponse(lines, content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_to_csv(qs):
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="documentos.csv"'
+    writer = csv.writer(response)
+    writer.writerow(EXPORT_HEADERS)
+    writer.writerows(iter_export_rows(qs))
     return response
 
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Formato numérico y ancho por columna (mismo orden que EXPORT_FIELDS)
+XLSX_COLUMNS = [
+    ("DD/MM/YYYY", 12),
+    (None, 22),
+    (None, 40),
+    ("#,##0.00", 16),
+    ("0.00", 8),
+    ("#,##0.00", 14),
+    ("#,##0.00", 16),
+]
+
+
+def export_to_excel(qs, filename="documentos.xlsx"):
+    """
+    Exportación XLSX en modo write-only: las filas se escriben al vuelo a un
+    fichero temporal que después se envía por bloques en la respuesta.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Documentos")
+
+    # Un estilo por columna, calculado una vez y reutilizado en cada celda
+    column_styles = []
+    for index, (number_format, width) in enumerate(XLSX_COLUMNS, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+        if number_format:
+            prototype = WriteOnlyCell(ws)
+            prototype.number_format = number_format
+            column_styles.append(prototype._style)
+        else:
+            column_styles.append(None)
+
+    ws.append(EXPORT_HEADERS)
+
+    for row in iter_export_rows(qs):
+        cells = []
+        for value, style in zip(row, column_styles):
+            if style is None or value in (None, ""):
+                cells.append(value)
+                continue
+            cell = WriteOnlyCell(ws, value=value)
+            cell._style = copy(style)
+            cells.append(cell)
+        ws.append(cells)
+
+    tmp = tempfile.TemporaryFile(suffix=".xlsx")
+    wb.save(tmp)
+    tmp.seek(0)
+
+    return FileResponse(
+        tmp,
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
 from weasyprint import HTML
 def render_pdf_from_html(html, *, base_url=None):
     return HTML(string=html, base_url=base_url).write_pdf()
@@ -112,16 +159,23 @@ def export_invoice_pdf(invoice, *, base_url=None):
     return render_pdf_from_html(html, base_url=base_url)
 
 
-def export_invoices_to_pdf(qs, *, base_url=None, inline=False,**context):
+def render_invoices_pdf(*, base_url=None, **context):
     html = render_to_string(
         "private/documents/invoice_list_pdf.html",
         context,
     )
-    pdf_bytes = render_pdf_from_html(html, base_url=base_url)
+    return render_pdf_from_html(html, base_url=base_url)
 
-    invoices = context.get("invoices", [])
 
-    filename = "facturas.pdf" if len(invoices) != 1 else f"factura_{invoices[0].document_number}.pdf"
+def pdf_export_filename(document_numbers):
+    return "facturas.pdf" if len(document_numbers) != 1 else f"factura_{document_numbers[0]}.pdf"
+
+
+def export_invoices_to_pdf(qs, *, base_url=None, inline=False,**context):
+    pdf_bytes = render_invoices_pdf(base_url=base_url, **context)
+
+    invoices = context.get("invoices", [])
+    filename = pdf_export_filename([invoice.document_number for invoice in invoices])
 
     response = HttpResponse(pdf_bytes, content_type="application/pdf")
     disposition = "inline" if inline else "attachment"
@@ -132,9 +186,13 @@ from django.utils import timezone
 from django.db.models import Sum, Count
 
 def build_pdf_context(qs, request):
+    return build_client_pdf_context(qs, request.user.client)
+
+
+def build_client_pdf_context(qs, client):
     return {
         "invoices": qs,
-        "client": request.user.client,
+        "client": client,
         "date": timezone.now(),
         "totals": qs.aggregate(
             base_total=Sum("base_amount"),
@@ -1,19 +1,22 @@
 from django.shortcuts import redirect, get_object_or_404
-from .models import Document
+from django.http import JsonResponse
+from .models import Document, PdfExportJob
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import View, ListView, DetailView, TemplateView, FormView
+from django.conf import settings
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models.functions import Coalesce
-from django.db.models import DecimalField, Sum, Count
-from finance.models import FinancialMovement
+from django.db.models import Sum, Count
 from datetime import datetime
 from .selectors.document_selector import DocumentSelector
-from .services import DocumentService
+from .services import DashboardService, DocumentService, PdfExportService
+from .transitions import SKIP_REASONS
 from django.contrib.auth import get_user_model
 from .filters.document_filters import get_filtered_documents, get_exportable_documents
 from documents.models import Company
 from .forms import DocumentRectificationForm
+from .pagination import CachedCountPaginator, DOCUMENT_KEYSET, KEYSET_ORDERING
 
 User = get_user_model()
 
@@ -21,18 +24,59 @@ class DocumentListView(LoginRequiredMixin, ListView):
     template_name = "private/documents/document_list.html"
     context_object_name = "documents"
     paginate_by = 20
+    paginator_class = CachedCountPaginator
     
     def get_queryset(self):
-        return get_filtered_documents(
+        qs = get_filtered_documents(
             self.request,
             base_qs=DocumentSelector.for_client(self.request.user.client)
         )
+        if self.search_query:
+            return qs.order_by("-search_rank", *KEYSET_ORDERING)
+        return qs.order_by(*KEYSET_ORDERING)
+
+    @property
+    def search_query(self):
+        return self.request.GET.get("q", "").strip()
+
+    @property
+    def keyset_mode(self):
+        # Opcional: ?pagination=keyset o DOCUMENT_LIST_PAGINATION = "keyset".
+        # Las búsquedas se ordenan por relevancia y usan siempre paginación por páginas
+        if self.search_query:
+            return False
+        mode = self.request.GET.get("pagination") or getattr(settings, "DOCUMENT_LIST_PAGINATION", "offset")
+        return mode == "keyset"
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return self.paginator_class(
+            queryset,
+            per_page,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            client_id=self.request.user.client_id,
+            **kwargs,
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_mode:
+            return super().paginate_queryset(queryset, page_size)
+
+        page = DOCUMENT_KEYSET.paginate(
+            queryset,
+            page_size,
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        # El total aproximado sale de la caché; no hay COUNT(*) por página
+        paginator = self.get_paginator(queryset, page_size)
+        return paginator, page, page.object_list, page.has_next or page.has_previous
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
         page_obj = context.get("page_obj")
-        first_doc = page_obj.object_list.first() if page_obj else None
+        first_doc = next(iter(page_obj.object_list), None) if page_obj else None
 
         context["client"] = first_doc.client if first_doc else None
         context["document_types"] = Document.TYPE_CHOICES
@@ -41,7 +85,10 @@ class DocumentListView(LoginRequiredMixin, ListView):
         # 🔹 Querystring sin page
         querydict = self.request.GET.copy()
         querydict.pop("page", None)
+        querydict.pop("after", None)
+        querydict.pop("before", None)
         context["querystring"] = querydict.urlencode()
+        context["keyset_mode"] = self.keyset_mode
         return context
     
     
@@ -90,33 +137,72 @@ class DocumentDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         document = self.object
 
-        root = document.parent_document or document
+        # Toda la cadena en una consulta, repartida en memoria
+        versions = DocumentSelector.version_partitions(document)
 
-        all_versions = (
-            DocumentSelector.version_history(document)
-            .exclude(pk=document.pk)
-        )
+        context["previous_versions"] = versions["previous"]
+        context["next_versions"] = versions["next"]
+        context["has_previous_versions"] = bool(versions["previous"])
+        context["has_next_versions"] = bool(versions["next"])
+        context["root_document"] = versions["root"]
+        context["has_versions"] = bool(versions["previous"] or versions["next"])
 
-        previous_versions = all_versions.filter(version__lt=document.version).order_by("-version")
-        next_versions = all_versions.filter(version__gt=document.version).order_by("version")
+        return context
 
-        context["previous_versions"] = previous_versions
-        context["next_versions"] = next_versions
-        context["has_previous_versions"] = previous_versions.exists()
-        context["has_next_versions"] = next_versions.exists()
-        context["root_document"] = root
-        context["has_versions"] = previous_versions.exists() or next_versions.exists()
 
-        return context
+class DocumentBulkActionView(LoginRequiredMixin, View):
+    """
+    Acción sobre varios documentos del listado (POST: action, ids[, reason]).
+    Responde en JSON con los ids actualizados y los omitidos con su motivo.
+    """
+
+    def post(self, request):
+        action = request.POST.get("action")
+        client = request.user.client
+
+        ids, skipped = [], []
+        for value in request.POST.getlist("ids"):
+            if value.isdigit():
+                ids.append(int(value))
+            else:
+                skipped.append({"id": value, "reason": "not_found"})
+
+        if action == "approve":
+            result = DocumentService.bulk_approve(client, ids, user=request.user)
+        elif action == "reject":
+            result = DocumentService.bulk_reject(client, ids, user=request.user, reason=request.POST.get("reason"))
+        elif action == "archive":
+            result = DocumentService.bulk_archive(client, ids, user=request.user)
+        else:
+            return JsonResponse({"error": "Acción no reconocida."}, status=400)
 
+        return JsonResponse({
+            "action": action,
+            "updated": result["updated"],
+            "skipped": [
+                {**item, "message": SKIP_REASONS[item["reason"]]}
+                for item in skipped + result["skipped"]
+            ],
+        })
+
+
+TRANSITION_LOST_MESSAGE = "El documento ha cambiado de estado mientras tanto. Revisa su estado actual."
 
 def approve_document(request, document):
-    DocumentService.approve(document, user=request.user)
+    try:
+        DocumentService.approve(document, user=request.user)
+    except ValueError:
+        messages.error(request, TRANSITION_LOST_MESSAGE)
+        return redirect("documents:detail", pk=document.pk)
     messages.success(request, "El documento ha sido aprobado.")
     return redirect("documents:detail", pk=document.pk)
 
 def reject_document(request, document, reason=None):
-    DocumentService.reject(document, user=request.user, reason=reason)
+    try:
+        DocumentService.reject(document, user=request.user, reason=reason)
+    except ValidationError:
+        messages.error(request, TRANSITION_LOST_MESSAGE)
+        return redirect("documents:detail", pk=document.pk)
     messages.success(request, "El documento ha sido rechazado.")
     return redirect("documents:detail", pk=document.pk)
 
@@ -135,12 +221,20 @@ def save_document(request, document):
     return redirect("documents:detail", pk=document.pk)
 
 def archive_document(request, document): 
-    DocumentService.archive(document, user=request.user)
+    try:
+        DocumentService.archive(document, user=request.user)
+    except ValidationError:
+        messages.error(request, TRANSITION_LOST_MESSAGE)
+        return redirect("documents:detail", pk=document.pk)
     messages.success(request, "Documento archivado correctamente.")
     return redirect("documents:detail", pk=document.pk)
 
 def unarchive_document(request, document):
-    DocumentService.unarchive(document, user=request.user)
+    try:
+        DocumentService.unarchive(document, user=request.user)
+    except ValidationError:
+        messages.error(request, TRANSITION_LOST_MESSAGE)
+        return redirect("documents:detail", pk=document.pk)
     messages.warning(request, "Documento desarchivado correctamente.")
     return redirect("documents:detail", pk=document.pk)
 
@@ -153,56 +247,13 @@ class DashboardView(LoginRequiredMixin,TemplateView):
         client = self.request.user.client
         client = client if client else None
 
-        qs = DocumentSelector.pending(client)
-        today = timezone.now().date()
-        month_start = today.replace(day=1)
-
-        movement_qs = FinancialMovement.objects.filter(
-            client=client,
-            date__gte=month_start,
-            date__lte=today,
-            is_active=True,
-        )
-
-        pending_count = qs.count()
-        required_count = qs.filter(review_level="required").count() or 0
-        recommended_count = qs.filter(review_level="recommended").count() or 0
-
-        income_total = movement_qs.filter(movement_type="income").aggregate(
-            total=Coalesce(Sum("amount"), 0, output_field=DecimalField(max_digits=12, decimal_places=2))
-        )["total"]
-        expense_total = movement_qs.filter(movement_type="expense").aggregate(
-            total=Coalesce(Sum("amount"), 0, output_field=DecimalField(max_digits=12, decimal_places=2))
-        )["total"]
-        balance = income_total - expense_total
-
-        unreconciled_count = movement_qs.filter(is_reconciled=False).count()
-
-        top_expense_categories = (
-            movement_qs.filter(movement_type="expense")
-            .values("category__name", "category__icon")
-            .annotate(total=Sum("amount"))
-            .order_by("-total")[:3]
-        )
-
-        context = {
-            "pending_documents": qs.order_by("-created_at")[:10],
-            "pending_count": pending_count,
-            "required_review_count": required_count,
-            "recommended_review_count": recommended_count,
-            "client": client,
-            "finance_period_label": f"{month_start.strftime('%d/%m/%Y')} - {today.strftime('%d/%m/%Y')}",
-            "finance_income_total": income_total,
-            "finance_expense_total": expense_total,
-            "finance_balance": balance,
-            "unreconciled_movements_count": unreconciled_count,
-            "recent_movements": movement_qs.select_related("category")[:5],
-            "top_expense_categories": top_expense_categories,
-        }
+        context.update(DashboardService.get_dashboard(client))
+        context["client"] = client
 
         return context
     
-from .utils import export_invoices_to_pdf, export_to_csv, export_to_excel, build_pdf_context
+from django.urls import reverse
+from .utils import export_invoices_to_pdf, stream_csv_export, export_to_excel, build_pdf_context
 class DocumentExportView(LoginRequiredMixin, View):
 
     def get_exportable_queryset(self, ids=None):
@@ -221,7 +272,7 @@ class DocumentExportView(LoginRequiredMixin, View):
     
     def get(self, request):
         qs = self.get_exportable_queryset()
-        return export_to_csv(qs)
+        return stream_csv_export(qs)
     
     def post(self, request):
         ids = request.POST.getlist("ids")
@@ -230,23 +281,65 @@ class DocumentExportView(LoginRequiredMixin, View):
         qs = self.get_exportable_queryset(ids=ids)
 
         if fmt == "pdf":
-            context = build_pdf_context(qs, request)
-
-            return export_invoices_to_pdf(
-                qs, 
-                base_url=request.build_absolute_uri("/"),
-                **context,
-            )
+            return self.export_pdf(qs)
         
         if fmt == "xlsx":
             return export_to_excel(qs)
-        return export_to_csv(qs)
+        return stream_csv_export(qs)
     
+    def export_pdf(self, qs):
+        """
+        Las selecciones pequeñas se renderizan en la petición; el resto queda
+        en cola para `process_pdf_exports` y se redirige a la página de estado.
+        Si el mismo PDF ya se generó se sirve directamente desde MEDIA_ROOT.
+        """
+        job = PdfExportService.request_export(
+            client=self.request.user.client,
+            user=self.request.user,
+            qs=qs,
+            base_url=self.request.build_absolute_uri("/"),
+        )
+
+        sync_limit = getattr(settings, "PDF_EXPORT_SYNC_MAX_DOCUMENTS", 25)
+        if job.status == "queued" and len(job.document_ids) <= sync_limit and PdfExportService.claim(job):
+            PdfExportService.render(job)
+
+        if job.status == "done":
+            return PdfExportService.file_response(job)
+        return redirect("documents:pdf_export_job", pk=job.pk)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         return context
-    
-    
+
+
+class PdfExportJobView(LoginRequiredMixin, DetailView):
+    template_name = "private/documents/pdf_export_job.html"
+    context_object_name = "job"
+
+    def get_queryset(self):
+        return PdfExportJob.objects.filter(client=self.request.user.client)
+
+
+class PdfExportJobStatusView(LoginRequiredMixin, View):
+    def get(self, request, pk):
+        job = get_object_or_404(PdfExportJob, pk=pk, client=request.user.client)
+
+        return JsonResponse({
+            "id": job.pk,
+            "status": job.status,
+            "documents": len(job.document_ids),
+            "error": job.last_error,
+            "download_url": reverse("documents:pdf_export_download", args=[job.pk]) if job.status == "done" else None,
+        })
+
+
+class PdfExportJobDownloadView(LoginRequiredMixin, View):
+    def get(self, request, pk):
+        job = get_object_or_404(PdfExportJob, pk=pk, client=request.user.client)
+        return PdfExportService.file_response(job)
+
+
 from django.db.models import Sum, Min, Max, Avg
 class DocumentExportPreviewView(LoginRequiredMixin, ListView):
     template_name = "private/documents/document_export_preview.html"
@@ -1,4 +1,4 @@
-from django.db.models import Q
+from billing_ai.substring_search import substring_condition
 from .models import FinancialMovement
 
 def get_filtered_movements(request, base_qs=None):
@@ -23,8 +23,7 @@ def get_filtered_movements(request, base_qs=None):
     
     if filters.get("query"):
         base_qs = base_qs.filter(
-            Q(description__icontains=filters["query"])
-            | Q(category__name__icontains=filters["query"])
+            substring_condition(("description", "category__name"), filters["query"], using=base_qs.db)
         )
     if filters.get("start"):
         base_qs = base_qs.filter(date__gte=filters["start"])
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.3 on 2026-10-18 05:20
+
+from django.db import migrations
+
+from billing_ai.substring_search import create_trigram_indexes, drop_trigram_indexes
+
+TRIGRAM_COLUMNS = [
+    ("finance_financialmovement", "description"),
+]
+
+
+def forwards(apps, schema_editor):
+    create_trigram_indexes(schema_editor, TRIGRAM_COLUMNS)
+
+
+def backwards(apps, schema_editor):
+    drop_trigram_indexes(schema_editor, TRIGRAM_COLUMNS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_rename_is_conciled_financialmovement_is_reconciled'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
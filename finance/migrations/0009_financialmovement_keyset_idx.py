@@ -0,0 +1,20 @@
+# Generated by Django 6.0.3 on 2026-10-18 06:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_client_logo_client_primary_color'),
+        ('finance', '0008_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='financialmovement',
+            index=models.Index(fields=['client', '-date', '-created_at', '-id'], name='finance_movement_keyset_idx'),
+        ),
+    ]
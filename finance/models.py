@@ -83,6 +83,7 @@ class FinancialMovement(models.Model):
             models.Index(fields=["client", "date"]),
             models.Index(fields=["client", "movement_type"]),
             models.Index(fields=["client", "category"]),
+            models.Index(fields=["client", "-date", "-created_at", "-id"], name="finance_movement_keyset_idx"),
         ]
 
     def __str__(self):
@@ -13,6 +13,7 @@ from decimal import Decimal
 import pytest
 from django.contrib.messages import get_messages
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Q
 from django.urls import reverse
 
 from finance.models import FinancialMovement, MovementCategory
@@ -231,6 +232,29 @@ class TestGetFilteredMovements:
         )
         assert financial_movement not in list(response.context["movements"])
 
+    def test_filter_by_query_matches_fragment_inside_description(
+        self, auth_client, financial_movement
+    ):
+        response = auth_client.get(
+            reverse("finance:movements"), {"q": "bro fact"}
+        )
+        assert financial_movement in list(response.context["movements"])
+
+    def test_substring_backend_is_configurable(self, settings):
+        from billing_ai.substring_search import (
+            IContainsSubstringBackend,
+            TrigramSubstringBackend,
+            get_substring_backend,
+        )
+
+        assert isinstance(get_substring_backend(), IContainsSubstringBackend)
+
+        settings.SUBSTRING_SEARCH_BACKEND = "billing_ai.substring_search.TrigramSubstringBackend"
+        backend = get_substring_backend()
+
+        assert isinstance(backend, TrigramSubstringBackend)
+        assert backend.condition(["description"], "  ") == Q()
+
     def test_filter_by_date_range_includes_matching(
         self, auth_client, financial_movement
     ):
@@ -31,6 +31,64 @@ class TestFinanceViews:
         assert response.status_code == 200
         assert list(response.context["movements"]) == [financial_movement]
 
+    def _create_movements(self, client_entity, user, category, amounts):
+        return [
+            FinancialMovement.objects.create(
+                client=client_entity,
+                movement_type=category.type,
+                created_by=user,
+                category=category,
+                description=f"Movimiento {index}",
+                amount=Decimal(amount),
+                date="2026-03-10" if index % 2 else "2026-03-11",
+            )
+            for index, amount in enumerate(amounts)
+        ]
+
+    def test_movement_list_walks_keyset_pages_with_filtered_totals(
+        self, auth_client, client_entity, user, movement_category, expense_category, monkeypatch
+    ):
+        from finance.views import FinancialMovementListView
+
+        monkeypatch.setattr(FinancialMovementListView, "paginate_by", 2)
+        movements = self._create_movements(client_entity, user, movement_category, ["100.00", "50.00", "25.00"])
+        movements += self._create_movements(client_entity, user, expense_category, ["30.00", "20.00"])
+        expected = [m.id for m in sorted(movements, key=lambda m: (str(m.date), m.created_at, m.id), reverse=True)]
+
+        response = auth_client.get(reverse("finance:movements"))
+        totals = response.context["totals"]
+        seen = [movement.id for movement in response.context["movements"]]
+        page = response.context["page_obj"]
+        while page.has_next:
+            response = auth_client.get(reverse("finance:movements"), {"after": page.next_cursor})
+            page = response.context["page_obj"]
+            seen.extend(movement.id for movement in response.context["movements"])
+
+        assert seen == expected
+        assert totals == {
+            "count": 5,
+            "income": Decimal("175.00"),
+            "expense": Decimal("50.00"),
+            "balance": Decimal("125.00"),
+        }
+
+        response = auth_client.get(reverse("finance:movements"), {"before": page.previous_cursor})
+        assert [movement.id for movement in response.context["movements"]] == expected[2:4]
+
+    def test_movement_list_query_count_does_not_grow_with_rows(
+        self, auth_client, client_entity, user, movement_category, expense_category, django_assert_num_queries
+    ):
+        self._create_movements(client_entity, user, movement_category, ["10.00"])
+        auth_client.get(reverse("finance:movements"))
+
+        with django_assert_num_queries(6) as captured:
+            auth_client.get(reverse("finance:movements"))
+
+        self._create_movements(client_entity, user, expense_category, ["1.00"] * 10)
+
+        with django_assert_num_queries(len(captured)):
+            auth_client.get(reverse("finance:movements"))
+
     def test_create_movement_sets_client_and_creator(self, auth_client, movement_category):
         response = auth_client.post(
             reverse("finance:new_movement"),
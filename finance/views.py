@@ -6,11 +6,18 @@ from django.urls import reverse_lazy
 from django.contrib import messages
 from django.http import HttpResponseRedirect
 from .filters import get_filtered_movements
+from django.db.models import Count, DecimalField, Q, Sum
+from django.db.models.functions import Coalesce
+from billing_ai.pagination import Keyset
+
+# (date, created_at, id) descendente sobre el índice (client, -date, -created_at, -id)
+MOVEMENT_KEYSET = Keyset(FinancialMovement, "date", "created_at", "id")
 
 class FinancialMovementListView(LoginRequiredMixin, ListView):
     model = FinancialMovement
     template_name = "private/finance/movement_list.html"
     context_object_name = "movements"
+    paginate_by = 50
 
     def get_queryset(self):
         return get_filtered_movements(
@@ -18,7 +25,28 @@ class FinancialMovementListView(LoginRequiredMixin, ListView):
             base_qs=FinancialMovement.objects.filter(
                 client=self.request.user.client
             )
+        ).select_related("category").order_by(*MOVEMENT_KEYSET.ordering)
+
+    def paginate_queryset(self, queryset, page_size):
+        page = MOVEMENT_KEYSET.paginate(
+            queryset,
+            page_size,
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        return None, page, page.object_list, page.has_next or page.has_previous
+
+    @staticmethod
+    def get_totals(queryset):
+        """Totales del filtro completo (no solo de la página) en una consulta."""
+        amount_field = DecimalField(max_digits=12, decimal_places=2)
+        totals = queryset.order_by().aggregate(
+            count=Count("id"),
+            income=Coalesce(Sum("amount", filter=Q(movement_type="income")), 0, output_field=amount_field),
+            expense=Coalesce(Sum("amount", filter=Q(movement_type="expense")), 0, output_field=amount_field),
         )
+        totals["balance"] = totals["income"] - totals["expense"]
+        return totals
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -26,6 +54,12 @@ class FinancialMovementListView(LoginRequiredMixin, ListView):
             client=self.request.user.client
         )
         context["payment_methods"] = FinancialMovement.PAYMENT_CHOICES
+        context["totals"] = self.get_totals(self.object_list)
+
+        querydict = self.request.GET.copy()
+        querydict.pop("after", None)
+        querydict.pop("before", None)
+        context["querystring"] = querydict.urlencode()
         return context
 
 